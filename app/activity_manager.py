@@ -0,0 +1,139 @@
+"""
+activity_manager.py - Suspende o trabalho de fundo quando ninguém está vendo
+
+As abas registram o que fazem em segundo plano (timers do preview, sondagem
+das portas) com um par de funções suspend/resume e o widget que mostra o
+resultado. O gerenciador, um só para a aplicação, chama suspend() quando:
+
+- o widget some (troca de aba, janela minimizada ou fechada), ou
+- a aplicação fica ociosa: nenhuma interação por config["idle_timeout_s"]
+  segundos (padrão 300; 0 desliga)
+
+e resume() quando ele volta a aparecer ou o usuário mexe de novo. Cada
+participante decide o que "suspender" significa (parar ou só desacelerar).
+
+O filtro de eventos fica só nos widgets registrados e nas janelas deles (não
+na aplicação inteira): contam como interação a entrada que chega até eles, a
+janela ser ativada ou receber o mouse e a troca de foco entre widgets.
+"""
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+
+from app.config_manager import load_config
+
+DEFAULT_IDLE_TIMEOUT_S = 300
+
+INPUT_EVENTS = frozenset((
+    QEvent.MouseMove, QEvent.MouseButtonPress, QEvent.Wheel, QEvent.KeyPress,
+    QEvent.TouchBegin, QEvent.TabletPress, QEvent.WindowActivate, QEvent.Enter,
+))
+
+
+class _Participant:
+    def __init__(self, widget, suspend, resume, idle):
+        self.widget = widget
+        self.suspend = suspend
+        self.resume = resume
+        self.idle = idle  # também suspende com a aplicação ociosa
+        self.running = True
+        self.window = None
+
+
+class ActivityManager(QObject):
+    """Visibilidade e ociosidade da interface -> suspend()/resume() dos participantes"""
+
+    idle_changed = pyqtSignal(bool)  # True = aplicação ociosa
+
+    def __init__(self, idle_timeout_s=DEFAULT_IDLE_TIMEOUT_S):
+        super().__init__()
+        self.idle_timeout_s = idle_timeout_s
+        self.idle = False
+        self._participants = []
+        self._last_input = time.monotonic()
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._check_idle)
+        app = QApplication.instance()
+        if app is not None and idle_timeout_s > 0:
+            # Cliques e teclas que os widgets filhos consomem não sobem até o
+            # participante, mas quase sempre movem o foco
+            app.focusChanged.connect(self._on_input)
+            self._idle_timer.start(int(idle_timeout_s * 1000))
+
+    def register(self, widget, suspend, resume, idle=True):
+        """Registra um participante; já começa suspenso se `widget` não estiver visível"""
+        participant = _Participant(widget, suspend, resume, idle)
+        self._participants.append(participant)
+        widget.installEventFilter(self)
+        widget.destroyed.connect(lambda *_: self._participants.remove(participant))
+        self._update(participant)
+        return participant
+
+    # ----- estado -----
+    def _should_run(self, participant):
+        widget = participant.widget
+        if not widget.isVisible() or widget.window().isMinimized():
+            return False
+        return not (participant.idle and self.idle)
+
+    def _update(self, participant):
+        run = self._should_run(participant)
+        if run == participant.running:
+            return
+        participant.running = run
+        (participant.resume if run else participant.suspend)()
+
+    def _update_all(self):
+        for participant in list(self._participants):
+            self._update(participant)
+
+    def _set_idle(self, idle):
+        if idle == self.idle:
+            return
+        self.idle = idle
+        self.idle_changed.emit(idle)
+        self._update_all()
+
+    def _check_idle(self):
+        remaining = self.idle_timeout_s - (time.monotonic() - self._last_input)
+        if remaining <= 0:
+            self._set_idle(True)
+        else:
+            self._idle_timer.start(int(remaining * 1000) + 1)
+
+    # ----- eventos -----
+    def _on_input(self, *_):
+        if self.idle_timeout_s <= 0:
+            return
+        self._last_input = time.monotonic()
+        if self.idle:
+            self._set_idle(False)
+            self._idle_timer.start(int(self.idle_timeout_s * 1000))
+
+    def eventFilter(self, obj, event):
+        # Instalado só nos participantes e nas janelas deles
+        kind = event.type()
+        if kind in INPUT_EVENTS:
+            self._on_input()
+        elif kind in (QEvent.Show, QEvent.Hide, QEvent.WindowStateChange):
+            for participant in self._participants:
+                if participant.widget is obj or participant.window is obj:
+                    if kind == QEvent.Show and participant.window is None:
+                        # A janela só existe de fato quando o widget aparece: observa minimizar/restaurar
+                        participant.window = obj.window()
+                        participant.window.installEventFilter(self)
+                    self._update(participant)
+        return False
+
+
+_manager = None
+
+
+def activity_manager():
+    """Gerenciador compartilhado da aplicação (criado no primeiro uso, depois do QApplication)"""
+    global _manager
+    if _manager is None:
+        _manager = ActivityManager(float(load_config().get("idle_timeout_s", DEFAULT_IDLE_TIMEOUT_S)))
+    return _manager
@@ -0,0 +1,146 @@
+"""
+baked_animation.py - Animações pré-calculadas no host e gravadas comprimidas na flash
+
+Para efeitos periódicos (um ciclo fechado de quadros), o gerador pode
+desenhar o ciclo inteiro com o mesmo EffectRenderer do preview e gravar o
+resultado na flash: o Arduino só descomprime e copia cada quadro (fragmento
+"effect_baked"), sem a matemática do efeito. Os quadros são os do preview,
+byte a byte.
+
+Formato de cada animação em BAKED_DATA:
+    quadros (u16 LE) | cores - 1 (u8) | paleta (3 bytes RGB por cor) | quadros
+Cada quadro é uma sequência de blocos que cobre os NUM_LEDS; byte de controle h:
+    h & 0x80: (h & 0x7F) + 1 LEDs da mesma cor, seguido do índice da cor
+    senão:    h + 1 índices de cor, um por LED
+"""
+from math import gcd
+
+from app.effect_kernels import RAINBOW_STEP
+from app.effect_renderer import EffectRenderer
+
+# Effect.type das animações pré-calculadas (fragmento "effect_baked")
+BAKED_TYPE = 7
+# Efeitos com ciclo determinístico; Cintilar e Fogo dependem do random8 e não se repetem
+BAKEABLE_EFFECTS = ("Onda", "Arco-íris")
+MAX_BLOCK = 128
+MAX_COLORS = 256
+# Blocos de cor repetida a partir deste tamanho; abaixo, literais gastam o mesmo ou menos
+MIN_RUN = 3
+
+
+def cycle_length(preset, total_leds):
+    """Quadros de um ciclo completo do efeito (None se não for periódico)"""
+    effect_type = preset.get("tipo")
+    if effect_type == "Onda":
+        return total_leds
+    if effect_type == "Arco-íris":
+        return 256 // gcd(RAINBOW_STEP, 256)
+    return None
+
+
+def render_cycle(preset, total_leds):
+    """Quadros RGB de um ciclo, a partir do reset (o mesmo primeiro quadro do firmware)"""
+    count = cycle_length(preset, total_leds)
+    if count is None:
+        return None
+    renderer = EffectRenderer(total_leds, use_native=False)
+    renderer.set_params(preset)
+    renderer.reset()
+    frame = bytearray(renderer.frame_size())
+    frames = []
+    for _ in range(count):
+        renderer.render_into(frame)
+        frames.append(bytes(frame))
+    # Confere o ciclo: o quadro seguinte precisa voltar ao primeiro
+    if bytes(renderer.render_into(frame)) != frames[0]:
+        return None
+    return frames
+
+
+def _encode_frame(indices, out):
+    literal = []
+
+    def flush():
+        while literal:
+            block = literal[:MAX_BLOCK]
+            del literal[:MAX_BLOCK]
+            out.append(len(block) - 1)
+            out.extend(block)
+
+    n = len(indices)
+    i = 0
+    while i < n:
+        run = 1
+        while i + run < n and run < MAX_BLOCK and indices[i + run] == indices[i]:
+            run += 1
+        if run >= MIN_RUN:
+            flush()
+            out.append(0x80 | (run - 1))
+            out.append(indices[i])
+            i += run
+        else:
+            literal.append(indices[i])
+            i += 1
+    flush()
+
+
+def encode(frames):
+    """Comprime os quadros (paleta + RLE); None se houver mais de 256 cores ou 65535 quadros"""
+    if not frames or len(frames) > 0xFFFF:
+        return None
+    palette = {}
+    indexed = []
+    for frame in frames:
+        indices = []
+        for i in range(0, len(frame), 3):
+            color = frame[i:i + 3]
+            index = palette.get(color)
+            if index is None:
+                index = palette[color] = len(palette)
+                if index >= MAX_COLORS:
+                    return None
+            indices.append(index)
+        indexed.append(indices)
+
+    out = bytearray(len(frames).to_bytes(2, "little"))
+    out.append(len(palette) - 1)
+    for color in palette:
+        out += color
+    for indices in indexed:
+        _encode_frame(indices, out)
+    return bytes(out)
+
+
+def decode(data, total_leds, offset=0):
+    """Quadros RGB de uma animação em `data` (espelho de apply_baked() do firmware)"""
+    frames_left = data[offset] | (data[offset + 1] << 8)
+    colors = data[offset + 2] + 1
+    palette_start = offset + 3
+    palette = [bytes(data[palette_start + 3 * k:palette_start + 3 * k + 3]) for k in range(colors)]
+    pos = palette_start + 3 * colors
+    frames = []
+    for _ in range(frames_left):
+        frame = bytearray()
+        i = 0
+        while i < total_leds:
+            control = data[pos]
+            pos += 1
+            count = (control & 0x7F) + 1
+            if control & 0x80:
+                frame += palette[data[pos]] * count
+                pos += 1
+            else:
+                for index in data[pos:pos + count]:
+                    frame += palette[index]
+                pos += count
+            i += count
+        frames.append(bytes(frame))
+    return frames
+
+
+def bake_preset(preset, total_leds):
+    """Animação comprimida de um preset, ou None se ele não puder ser pré-calculado"""
+    if preset.get("tipo") not in BAKEABLE_EFFECTS:
+        return None
+    frames = render_cycle(preset, total_leds)
+    return encode(frames) if frames else None
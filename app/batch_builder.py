@@ -0,0 +1,312 @@
+"""
+batch_builder.py - Geração (e compilação opcional) de firmwares em lote
+
+Gera um sketch para cada combinação preset mensal x placa x layout de pinos,
+em paralelo (ProcessPoolExecutor). Os arquivos vão para uma árvore versionada
+pela versão do gerador:
+
+    build/firmware/g<versão>/<placa>/<layout>/mes_01/mes_01.ino
+    build/firmware/g<versão>/manifest.json
+
+O manifest guarda, por combinação, o hash das entradas, o sha256 e o tamanho
+dos artefatos. Combinações cujas entradas não mudaram são puladas.
+
+Uso pela linha de comando:
+
+    python -m app.batch_builder --boards uno,mega --compile
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from app.config_manager import load_config
+from app.firmware_generator import FirmwareGenerator
+from app.presets_manager import PresetsManager
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "build", "firmware")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Placas suportadas: FQBN do arduino-cli e memória disponível para o sketch (bytes)
+BOARD_PROFILES = {
+    "uno": {"fqbn": "arduino:avr:uno", "flash": 32256, "sram": 2048},
+    "nano": {"fqbn": "arduino:avr:nano:cpu=atmega328", "flash": 30720, "sram": 2048},
+    "nano_old": {"fqbn": "arduino:avr:nano:cpu=atmega328old", "flash": 30720, "sram": 2048},
+    "mega": {"fqbn": "arduino:avr:mega:cpu=atmega2560", "flash": 253952, "sram": 8192},
+}
+
+# Arquivos cujo conteúdo define o código gerado (entram no hash de versão)
+GENERATOR_SOURCES = ("firmware_generator.py", "firmware_fragments.py", "scheduler.py", "timeline.py",
+                     "effect_kernels.py", "baked_animation.py", "effect_renderer.py")
+
+_SKETCH_USES = re.compile(r"Sketch uses (\d+) bytes")
+_GLOBALS_USE = re.compile(r"Global variables use (\d+) bytes")
+
+
+def generator_version():
+    """Hash curto das fontes do gerador; muda quando o código emitido pode mudar"""
+    digest = hashlib.sha256()
+    base = os.path.dirname(__file__)
+    for name in GENERATOR_SOURCES:
+        with open(os.path.join(base, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def pin_layouts_from_config(config):
+    """Layouts de pinos em config["pin_layouts"] (nome -> pinos) ou só os pinos atuais"""
+    if config.get("ports"):
+        # Portas com trechos próprios: o layout de pinos vem de config["ports"]
+        return {"portas": [int(port["pin"]) for port in config["ports"]]}
+    layouts = config.get("pin_layouts")
+    if layouts:
+        return {name: [int(p) for p in pins] for name, pins in layouts.items()}
+    return {"padrao": [int(p) for p in config.get("data_pins", [2, 3, 4, 5, 6, 7])]}
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def plan_jobs(presets, config, boards, pin_layouts, version, compile_sketches=False):
+    """Lista as combinações preset x placa x layout com o hash de suas entradas"""
+    jobs = []
+    for preset in presets:
+        month = int(preset.get("mes", 0))
+        for board in boards:
+            profile = BOARD_PROFILES[board]
+            for layout_name, pins in pin_layouts.items():
+                job_config = dict(config, data_pins=pins)
+                if config.get("bake_effects"):
+                    # Animações pré-calculadas entram até o limite de flash da placa
+                    job_config.setdefault("flash_budget", profile["flash"])
+                inputs = {
+                    "generator": version,
+                    "preset": preset,
+                    "board": board,
+                    "profile": profile,
+                    "config": job_config,
+                    "compile": compile_sketches,
+                }
+                sketch = f"mes_{month:02d}"
+                jobs.append({
+                    "key": f"{board}/{layout_name}/{sketch}",
+                    "sketch": sketch,
+                    "board": board,
+                    "preset": dict(preset, ativo=True),
+                    "config": job_config,
+                    "compile": compile_sketches,
+                    "input_hash": hashlib.sha256(
+                        json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8")
+                    ).hexdigest(),
+                })
+    return jobs
+
+
+def _compile_sketch(sketch_dir, fqbn):
+    """Compila com arduino-cli; retorna (tamanhos, erro)"""
+    build_dir = os.path.join(sketch_dir, "build")
+    try:
+        result = subprocess.run(
+            ["arduino-cli", "compile", "--fqbn", fqbn, "--output-dir", build_dir, sketch_dir],
+            capture_output=True, text=True, timeout=600
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return None, str(e)
+    if result.returncode != 0:
+        return None, (result.stderr or result.stdout).strip()[-2000:]
+
+    sizes = {}
+    match = _SKETCH_USES.search(result.stdout)
+    if match:
+        sizes["flash_bytes"] = int(match.group(1))
+    match = _GLOBALS_USE.search(result.stdout)
+    if match:
+        sizes["sram_bytes"] = int(match.group(1))
+    hex_files = [f for f in os.listdir(build_dir) if f.endswith(".ino.hex")]
+    if hex_files:
+        hex_path = os.path.join(build_dir, hex_files[0])
+        sizes["hex"] = hex_path
+        sizes["hex_sha256"] = _sha256_file(hex_path)
+    return sizes, None
+
+
+def build_job(job, root):
+    """Gera (e compila, se pedido) uma combinação. Roda em um processo do pool."""
+    sketch_dir = os.path.join(root, *job["key"].split("/"))
+    os.makedirs(sketch_dir, exist_ok=True)
+    ino_path = os.path.join(sketch_dir, job["sketch"] + ".ino")
+
+    config = job["config"]
+    generator = FirmwareGenerator(config.get("total_leds", 92), config)
+    code = generator.generate_firmware([job["preset"]])
+    with open(ino_path, "w", encoding="utf-8") as f:
+        f.write(code)
+
+    profile = BOARD_PROFILES[job["board"]]
+    report = generator.last_report
+    entry = {
+        "input_hash": job["input_hash"],
+        "ino": os.path.relpath(ino_path, root),
+        "sha256": _sha256_file(ino_path),
+        "size": os.path.getsize(ino_path),
+        "board": job["board"],
+        "fqbn": profile["fqbn"],
+        "data_pins": config.get("data_pins"),
+        "ports": report["ports"],
+        "fragments": report["fragments"],
+        "flash_estimate": report["flash_estimate"],
+        "fits": report["flash_estimate"] <= profile["flash"],
+    }
+
+    if job["compile"]:
+        sizes, error = _compile_sketch(sketch_dir, profile["fqbn"])
+        if error:
+            entry["compile_error"] = error
+        else:
+            entry.update(sizes)
+            if "hex" in sizes:
+                entry["hex"] = os.path.relpath(sizes["hex"], root)
+            if "flash_bytes" in sizes:
+                entry["fits"] = sizes["flash_bytes"] <= profile["flash"]
+    return job["key"], entry
+
+
+def _is_current(entry, job, root):
+    """Combinação já gerada com as mesmas entradas e artefato intacto"""
+    if not entry or entry.get("input_hash") != job["input_hash"] or "error" in entry:
+        return False
+    if job["compile"] and ("compile_error" in entry or "hex" not in entry):
+        return False
+    path = os.path.join(root, entry["ino"])
+    return os.path.exists(path) and _sha256_file(path) == entry.get("sha256")
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("manifest_version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"manifest_version": MANIFEST_VERSION, "entries": {}}
+
+
+def run_batch(presets=None, config=None, boards=None, pin_layouts=None, output_dir=None,
+              compile_sketches=False, max_workers=None, force=False, progress=None):
+    """Gera todas as combinações; retorna um resumo com caminho do manifest e contagens.
+
+    Args:
+        presets: lista de presets (padrão: os 12 presets mensais salvos)
+        boards: nomes de BOARD_PROFILES (padrão: todos)
+        pin_layouts: dict nome -> pinos (padrão: config["pin_layouts"] ou data_pins)
+        compile_sketches: compila cada sketch com arduino-cli
+        force: regenera mesmo as combinações inalteradas
+        progress: callback(concluídas, total) chamado a cada combinação
+    """
+    config = config if config is not None else load_config()
+    presets = presets if presets is not None else PresetsManager().get_all_presets()
+    boards = boards or list(BOARD_PROFILES)
+    unknown = [b for b in boards if b not in BOARD_PROFILES]
+    if unknown:
+        raise ValueError(f"Placa(s) desconhecida(s): {', '.join(unknown)}")
+    pin_layouts = pin_layouts or pin_layouts_from_config(config)
+    if compile_sketches and shutil.which("arduino-cli") is None:
+        raise RuntimeError("arduino-cli não encontrado no PATH (necessário para --compile)")
+
+    version = generator_version()
+    root = os.path.join(output_dir or DEFAULT_OUTPUT_DIR, f"g{version}")
+    os.makedirs(root, exist_ok=True)
+    manifest = load_manifest(root)
+    entries = manifest["entries"]
+
+    jobs = plan_jobs(presets, config, boards, pin_layouts, version, compile_sketches)
+    pending = [job for job in jobs if force or not _is_current(entries.get(job["key"]), job, root)]
+    skipped = len(jobs) - len(pending)
+    done = skipped
+    if progress:
+        progress(done, len(jobs))
+
+    failed = 0
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    try:
+        if pending:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = {pool.submit(build_job, job, root): job for job in pending}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        key, entry = future.result()
+                    except Exception as e:
+                        # Erro em uma combinação (gerador, disco) não derruba o lote; ela é refeita na próxima vez
+                        key, entry = job["key"], {"input_hash": job["input_hash"], "board": job["board"],
+                                                  "error": f"{type(e).__name__}: {e}"}
+                    entries[key] = entry
+                    failed += "compile_error" in entry or "error" in entry
+                    done += 1
+                    if progress:
+                        progress(done, len(jobs))
+    finally:
+        # O que já foi gerado fica registrado mesmo se o lote for interrompido
+        manifest.update(generator_version=version, generated_at=datetime.now().isoformat(timespec="seconds"))
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+
+    return {
+        "root": root,
+        "manifest": manifest_path,
+        "total": len(jobs),
+        "built": len(pending),
+        "skipped": skipped,
+        "failed": failed,
+        "errors": {job["key"]: entries[job["key"]]["error"] for job in jobs if "error" in entries.get(job["key"], {})},
+        "too_big": sorted(job["key"] for job in jobs if not entries.get(job["key"], {}).get("fits", True)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera firmwares para todos os meses, placas e layouts de pinos")
+    parser.add_argument("--boards", default=",".join(BOARD_PROFILES),
+                        help="placas separadas por vírgula (%(default)s)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="pasta de saída")
+    parser.add_argument("--compile", action="store_true", help="compila com arduino-cli")
+    parser.add_argument("--jobs", type=int, default=None, help="processos em paralelo")
+    parser.add_argument("--force", action="store_true", help="regenera mesmo o que não mudou")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = run_batch(
+            boards=[b.strip() for b in args.boards.split(",") if b.strip()],
+            output_dir=args.output,
+            compile_sketches=args.compile,
+            max_workers=args.jobs,
+            force=args.force,
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"Erro: {e}")
+        return 1
+
+    print(f"{summary['built']} gerado(s), {summary['skipped']} sem mudança, "
+          f"{summary['failed']} com erro (total {summary['total']})")
+    for key in summary["errors"]:
+        print(f"Erro: {key}: {summary['errors'][key]}")
+    for key in summary["too_big"]:
+        print(f"Aviso: {key} não cabe na flash da placa")
+    print(f"Manifest: {summary['manifest']}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
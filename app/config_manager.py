@@ -4,17 +4,22 @@ import os
 
 CONFIG_FILE = os.path.join(os.path.dirname(__file__), "config.json")
 
+# Limite de LEDs aceito pela configuração: NUM_LEDS e os índices dos laços
+# do firmware são uint16_t (acima disso `i < NUM_LEDS` nunca termina)
+MAX_LEDS = 65535
+
 DEFAULT_CONFIG = {
-    "total_leds": 70,
+    # Mesmo total do layout padrão (app/layouts/fachada.json)
+    "total_leds": 46,
     "letters": {
-        "P": [0, 6],
-        "H": [7, 13],
-        "O": [14, 20],
-        "N": [21, 27],
-        "E": [28, 34],
-        "A": [35, 41],
-        "I": [42, 48],
-        "D": [49, 55]
+        "P": [0, 5],
+        "H": [6, 11],
+        "O": [12, 17],
+        "N": [18, 23],
+        "E": [24, 29],
+        "A": [30, 35],
+        "I": [36, 40],
+        "D": [41, 45]
     },
     "standby": {
         "start": "21:00",
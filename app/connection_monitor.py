@@ -1,10 +1,12 @@
 """
 connection_monitor.py - Monitor de conexão Arduino em thread background
 """
+import os
 import serial
 import serial.tools.list_ports
 import threading
 import time
+from collections import deque
 from PyQt5.QtCore import QObject, pyqtSignal
 from app.serial_utils import probe_port
 
@@ -13,17 +15,43 @@ class ArduinoMonitor(QObject):
     """
     Monitor que roda em thread background checando status de conexão com Arduino.
     Emite sinais quando a conexão muda de estado.
+
+    Guarda métricas de saúde da conexão (latência das sondagens, reconexões,
+    tempo conectado, último erro), disponíveis em `get_health()`. Mensagens de
+    status repetidas não são reemitidas, e mudanças muito próximas são
+    agrupadas: só a mais recente cruza para a thread da interface.
     """
     
     connection_changed = pyqtSignal(bool)  # True = conectado, False = desconectado
     status_updated = pyqtSignal(str)  # Mensagem de status atualizada
+
+    # Intervalo mínimo entre duas emissões de status_updated (s)
+    STATUS_MIN_INTERVAL = 0.5
+    # Sondagens guardadas para os percentis de latência
+    LATENCY_WINDOW = 100
     
     def __init__(self, check_interval=2):
         super().__init__()
         self.check_interval = check_interval
         self.is_running = True
+        self.paused = False
         self.current_port = None
         self.is_connected = False
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._checks = 0
+        self._probe_failures = 0
+        self._connects = 0
+        self._connected_since = None
+        self._connected_total = 0.0
+        self._last_error = None
+        self._last_error_time = None
+        self._last_status = None
+        self._last_status_time = 0.0
+        self._pending_status = None
+        self._status_suppressed = 0
+        self._wake = threading.Event()
         
         # Inicia thread de monitoramento
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
@@ -31,12 +59,28 @@ class ArduinoMonitor(QObject):
     
     def _monitor_loop(self):
         """Loop que roda em background checando conexão"""
+        last_check = None
         while self.is_running:
-            try:
-                self._check_connection()
-            except Exception as e:
-                self.status_updated.emit(f"⚠️ Erro ao checar conexão: {str(e)}")
-            time.sleep(self.check_interval)
+            # Recalculado a cada volta: set_check_interval() vale já para a próxima checagem
+            next_check = 0.0 if last_check is None else last_check + self.check_interval
+            if not self.paused and time.monotonic() >= next_check:
+                try:
+                    self._check_connection()
+                except Exception as e:
+                    self._record_error(str(e))
+                    self._emit_status(f"⚠️ Erro ao checar conexão: {str(e)}")
+                last_check = time.monotonic()
+                next_check = last_check + self.check_interval
+            self._flush_status()
+
+            # Acorda na próxima checagem ou quando um status agrupado puder ser emitido
+            timeout = self.check_interval if self.paused else next_check - time.monotonic()
+            with self._lock:
+                if self._pending_status is not None:
+                    due = self._last_status_time + self.STATUS_MIN_INTERVAL - time.monotonic()
+                    timeout = min(timeout, due)
+            self._wake.wait(max(0.01, timeout))
+            self._wake.clear()
     
     def _check_connection(self):
         """Verifica se Arduino está conectado"""
@@ -45,41 +89,144 @@ class ArduinoMonitor(QObject):
         if self.current_port is None:
             # Nenhuma porta selecionada
             if self.is_connected:
-                self.is_connected = False
-                self.connection_changed.emit(False)
-                self.status_updated.emit("🔴 Nenhuma porta selecionada")
+                self._set_connected(False)
+                self._emit_status("🔴 Nenhuma porta selecionada")
         else:
-            # Temos uma porta selecionada; além de existir no sistema, tentamos sondar comunicação
-            if self.current_port in available_ports:
+            # Temos uma porta selecionada; além de existir no sistema, tentamos sondar comunicação.
+            # Caminhos que existem no disco (ex.: pty do Arduino virtual) também contam.
+            port = self.current_port
+            if port in available_ports or os.path.exists(port):
                 # Verifica comunicação real com a porta
+                start = time.monotonic()
                 try:
-                    ok = probe_port(self.current_port)
-                except Exception:
+                    ok = probe_port(port)
+                except Exception as e:
+                    self._record_error(f"{port}: {e}")
                     ok = False
+                self._record_probe(time.monotonic() - start, ok, port)
+                if port != self.current_port:
+                    return  # a porta mudou durante a sondagem: resultado obsoleto
 
                 if ok:
                     if not self.is_connected:
-                        self.is_connected = True
-                        self.connection_changed.emit(True)
-                        self.status_updated.emit(f"🟢 Conectado em {self.current_port}")
+                        self._set_connected(True)
+                        self._emit_status(f"🟢 Conectado em {port}")
                 else:
                     # A porta existe, mas não responde como esperado
                     if self.is_connected:
-                        self.is_connected = False
-                        self.connection_changed.emit(False)
-                    self.status_updated.emit(f"⚪ Porta {self.current_port} encontrada, sem resposta serial")
+                        self._set_connected(False)
+                    self._emit_status(f"⚪ Porta {port} encontrada, sem resposta serial")
             else:
                 if self.is_connected:
-                    self.is_connected = False
-                    self.connection_changed.emit(False)
-                    self.status_updated.emit(f"⚪ Arduino desconectado de {self.current_port}")
+                    self._set_connected(False)
+                    self._emit_status(f"⚪ Arduino desconectado de {port}")
+                self._record_error(f"{port} não está mais na lista de portas")
                 self.current_port = None
+
+    # -----------------------------------------
+    # Métricas de saúde
+    # -----------------------------------------
+    def _set_connected(self, connected):
+        now = time.monotonic()
+        with self._lock:
+            if connected:
+                self._connects += 1
+                self._connected_since = now
+            elif self._connected_since is not None:
+                self._connected_total += now - self._connected_since
+                self._connected_since = None
+        self.is_connected = connected
+        self.connection_changed.emit(connected)
+
+    def _record_probe(self, seconds, ok, port):
+        with self._lock:
+            self._checks += 1
+            self._latencies.append(seconds * 1000.0)
+            if not ok:
+                self._probe_failures += 1
+        if not ok:
+            self._record_error(f"{port}: sem resposta serial")
+
+    def _record_error(self, message):
+        with self._lock:
+            self._last_error = message
+            self._last_error_time = time.time()
+
+    def get_health(self):
+        """Retorna um retrato das métricas de saúde da conexão (dict)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            connected_for = (
+                time.monotonic() - self._connected_since if self._connected_since is not None else 0.0
+            )
+
+            def percentile(fraction):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(fraction * (len(latencies) - 1) + 0.5))], 1)
+
+            return {
+                "port": self.current_port,
+                "connected": self.is_connected,
+                "checks": self._checks,
+                "probe_failures": self._probe_failures,
+                "probe_p50_ms": percentile(0.50),
+                "probe_p95_ms": percentile(0.95),
+                "probe_max_ms": round(latencies[-1], 1) if latencies else None,
+                "reconnects": max(0, self._connects - 1),
+                "connected_for_s": round(connected_for, 1),
+                "connected_total_s": round(self._connected_total + connected_for, 1),
+                "last_error": self._last_error,
+                "last_error_time": self._last_error_time,
+                "status_suppressed": self._status_suppressed,
+            }
+
+    # -----------------------------------------
+    # Emissão de status agrupada
+    # -----------------------------------------
+    def _emit_status(self, message):
+        """Emite status_updated só quando a mensagem muda, no máximo a cada STATUS_MIN_INTERVAL"""
+        with self._lock:
+            if message == (self._pending_status or self._last_status):
+                self._status_suppressed += 1
+                return
+            if self._pending_status is not None:
+                self._status_suppressed += 1  # substituída antes de ser emitida
+            self._pending_status = message
+        self._flush_status()
+        self._wake.set()  # se ficou pendente, o loop agenda a emissão
+
+    def _flush_status(self):
+        """Emite o status pendente se o intervalo mínimo já passou"""
+        with self._lock:
+            message = self._pending_status
+            now = time.monotonic()
+            if message is None or now - self._last_status_time < self.STATUS_MIN_INTERVAL:
+                return
+            self._pending_status = None
+            self._last_status = message
+            self._last_status_time = now
+        self.status_updated.emit(message)
     
     def set_port(self, port):
         """Define qual porta monitorar"""
         self.current_port = port
         self._check_connection()
     
+    def pause(self):
+        """Suspende as sondagens (ex.: porta em uso pela leitura de telemetria)"""
+        self.paused = True
+
+    def resume(self):
+        """Retoma as sondagens imediatamente"""
+        self.paused = False
+        self._wake.set()
+
+    def set_check_interval(self, seconds):
+        """Muda o intervalo entre sondagens (ex.: mais lento com a aba escondida)"""
+        self.check_interval = seconds
+        self._wake.set()
+
     def get_available_ports(self):
         """Retorna lista de portas disponíveis"""
         return [p.device for p in serial.tools.list_ports.comports()]
@@ -87,5 +234,6 @@ class ArduinoMonitor(QObject):
     def stop(self):
         """Para o monitoramento"""
         self.is_running = False
+        self._wake.set()
         if self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=1)
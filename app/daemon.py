@@ -0,0 +1,489 @@
+"""
+daemon.py - Daemon local de controle das fachadas
+
+Mantém as portas seriais abertas (abrir a porta reinicia a maioria dos
+Arduinos, então cada comando não paga mais o boot de ~2 s) e aceita comandos
+de qualquer processo local por um socket Unix (ou 127.0.0.1:<porta> onde não
+há AF_UNIX). Scripts de cron, scripts da loja e a própria interface podem ser
+clientes.
+
+Protocolo: uma requisição JSON por linha e uma resposta JSON por linha.
+
+    {"id": 1, "cmd": "preset", "port": "/dev/ttyUSB0", "mes": 12}
+    {"id": 1, "ok": true, "result": {"latency_ms": 3.1}}
+
+Comandos:
+    ping                                  responde "pong"
+    devices                               portas disponíveis e portas abertas pelo daemon
+    open {port}, close {port}             abre/fecha (e mantém aberta) uma porta
+    presets                               presets mensais salvos
+    select {port, effect}                 efeito da flash pelo índice
+    preset {port, mes}                    envia os parâmetros do preset salvo do mês
+    push {port, params}                   envia parâmetros (formato dos presets)
+    frame {port, rgb, start=0}            quadro RGB em base64 a partir do LED `start`
+    play {port, path, loop=false}         reproduz uma sequência .pals (app/frame_sequence.py)
+    stop {port}                           interrompe a reprodução
+    status                                contadores de cada porta
+
+`preset`, `push`, `frame` e `play` precisam de um firmware gerado com
+config["live_control"] (fragmento "live_control"); `select` cai no comando
+de texto (parseInt) quando a porta não foi aberta com `live=True`. Qualquer
+comando manual em uma porta interrompe a sequência que estiver tocando nela.
+
+Uso:
+    python -m app.daemon serve
+    python -m app.daemon call preset port=/dev/ttyUSB0 mes=12
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from app.config_manager import load_config
+from app.firmware_generator import EFFECT_STRUCT_BYTES, FirmwareGenerator
+from app.frame_sequence import FrameSequence, FrameSequenceError
+from app.presets_manager import PresetsManager
+from app.serial_utils import close_serial_port, detect_arduino_ports, get_available_ports, open_serial_port
+
+# Effect do comando P: sem preenchimento, little-endian (o firmware lê campo a campo)
+EFFECT_STRUCT = struct.Struct("<BBBBBBBHHBH")
+assert EFFECT_STRUCT.size == EFFECT_STRUCT_BYTES
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "phoneaid-led.sock")
+DEFAULT_TCP_PORT = 8765
+BOOT_DELAY = 2.0
+ACK_TIMEOUT = 1.0
+
+
+class DaemonError(RuntimeError):
+    """Erro devolvido pelo daemon (ou falha de comunicação com ele)"""
+
+
+def daemon_address(config=None):
+    """Endereço do daemon: caminho do socket Unix ou ("127.0.0.1", porta)"""
+    config = config or {}
+    if hasattr(socket, "AF_UNIX"):
+        return config.get("daemon_socket") or DEFAULT_SOCKET
+    return ("127.0.0.1", int(config.get("daemon_port", DEFAULT_TCP_PORT)))
+
+
+def live_packet(cmd, payload=b""):
+    """Comando do fragmento live_control: "L" + comando + dados + XOR de comando e dados"""
+    body = cmd + payload
+    checksum = 0
+    for byte in body:
+        checksum ^= byte
+    return b"L" + body + bytes((checksum,))
+
+
+# -----------------------------------------
+# Conexão com uma placa
+# -----------------------------------------
+class LiveDevice:
+    """
+    Porta serial mantida aberta. Os comandos são serializados por um lock;
+    com `live=True` cada comando espera o "K"/"E" do firmware e mede a latência.
+    """
+
+    def __init__(self, port, baudrate=9600, total_leds=92, config=None, live=True,
+                 boot_delay=BOOT_DELAY, ack_timeout=ACK_TIMEOUT):
+        self.port = port
+        self.total_leds = total_leds
+        self.live = live
+        self.generator = FirmwareGenerator(total_leds, config or {})
+        self.ser = open_serial_port(port, baudrate, timeout=ack_timeout)
+        if self.ser is None:
+            raise DaemonError(f"Não foi possível abrir {port}")
+        self.ready_at = time.monotonic() + boot_delay  # a placa reinicia ao abrir a porta
+        self.ack_timeout = ack_timeout
+        self.lock = threading.Lock()
+        self.stats = {"commands": 0, "errors": 0, "frames": 0, "last_latency_ms": None}
+
+    def close(self):
+        with self.lock:
+            close_serial_port(self.ser)
+
+    def _wait_ready(self):
+        delay = self.ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _wait_ack(self, cmd):
+        """Lê até "K<cmd>" ou "E<cmd>" (outros bytes, como telemetria, são ignorados)"""
+        deadline = time.monotonic() + self.ack_timeout
+        previous = None
+        while time.monotonic() < deadline:
+            data = self.ser.read(1)
+            if not data:
+                continue
+            if previous in (b"K", b"E") and data == cmd:
+                return previous == b"K"
+            previous = data
+        raise DaemonError(f"{self.port}: sem resposta ao comando {cmd.decode()}")
+
+    def _send(self, data, cmd=None):
+        """Envia bytes; com `cmd`, espera a confirmação. Retorna a latência em ms"""
+        with self.lock:
+            self._wait_ready()
+            start = time.perf_counter()
+            if cmd is not None:
+                self.ser.reset_input_buffer()
+            self.ser.write(data)
+            self.ser.flush()
+            self.stats["commands"] += 1
+            if cmd is not None and not self._wait_ack(cmd):
+                self.stats["errors"] += 1
+                raise DaemonError(f"{self.port}: firmware recusou o comando {cmd.decode()}")
+            latency = round((time.perf_counter() - start) * 1000, 2)
+            self.stats["last_latency_ms"] = latency
+            return latency
+
+    def _require_live(self, what):
+        if not self.live:
+            raise DaemonError(f"{what} precisa de firmware com live_control (porta aberta com live=true)")
+
+    def select(self, effect):
+        effect = int(effect)
+        if not 0 <= effect <= 255:
+            raise DaemonError(f"Efeito inválido: {effect}")
+        if self.live:
+            return self._send(live_packet(b"S", bytes((effect,))), b"S")
+        return self._send(f"{effect}\n".encode("ascii"))
+
+    def push(self, params):
+        """Substitui o efeito ativo pelos parâmetros (formato dos presets)"""
+        self._require_live("push")
+        if params.get("tipo") == "Linha do tempo":
+            raise DaemonError("Linha do tempo usa tabela na flash; selecione o efeito gravado com 'select'")
+        fields = self.generator.effect_fields(params)
+        fields = fields[:8] + (min(0xFFFF, max(0, int(fields[8]))),) + fields[9:]
+        return self._send(live_packet(b"P", EFFECT_STRUCT.pack(*fields)), b"P")
+
+    def frame(self, rgb, start=0):
+        """Quadro RGB (3 bytes por LED) a partir do LED `start`"""
+        self._require_live("frame")
+        count = len(rgb) // 3
+        if len(rgb) % 3 or start < 0 or start + count > self.total_leds:
+            raise DaemonError(f"Quadro inválido: {len(rgb)} bytes a partir do LED {start} "
+                              f"({self.total_leds} LEDs)")
+        latency = self._send(live_packet(b"F", struct.pack("<HH", start, count) + rgb), b"F")
+        self.stats["frames"] += 1
+        return latency
+
+
+class SequenceStreamer(threading.Thread):
+    """
+    Envia uma FrameSequence para a placa no fps da sequência. O quadro vem do
+    relógio: se a serial não acompanhar, quadros são pulados em vez de atrasar.
+    """
+
+    def __init__(self, device, sequence, loop=False):
+        super().__init__(daemon=True)
+        self.device = device
+        self.sequence = sequence
+        self.loop = loop
+        self.is_running = True
+        self.sent = 0
+        self.skipped = 0
+
+    def run(self):
+        sequence = self.sequence
+        scratch = bytearray(sequence.frame_size)
+        start = time.monotonic()
+        shown = None
+        try:
+            while self.is_running:
+                elapsed = time.monotonic() - start
+                index = sequence.index_at(elapsed, self.loop)
+                if index is None:
+                    break
+                if index != shown:
+                    if shown is not None:
+                        self.skipped += (index - shown - 1) % len(sequence)
+                    self.device.frame(sequence.frame_rgb(index, scratch))
+                    self.sent += 1
+                    shown = index
+                next_frame = start + (int(elapsed * sequence.fps) + 1) / sequence.fps
+                time.sleep(max(0.0, next_frame - time.monotonic()))
+        except DaemonError as e:
+            print(f"Aviso: reprodução em {self.device.port} interrompida: {e}")
+        finally:
+            self.is_running = False
+            sequence.close()
+
+    def stop(self):
+        self.is_running = False
+        if self.is_alive() and self is not threading.current_thread():
+            self.join(timeout=2)
+
+
+# -----------------------------------------
+# Daemon
+# -----------------------------------------
+class ControlDaemon:
+    """Despacha os comandos do protocolo; `serve_forever` atende o socket"""
+
+    def __init__(self, config=None, address=None, presets_manager=None):
+        self.config = config if config is not None else load_config()
+        self.address = address or daemon_address(self.config)
+        self.presets_manager = presets_manager or PresetsManager()
+        self.devices = {}
+        self.streamers = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    # ----- comandos -----
+    def _stop_streamer(self, port):
+        with self._lock:
+            streamer = self.streamers.pop(port, None)
+        if streamer is not None:
+            streamer.stop()
+        return streamer
+
+    def _device(self, request):
+        port = request.get("port")
+        self._stop_streamer(port)
+        with self._lock:
+            device = self.devices.get(port)
+        if device is None:
+            device = self._open(request)
+        return device
+
+    def _open(self, request):
+        port = request.get("port")
+        if not port:
+            raise DaemonError("Informe a porta ('port')")
+        with self._lock:
+            if port not in self.devices:
+                self.devices[port] = LiveDevice(
+                    port,
+                    baudrate=int(self.config.get("serial_baud", 9600)),
+                    total_leds=int(self.config.get("total_leds", 92)),
+                    config=self.config,
+                    live=bool(request.get("live", self.config.get("live_control", False))),
+                )
+            return self.devices[port]
+
+    def cmd_ping(self, request):
+        return "pong"
+
+    def cmd_devices(self, request):
+        return {"available": get_available_ports(), "arduino": detect_arduino_ports(),
+                "open": sorted(self.devices)}
+
+    def cmd_open(self, request):
+        device = self._open(request)
+        return {"port": device.port, "live": device.live}
+
+    def cmd_close(self, request):
+        self._stop_streamer(request.get("port"))
+        with self._lock:
+            device = self.devices.pop(request.get("port"), None)
+        if device is not None:
+            device.close()
+        return {"closed": device is not None}
+
+    def cmd_presets(self, request):
+        return [{"mes": p.get("mes"), "nome_mes": p.get("nome_mes"), "tipo": p.get("tipo"),
+                 "ativo": p.get("ativo")} for p in self.presets_manager.get_all_presets()]
+
+    def cmd_select(self, request):
+        return {"latency_ms": self._device(request).select(request.get("effect", 0))}
+
+    def cmd_preset(self, request):
+        preset = self.presets_manager.get_preset(int(request.get("mes", 0)))
+        if preset is None:
+            raise DaemonError(f"Preset do mês {request.get('mes')} não existe")
+        return {"latency_ms": self._device(request).push(preset)}
+
+    def cmd_push(self, request):
+        params = request.get("params")
+        if not isinstance(params, dict):
+            raise DaemonError("'params' precisa ser um objeto no formato dos presets")
+        return {"latency_ms": self._device(request).push(params)}
+
+    def cmd_frame(self, request):
+        try:
+            rgb = base64.b64decode(request.get("rgb", ""), validate=True)
+        except ValueError as e:
+            raise DaemonError(f"'rgb' inválido (base64): {e}") from e
+        return {"latency_ms": self._device(request).frame(rgb, int(request.get("start", 0)))}
+
+    def cmd_play(self, request):
+        device = self._device(request)
+        try:
+            sequence = FrameSequence(request.get("path", ""))
+        except FrameSequenceError as e:
+            raise DaemonError(str(e)) from e
+        if sequence.led_count > device.total_leds:
+            sequence.close()
+            raise DaemonError(f"Sequência de {sequence.led_count} LEDs; a placa tem {device.total_leds}")
+        streamer = SequenceStreamer(device, sequence, bool(request.get("loop", False)))
+        with self._lock:
+            self.streamers[device.port] = streamer
+        streamer.start()
+        return {"frames": len(sequence), "fps": sequence.fps, "duration_s": round(sequence.duration, 3)}
+
+    def cmd_stop(self, request):
+        streamer = self._stop_streamer(request.get("port"))
+        if streamer is None:
+            return {"stopped": False}
+        return {"stopped": True, "sent": streamer.sent, "skipped": streamer.skipped}
+
+    def cmd_status(self, request):
+        with self._lock:
+            status = {port: dict(device.stats, live=device.live) for port, device in self.devices.items()}
+            for port, streamer in self.streamers.items():
+                if port in status:
+                    status[port]["playing"] = {"path": streamer.sequence.path, "running": streamer.is_running,
+                                               "sent": streamer.sent, "skipped": streamer.skipped}
+            return status
+
+    def handle(self, request):
+        """Executa uma requisição (dict) e devolve a resposta (dict)"""
+        response = {"id": request.get("id")}
+        handler = getattr(self, f"cmd_{request.get('cmd')}", None)
+        if handler is None:
+            response.update(ok=False, error=f"Comando desconhecido: {request.get('cmd')}")
+            return response
+        try:
+            response.update(ok=True, result=handler(request))
+        except (DaemonError, ValueError, TypeError, OSError) as e:
+            response.update(ok=False, error=str(e))
+        return response
+
+    # ----- socket -----
+    def serve_forever(self):
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        response = daemon.handle(request if isinstance(request, dict) else {})
+                    except ValueError as e:
+                        response = {"id": None, "ok": False, "error": f"JSON inválido: {e}"}
+                    self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)  # socket de uma execução anterior
+            server_class = type("Server", (socketserver.ThreadingUnixStreamServer,), {"daemon_threads": True})
+            self._server = server_class(self.address, Handler)
+            os.chmod(self.address, 0o600)  # só o usuário do daemon
+        else:
+            server_class = type("Server", (socketserver.ThreadingTCPServer,),
+                                {"daemon_threads": True, "allow_reuse_address": True})
+            self._server = server_class(self.address, Handler)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+            for port in list(self.streamers):
+                self._stop_streamer(port)
+            for device in list(self.devices.values()):
+                device.close()
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+# -----------------------------------------
+# Cliente
+# -----------------------------------------
+class DaemonClient:
+    """Cliente do daemon: `call("preset", port=..., mes=12)` devolve o `result`"""
+
+    def __init__(self, address=None, timeout=5.0):
+        self.address = address or daemon_address(load_config())
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        try:
+            self.sock.connect(self.address)
+        except OSError as e:
+            self.sock.close()
+            raise DaemonError(f"Daemon não encontrado em {self.address}: {e}") from e
+        self.reader = self.sock.makefile("rb")
+        self._next_id = 0
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, cmd, **args):
+        self._next_id += 1
+        request = dict(args, cmd=cmd, id=self._next_id)
+        self.sock.sendall(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise DaemonError("Daemon fechou a conexão")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error", "erro desconhecido"))
+        return response.get("result")
+
+    def frame(self, port, rgb, start=0):
+        return self.call("frame", port=port, rgb=base64.b64encode(bytes(rgb)).decode("ascii"), start=start)
+
+
+def _parse_value(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daemon local de controle dos LEDs")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("serve", help="inicia o daemon")
+    call = sub.add_parser("call", help="envia um comando ao daemon")
+    call.add_argument("cmd")
+    call.add_argument("args", nargs="*", help="nome=valor (valores em JSON quando possível)")
+    args = parser.parse_args(argv)
+
+    if args.action == "serve":
+        daemon = ControlDaemon()
+        print(f"Daemon em {daemon.address} (Ctrl+C para sair)")
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    params = {}
+    for item in args.args:
+        name, _, value = item.partition("=")
+        params[name] = _parse_value(value)
+    try:
+        with DaemonClient() as client:
+            print(json.dumps(client.call(args.cmd, **params), indent=2, ensure_ascii=False))
+    except DaemonError as e:
+        print(f"Erro: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+effect_kernels.py - Arco-íris, Cintilar e Fogo em Python, iguais ao firmware
+
+No Arduino esses efeitos usam as funções inteiras de 8 bits do FastLED
+(sin8, random8, random16, qadd8, qsub8). Aqui elas são reproduzidas bit a bit
+(mesmas fórmulas da implementação em C do FastLED 3.x) e cada efeito tem um
+kernel que trabalha com tabelas de 256 entradas e `bytes.translate`, em vez
+de calcular LED por LED em Python.
+
+O gerador pseudoaleatório é o do FastLED (rand16seed * 2053 + 13849),
+semeado com o campo `semente` do preset ao selecionar o efeito: o preview
+mostra as mesmas faíscas, na mesma ordem, que o dispositivo.
+"""
+
+# Tabela de sin8() do FastLED (b_m16_interleave)
+_SIN8_SECTIONS = (0, 49, 49, 41, 90, 27, 117, 10)
+
+# Parâmetros padrão de Cintilar e Fogo (1337 é a semente inicial do FastLED)
+DEFAULT_DENSITY = 96
+DEFAULT_SEED = 1337
+
+# Fogo: resfriamento do Fire2012 (COOLING)
+FIRE_COOLING = 55
+# Cintilar: quanto cada LED apaga por quadro
+TWINKLE_FADE = 20
+# Arco-íris: quanto o matiz anda por quadro
+RAINBOW_STEP = 4
+
+# Orçamento de desempenho no Arduino Uno (16 MHz) com 92 LEDs em uma porta:
+# apply_effect() + FastLED.show() (24 bits x 1,25 us por LED) precisam caber no
+# período de `min_fps`. Conferido por tools/bench_firmware.py.
+BUDGET_LEDS = 92
+COST_BUDGETS = {
+    "Arco-íris": {"min_fps": 120},
+    "Cintilar": {"min_fps": 120},
+    "Fogo": {"min_fps": 60},
+}
+
+
+def show_us(total_leds, ports=1):
+    """Tempo estimado do FastLED.show() (sinal WS2812) em microssegundos"""
+    return total_leds * ports * 24 * 1.25
+
+
+def apply_budget_us(effect_type, total_leds=BUDGET_LEDS):
+    """Tempo máximo de apply_effect() que mantém o efeito acima de min_fps (ou None)"""
+    budget = COST_BUDGETS.get(effect_type)
+    if budget is None:
+        return None
+    return 1e6 / budget["min_fps"] - show_us(total_leds)
+
+
+# -----------------------------------------
+# Primitivas de 8 bits do FastLED
+# -----------------------------------------
+def sin8(theta):
+    """sin8() do FastLED: seno aproximado, 0..255 -> 1..255"""
+    offset = 255 - theta if theta & 0x40 else theta
+    offset &= 0x3F
+    secoffset = (offset & 0x0F) + (1 if theta & 0x40 else 0)
+    section = offset >> 4
+    b, m16 = _SIN8_SECTIONS[section * 2], _SIN8_SECTIONS[section * 2 + 1]
+    y = (((m16 * secoffset) >> 4) & 0xFF) + b
+    if theta & 0x80:
+        y = -y
+    return (y + 128) & 0xFF
+
+
+def qadd8(a, b):
+    return min(255, a + b)
+
+
+def qsub8(a, b):
+    return max(0, a - b)
+
+
+def lerp256(a, b, frac):
+    """(a * (256 - frac) + b * frac) >> 8, como lerp256() no firmware"""
+    return (a * (256 - frac) + b * frac) >> 8
+
+
+SIN8 = bytes(sin8(x) for x in range(256))
+
+
+class Random8:
+    """random8/random16 do FastLED com estado próprio (rand16seed)"""
+
+    def __init__(self, seed=1337):
+        self.seed = seed & 0xFFFF
+
+    def random16(self, lim=None):
+        self.seed = (self.seed * 2053 + 13849) & 0xFFFF
+        if lim is None:
+            return self.seed
+        return (self.seed * lim) >> 16
+
+    def random8(self, low=None, high=None):
+        """random8(), random8(lim) ou random8(min, lim)"""
+        seed = self.random16()
+        value = ((seed & 0xFF) + (seed >> 8)) & 0xFF
+        if low is None:
+            return value
+        if high is None:
+            return (value * low) >> 8
+        return ((value * ((high - low) & 0xFF)) >> 8) + low & 0xFF
+
+
+# -----------------------------------------
+# Kernels
+# -----------------------------------------
+class RainbowKernel:
+    """Arco-íris: sin8 defasado em cada canal; `wave_width` LEDs por volta"""
+
+    def __init__(self, total_leds, wave_width):
+        step = (65536 // max(1, wave_width)) & 0xFFFF
+        self.hues = bytes(((i * step) & 0xFFFF) >> 8 for i in range(total_leds))
+        self.phase = 0
+
+    def render_into(self, buf, size):
+        phase = self.phase
+        # Tabelas do quadro: matiz base -> canal, já com a fase somada
+        buf[0:size:3] = self.hues.translate(SIN8[phase:] + SIN8[:phase])
+        g = (phase + 85) & 0xFF
+        buf[1:size:3] = self.hues.translate(SIN8[g:] + SIN8[:g])
+        b = (phase + 170) & 0xFF
+        buf[2:size:3] = self.hues.translate(SIN8[b:] + SIN8[:b])
+        self.phase = (phase + RAINBOW_STEP) & 0xFF
+
+
+class TwinkleKernel:
+    """Cintilar: faíscas de color1 que apagam até color2"""
+
+    FADE = bytes(qsub8(x, TWINKLE_FADE) for x in range(256))
+
+    def __init__(self, total_leds, color1, color2, density, seed):
+        self.total_leds = total_leds
+        self.density = density
+        self.random = Random8(seed)
+        self.state = bytearray(total_leds)
+        self.luts = [bytes(lerp256(color2[ch], color1[ch], x) for x in range(256)) for ch in range(3)]
+
+    def render_into(self, buf, size):
+        n = self.total_leds
+        state = bytearray(self.state.translate(self.FADE))
+        random = self.random
+        for _ in range(1 + n // 32):
+            if random.random8() < self.density:
+                state[random.random16(n)] = 255
+        self.state = state
+        for ch in range(3):
+            buf[ch:size:3] = state.translate(self.luts[ch])
+
+
+def heat_color(heat, color1, color2):
+    """Fogo: preto -> color2 -> color1 -> branco, como heat_color() no firmware"""
+    t192 = ((heat * 191) >> 8) + (1 if heat else 0)
+    ramp = (t192 & 0x3F) << 2
+    if t192 & 0x80:
+        low, high = color1, (255, 255, 255)
+    elif t192 & 0x40:
+        low, high = color2, color1
+    else:
+        low, high = (0, 0, 0), color2
+    return tuple(lerp256(low[ch], high[ch], ramp) for ch in range(3))
+
+
+class FireKernel:
+    """Fogo (Fire2012): calor esfria, sobe pela fita e recebe faíscas no início"""
+
+    def __init__(self, total_leds, color1, color2, density, seed):
+        self.total_leds = total_leds
+        self.density = density
+        self.random = Random8(seed)
+        self.heat = bytearray(total_leds)
+        self.cooling = min(255, (FIRE_COOLING * 10) // max(1, total_leds) + 2)
+        colors = [heat_color(h, color1, color2) for h in range(256)]
+        self.luts = [bytes(color[ch] for color in colors) for ch in range(3)]
+
+    def render_into(self, buf, size):
+        heat = self.heat
+        n = self.total_leds
+        random8 = self.random.random8
+        cooling = self.cooling
+        # 1. esfria cada célula (sequência do gerador: uma chamada por LED, em ordem)
+        for i in range(n):
+            heat[i] = qsub8(heat[i], random8(0, cooling))
+        # 2. o calor sobe: cada célula vira a média ponderada das duas de baixo (valores antigos)
+        if n > 2:
+            heat[2:] = bytes(map(lambda a, b: (a + b + b) // 3, heat[1:n - 1], heat[0:n - 2]))
+        # 3. faísca perto da base
+        if random8() < self.density:
+            y = random8(7)
+            if y < n:
+                heat[y] = qadd8(heat[y], random8(160, 255))
+        for ch in range(3):
+            buf[ch:size:3] = heat.translate(self.luts[ch])
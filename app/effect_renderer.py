@@ -0,0 +1,192 @@
+"""
+effect_renderer.py - Renderização dos efeitos sem depender da interface
+
+Gera os quadros RGB (3 bytes por LED) que o preview exibe. Não usa Qt, então
+pode rodar em uma thread de fundo.
+"""
+from app.effect_kernels import DEFAULT_DENSITY, DEFAULT_SEED, FireKernel, RainbowKernel, TwinkleKernel
+from app.native_preview import MAX_NATIVE_LEDS, load_backend
+from app.timeline import FRAME_MS, Timeline, encode_timeline
+
+SPEED_MS = {
+    "Lento": 300,
+    "Médio": 150,
+    "Rápido": 70,
+    "Turbo": 30
+}
+
+EFFECT_TYPES = ["Cor sólida", "Gradiente", "Onda", "Linha do tempo", "Arco-íris", "Cintilar", "Fogo"]
+
+
+def speed_to_ms(speed_label):
+    """Mapeia label de velocidade para milissegundos (padrão: Médio)"""
+    return SPEED_MS.get(speed_label, 150)
+
+
+def to_rgb(color):
+    """Aceita "#RRGGBB" ou tupla (r, g, b) e retorna tupla de inteiros"""
+    if isinstance(color, str):
+        color = color.lstrip("#")
+        if len(color) == 6:
+            return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+        return (255, 0, 0)
+    return tuple(int(c) for c in color[:3])
+
+
+class EffectRenderer:
+    """
+    Renderiza um efeito quadro a quadro em um buffer RGB.
+    O estado da animação (índice da onda, tempo da linha do tempo) fica aqui,
+    não na interface.
+
+    Os quadros são os mesmos do firmware (matemática inteira de mix8 em
+    app/firmware_fragments.py). Com `use_native=True` e um compilador C++
+    disponível, as próprias funções do firmware desenham cada quadro (ver
+    app/native_preview.py); senão, as tabelas em Python abaixo, equivalentes
+    byte a byte.
+    """
+
+    def __init__(self, total_leds, use_native=True):
+        self.total_leds = total_leds
+        self.effect_type = "Cor sólida"
+        self.color1 = (255, 0, 0)
+        self.color2 = (0, 0, 255)
+        self.speed_ms = speed_to_ms("Médio")
+        self.wave_width = max(1, total_leds // 4)
+        self.density = DEFAULT_DENSITY
+        self.seed = DEFAULT_SEED
+        self.use_native = use_native and 0 < total_leds <= MAX_NATIVE_LEDS
+        self._native = None
+        self._native_context = None
+        self._native_effect = None
+        self._timeline = None
+        self._timeline_data = None
+        self._kernel = None
+        self.reset()
+        self._build_tables()
+
+    def set_params(self, params):
+        """Define o efeito a partir de um dict no formato dos presets"""
+        self.effect_type = params.get("tipo", "Cor sólida")
+        self.color1 = to_rgb(params.get("color1", "#FF0000"))
+        self.color2 = to_rgb(params.get("color2", "#0000FF"))
+        self.speed_ms = speed_to_ms(params.get("velocidade", "Médio"))
+        self.wave_width = max(1, int(params.get("wave_width", self.wave_width)))
+        self.density = max(0, min(255, int(params.get("densidade", DEFAULT_DENSITY))))
+        self.seed = int(params.get("semente", DEFAULT_SEED)) & 0xFFFF
+        self._timeline = None
+        if self.effect_type == "Linha do tempo":
+            # Mesmo período de quadro e mesma tabela que o firmware usa
+            self.speed_ms = FRAME_MS
+            self._timeline = Timeline.from_preset(params, self.total_leds)
+            self._timeline_data = encode_timeline(self._timeline)
+        if self.use_native and self._native is None:
+            # Compila na primeira troca de efeito (roda na thread do preview, não na GUI)
+            self._native = load_backend()
+            self.use_native = self._native is not None
+            if self._native is not None:
+                # Biblioteca compartilhada, estado do efeito só deste renderizador
+                self._native_context = self._native.new_context()
+        self._build_tables()
+
+    @property
+    def native(self):
+        """True quando os quadros vêm do código do firmware compilado para o host"""
+        return self._native is not None
+
+    def reset(self):
+        """Volta a animação para o primeiro quadro"""
+        self.wave_index = 0
+        self.elapsed_ms = 0
+        self._native_reset = True
+        if self._kernel is not None:
+            self._kernel = self._make_kernel()
+
+    def frame_size(self):
+        return self.total_leds * 3
+
+    def _build_tables(self):
+        """Pré-calcula os quadros do efeito; renderizar vira só copiar bytes.
+
+        Cor sólida e Gradiente são estáticos no firmware: um quadro fixo. A
+        Onda é uma rampa de wave_width LEDs que gira pela fita: guardamos o
+        quadro com wave_index=0 duas vezes seguidas, e cada quadro é uma fatia
+        contínua dele. A Linha do tempo calcula uma cor por segmento a cada
+        quadro (app/timeline.py) e repete cada cor pelo trecho do segmento.
+        Arco-íris, Cintilar e Fogo usam os kernels de app/effect_kernels.py,
+        que guardam o próprio estado (fase, brilho ou calor de cada LED).
+        """
+        n = self.total_leds
+        c1, c2 = self.color1, self.color2
+
+        if self._native is not None:
+            effect_type = EFFECT_TYPES.index(self.effect_type) if self.effect_type in EFFECT_TYPES else 0
+            # Na linha do tempo wave_width é a posição da tabela (a única, no início)
+            wave_width = 0 if self._timeline is not None else min(self.wave_width, 0xFFFF)
+            self._native_effect = self._native.make_effect(
+                effect_type, c1, c2, self.speed_ms, wave_width, self.density, self.seed
+            )
+            self._native_reset = True  # estado do efeito no código nativo é do efeito anterior
+            return
+
+        self._kernel = self._make_kernel()
+        if self._timeline is not None or self._kernel is not None:
+            return
+
+        if self.effect_type == "Gradiente":
+            span = max(1, n - 1)
+            self._frames = (bytes(
+                (c1[ch] * (span - i) + c2[ch] * i) // span for i in range(n) for ch in range(3)
+            ),)
+
+        elif self.effect_type == "Onda":
+            w = self.wave_width
+            ramp = bytes(
+                (c1[ch] * (w - k) + c2[ch] * k) // w for k in range(min(w, n)) for ch in range(3)
+            )
+            base = ramp + bytes(c2) * (n - min(w, n))
+            self._wave_tiles = memoryview(base * 2)
+
+        else:
+            self._frames = (bytes(c1) * n,)
+
+    def _make_kernel(self):
+        """Kernel com estado do efeito atual (estado inicial) ou None"""
+        n = self.total_leds
+        if self.effect_type == "Arco-íris":
+            return RainbowKernel(n, self.wave_width)
+        if self.effect_type == "Cintilar":
+            return TwinkleKernel(n, self.color1, self.color2, self.density, self.seed)
+        if self.effect_type == "Fogo":
+            return FireKernel(n, self.color1, self.color2, self.density, self.seed)
+        return None
+
+    def render_into(self, buf, advance=True):
+        """Escreve o quadro atual em `buf` (bytearray, in-place) e, se `advance`, avança a animação"""
+        size = self.total_leds * 3
+
+        if self._native is not None:
+            next_index = self._native.render(
+                self._native_context, self._native_effect, buf, self.total_leds, self.wave_index,
+                self.elapsed_ms, self._timeline_data, self._native_reset
+            )
+            self._native_reset = False
+            if advance:
+                self.wave_index = next_index
+        elif self._timeline is not None:
+            buf[0:size] = self._timeline.render(self.elapsed_ms, self.total_leds)
+        elif self._kernel is not None:
+            # Efeitos com estado avançam a cada quadro desenhado, como no firmware
+            self._kernel.render_into(buf, size)
+        elif self.effect_type == "Onda":
+            # LED i usa a cor (i - wave_index) do quadro base: fatia deslocada
+            start = (-self.wave_index % self.total_leds) * 3
+            buf[0:size] = self._wave_tiles[start:start + size]
+            if advance:
+                self.wave_index = (self.wave_index + 1) % self.total_leds
+        else:
+            buf[0:size] = self._frames[0]
+
+        if advance:
+            self.elapsed_ms += self.speed_ms
+        return buf
@@ -7,111 +7,114 @@
 // Portas de dados para cada saída de LEDs (referência)
 const uint8_t DATA_PINS[NUM_PORTS] = {2, 3, 4, 5, 6, 7};
 
-// Array de arrays para armazenar LEDs de cada porta
-CRGB leds[NUM_PORTS][NUM_LEDS];
+// Buffer único da fachada (índices lógicos); cada porta envia o seu trecho
+CRGB leds[NUM_LEDS];
 
 // Struct para definir cada efeito
 struct Effect {
-    const char* name;
-    uint8_t type;        // 0=Solid, 1=Gradient, 2=Wave
+    uint8_t type;        // 0=Solid, 1=Gradient, 2=Wave, 3=Timeline, 4=Rainbow, 5=Twinkle, 6=Fire, 7=Baked
     uint8_t r1, g1, b1;
     uint8_t r2, g2, b2;
     uint16_t speed_ms;
-    uint16_t wave_width;
-} effects[] = {
-    {"Default", 0, 255, 0, 0, 0, 0, 0, 300, 0}
+    uint16_t wave_width; // Timeline/Baked: posição da tabela em TIMELINE_DATA/BAKED_DATA
+    uint8_t density;     // Twinkle/Fire: chance de faísca por quadro (0-255)
+    uint16_t seed;       // semente do random8 do FastLED
+};
+
+// Tabela de efeitos fica na flash; só o efeito atual é copiado para a RAM
+const Effect effects[] PROGMEM = {
+    {2, 255, 0, 0, 0, 170, 0, 150, 5, 96, 1337},  // Janeiro
 };
 
 #define NUM_EFFECTS (sizeof(effects) / sizeof(effects[0]))
+#define DEFAULT_EFFECT 0
 
+Effect active_effect;
 uint8_t current_effect = 0;
 uint32_t last_update = 0;
+bool needs_render = true;   // efeito atual ainda não foi desenhado
+bool frame_dirty = false;   // buffer mudou desde o último FastLED.show()
 uint16_t wave_index = 0;
 
 void setup() {
     // Configura FastLED para todas as portas (chamadas geradas com pinos constantes)
-    FastLED.addLeds<WS2812B, 2, GRB>(leds[0], NUM_LEDS);
-    FastLED.addLeds<WS2812B, 3, GRB>(leds[1], NUM_LEDS);
-    FastLED.addLeds<WS2812B, 4, GRB>(leds[2], NUM_LEDS);
-    FastLED.addLeds<WS2812B, 5, GRB>(leds[3], NUM_LEDS);
-    FastLED.addLeds<WS2812B, 6, GRB>(leds[4], NUM_LEDS);
-    FastLED.addLeds<WS2812B, 7, GRB>(leds[5], NUM_LEDS);
+    FastLED.addLeds<WS2812B, 2, GRB>(leds, 0, 46);
+    FastLED.addLeds<WS2812B, 3, GRB>(leds, 0, 46);
+    FastLED.addLeds<WS2812B, 4, GRB>(leds, 0, 46);
+    FastLED.addLeds<WS2812B, 5, GRB>(leds, 0, 46);
+    FastLED.addLeds<WS2812B, 6, GRB>(leds, 0, 46);
+    FastLED.addLeds<WS2812B, 7, GRB>(leds, 0, 46);
     FastLED.setBrightness(255);
-    Serial.begin(9600);
+    select_effect(DEFAULT_EFFECT);
 }
 
 void loop() {
-    apply_effect(effects[current_effect]);
-    
-    // Mostra efeito (FastLED.show atualiza todos os controladores registrados)
-    FastLED.show();
-    
-    // Recebe comando serial se disponível
-    if (Serial.available()) {
-        int effect_num = Serial.parseInt();
-        if (effect_num >= 0 && effect_num < NUM_EFFECTS) {
-            current_effect = effect_num;
-            wave_index = 0;
-        }
+
+    apply_effect(active_effect);
+
+    // FastLED.show() desliga interrupções (~30us por LED e porta): só envia quando o buffer mudou
+    if (frame_dirty) {
+        FastLED.show();
+        frame_dirty = false;
     }
 }
 
+void select_effect(uint8_t effect_num) {
+    current_effect = effect_num;
+    memcpy_P(&active_effect, &effects[effect_num], sizeof(Effect));
+    wave_index = 0;
+    needs_render = true;
+}
+
+bool effect_is_static(const Effect& effect) {
+    // Só os efeitos animados incluídos mudam de quadro com o tempo
+    return effect.type != 2;
+}
+
 void apply_effect(Effect& effect) {
-    uint32_t now = millis();
-    if (now - last_update < effect.speed_ms) return;
-    last_update = now;
-    
+    if (effect_is_static(effect)) {
+        if (!needs_render) return;
+    } else {
+        uint32_t now = millis();
+        if (!needs_render && now - last_update < effect.speed_ms) return;
+        // Mantém o ritmo no período do efeito; se atrasou mais de um quadro, ressincroniza
+        last_update += effect.speed_ms;
+        if (needs_render || now - last_update >= effect.speed_ms) last_update = now;
+    }
+    needs_render = false;
+
     switch (effect.type) {
-        case 0:  // Cor Sólida
-            apply_solid(effect);
-            break;
-        case 1:  // Gradiente
-            apply_gradient(effect);
-            break;
         case 2:  // Onda
             apply_wave(effect);
             break;
     }
+    frame_dirty = true;
 }
 
-void apply_solid(Effect& effect) {
-    CRGB color(effect.r1, effect.g1, effect.b1);
-    for (int port = 0; port < NUM_PORTS; port++) {
-        fill_solid(leds[port], NUM_LEDS, color);
-    }
-}
-
-void apply_gradient(Effect& effect) {
-    for (int port = 0; port < NUM_PORTS; port++) {
-        for (int i = 0; i < NUM_LEDS; i++) {
-            float t = (float)i / (float)(NUM_LEDS - 1);
-            uint8_t r = (uint8_t)(effect.r1 * (1.0 - t) + effect.r2 * t);
-            uint8_t g = (uint8_t)(effect.g1 * (1.0 - t) + effect.g2 * t);
-            uint8_t b = (uint8_t)(effect.b1 * (1.0 - t) + effect.b2 * t);
-            leds[port][i] = CRGB(r, g, b);
-        }
-    }
+uint8_t mix8(uint8_t a, uint8_t b, uint16_t pos, uint16_t span) {
+    // a em pos=0, b em pos=span, truncado como no Python ((a*(span-pos) + b*pos) // span)
+    return (uint8_t)(((uint32_t)a * (span - pos) + (uint32_t)b * pos) / span);
 }
 
 void apply_wave(Effect& effect) {
     uint16_t wave_width = effect.wave_width;
-    
-    for (int port = 0; port < NUM_PORTS; port++) {
-        for (int i = 0; i < NUM_LEDS; i++) {
-            int relative_pos = (i - wave_index + NUM_LEDS) % NUM_LEDS;
-            float blend = 0.0;
-            
-            if (relative_pos < wave_width) {
-                blend = 1.0 - ((float)relative_pos / (float)wave_width);
-            }
-            
-            uint8_t r = (uint8_t)(effect.r1 * blend + effect.r2 * (1.0 - blend));
-            uint8_t g = (uint8_t)(effect.g1 * blend + effect.g2 * (1.0 - blend));
-            uint8_t b = (uint8_t)(effect.b1 * blend + effect.b2 * (1.0 - blend));
-            
-            leds[port][i] = CRGB(r, g, b);
+    CRGB tail(effect.r2, effect.g2, effect.b2);
+
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {
+        // sem (i - wave_index + NUM_LEDS): estoura o int de 16 bits do AVR com fitas longas
+        uint16_t relative_pos = i >= wave_index ? i - wave_index : i + (NUM_LEDS - wave_index);
+
+        // Rampa linear de color1 (frente da onda) até color2 ao longo de wave_width LEDs
+        if (relative_pos < wave_width) {
+            leds[i] = CRGB(
+                mix8(effect.r1, effect.r2, relative_pos, wave_width),
+                mix8(effect.g1, effect.g2, relative_pos, wave_width),
+                mix8(effect.b1, effect.b2, relative_pos, wave_width)
+            );
+        } else {
+            leds[i] = tail;
         }
     }
-    
+
     wave_index = (wave_index + 1) % NUM_LEDS;
 }
@@ -0,0 +1,788 @@
+"""
+firmware_fragments.py - Trechos de código do firmware com dependências declaradas
+
+O sketch é montado só com os fragmentos que os presets escolhidos usam: um
+firmware com apenas "Cor sólida" não leva o código do Gradiente, da Onda nem
+a mistura de cores que eles puxam. Cada fragmento declara:
+
+- requires: fragmentos dos quais depende (incluídos automaticamente)
+- flash_bytes: estimativa aproximada do custo em flash no AVR (avr-gcc -Os),
+  usada só para o relatório de economia
+- seções de código (includes, globals, setup, loop, functions) copiadas para
+  o esqueleto do sketch, e "hooks": trechos injetados em placeholders de
+  outros fragmentos (ex.: comandos dentro do leitor serial)
+
+Os textos são templates `str.format` (chaves dobradas), como o restante do
+gerador.
+"""
+
+from app.effect_kernels import FIRE_COOLING, RAINBOW_STEP, TWINKLE_FADE
+
+SECTIONS = ("includes", "globals", "setup", "loop", "functions")
+
+
+class Fragment:
+    """Trecho de firmware com dependências e custo estimado em flash"""
+
+    def __init__(self, name, requires=(), flash_bytes=0, effect_type=None,
+                 animated=False, hooks=None, **sections):
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Seções desconhecidas no fragmento {name}: {sorted(unknown)}")
+        self.name = name
+        self.requires = tuple(requires)
+        self.flash_bytes = flash_bytes
+        self.effect_type = effect_type  # código do efeito (Effect.type) implementado aqui
+        self.animated = animated        # efeito muda de quadro com o tempo
+        self.hooks = hooks or {}
+        self.sections = sections
+
+
+# Ordem da lista = ordem de emissão no sketch (o leitor serial precisa testar
+# o comando "T" antes do parseInt do número do efeito, por exemplo)
+FRAGMENTS = [
+    Fragment(
+        "core",
+        flash_bytes=2400,  # FastLED.show(), setup/loop, tabela e seleção de efeitos
+    ),
+    # Mistura inteira de duas cores: mesmo resultado no AVR, no host e no preview Python
+    Fragment(
+        "color_mix",
+        flash_bytes=140,  # divisão de 32 bits (__udivmodsi4)
+        functions='''
+uint8_t mix8(uint8_t a, uint8_t b, uint16_t pos, uint16_t span) {{
+    // a em pos=0, b em pos=span, truncado como no Python ((a*(span-pos) + b*pos) // span)
+    return (uint8_t)(((uint32_t)a * (span - pos) + (uint32_t)b * pos) / span);
+}}
+''',
+    ),
+    Fragment(
+        "effect_solid",
+        effect_type=0,
+        flash_bytes=90,
+        hooks={"effect_cases": '''        case 0:  // Cor Sólida
+            apply_solid(effect);
+            break;
+'''},
+        functions='''
+void apply_solid(Effect& effect) {{
+    fill_solid(leds, NUM_LEDS, CRGB(effect.r1, effect.g1, effect.b1));
+}}
+''',
+    ),
+    Fragment(
+        "effect_gradient",
+        requires=("color_mix",),
+        effect_type=1,
+        flash_bytes=220,
+        hooks={"effect_cases": '''        case 1:  // Gradiente
+            apply_gradient(effect);
+            break;
+'''},
+        functions='''
+void apply_gradient(Effect& effect) {{
+    uint16_t span = NUM_LEDS > 1 ? NUM_LEDS - 1 : 1;
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        leds[i] = CRGB(
+            mix8(effect.r1, effect.r2, i, span),
+            mix8(effect.g1, effect.g2, i, span),
+            mix8(effect.b1, effect.b2, i, span)
+        );
+    }}
+}}
+''',
+    ),
+    Fragment(
+        "effect_wave",
+        requires=("color_mix",),
+        effect_type=2,
+        animated=True,
+        flash_bytes=300,
+        hooks={
+            "effect_cases": '''        case 2:  // Onda
+            apply_wave(effect);
+            break;
+''',
+            "effect_reset": "    wave_index = 0;\n",
+        },
+        globals="uint16_t wave_index = 0;\n",
+        functions='''
+void apply_wave(Effect& effect) {{
+    uint16_t wave_width = effect.wave_width;
+    CRGB tail(effect.r2, effect.g2, effect.b2);
+
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        // sem (i - wave_index + NUM_LEDS): estoura o int de 16 bits do AVR com fitas longas
+        uint16_t relative_pos = i >= wave_index ? i - wave_index : i + (NUM_LEDS - wave_index);
+
+        // Rampa linear de color1 (frente da onda) até color2 ao longo de wave_width LEDs
+        if (relative_pos < wave_width) {{
+            leds[i] = CRGB(
+                mix8(effect.r1, effect.r2, relative_pos, wave_width),
+                mix8(effect.g1, effect.g2, relative_pos, wave_width),
+                mix8(effect.b1, effect.b2, relative_pos, wave_width)
+            );
+        }} else {{
+            leds[i] = tail;
+        }}
+    }}
+
+    wave_index = (wave_index + 1) % NUM_LEDS;
+}}
+''',
+    ),
+    # Keyframes de cores por segmento lidos de uma tabela compacta na flash (ver app/timeline.py)
+    Fragment(
+        "effect_timeline",
+        requires=("color_mix",),
+        effect_type=3,
+        animated=True,
+        flash_bytes=700,
+        hooks={
+            "effect_cases": '''        case 3:  // Linha do tempo
+            apply_timeline(effect);
+            break;
+''',
+            "effect_reset": "    timeline_start = millis();\n    timeline_rewind = true;\n",
+        },
+        globals='''
+// ===== Linha do tempo =====
+{timeline_table}
+#define TIMELINE_MAX_SEGMENTS {timeline_max_segments}
+uint32_t timeline_start = 0;
+bool timeline_rewind = true;
+// Só os dois keyframes em volta do instante atual ficam na RAM
+uint16_t tl_pos;              // próximo byte a ler na tabela
+uint16_t tl_left;             // keyframes ainda não lidos
+uint16_t tl_starts_pos;       // LED inicial de cada segmento (u16 LE)
+uint8_t tl_segments;
+uint8_t tl_mask_bytes;
+uint32_t tl_duration;
+uint32_t tl_from_ms, tl_to_ms;
+uint8_t tl_transition, tl_to_transition;
+uint8_t tl_from[TIMELINE_MAX_SEGMENTS][3];
+uint8_t tl_to[TIMELINE_MAX_SEGMENTS][3];
+''',
+        functions='''
+uint8_t ease_in_out8(uint8_t i) {{
+    // Quadrática de entrada e saída, como ease_in_out8() em app/timeline.py
+    uint8_t j = (i & 0x80) ? 255 - i : i;
+    uint8_t jj2 = (uint8_t)((((uint16_t)j * j) >> 8) << 1);
+    return (i & 0x80) ? 255 - jj2 : jj2;
+}}
+
+uint32_t tl_varint() {{
+    uint32_t value = 0;
+    uint8_t shift = 0;
+    uint8_t b;
+    do {{
+        b = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+        value |= (uint32_t)(b & 0x7F) << shift;
+        shift += 7;
+    }} while (b & 0x80);
+    return value;
+}}
+
+// O keyframe "to" vira "from" e o próximo é lido da tabela (só os segmentos que mudaram)
+void tl_next_keyframe() {{
+    memcpy(tl_from, tl_to, sizeof(tl_from));
+    tl_from_ms = tl_to_ms;
+    tl_transition = tl_to_transition;
+    tl_to_ms += tl_varint();
+    tl_to_transition = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+    uint16_t mask_pos = tl_pos;
+    tl_pos += tl_mask_bytes;
+    for (uint8_t k = 0; k < tl_segments; k++) {{
+        if (pgm_read_byte(&TIMELINE_DATA[mask_pos + k / 8]) & (1 << (k % 8))) {{
+            tl_to[k][0] = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+            tl_to[k][1] = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+            tl_to[k][2] = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+        }}
+    }}
+    tl_left--;
+}}
+
+void tl_rewind(uint16_t offset) {{
+    tl_pos = offset;
+    tl_segments = pgm_read_byte(&TIMELINE_DATA[tl_pos++]);
+    tl_mask_bytes = (tl_segments + 7) / 8;
+    tl_left = tl_varint();
+    tl_duration = tl_varint();
+    tl_starts_pos = tl_pos;
+    tl_pos += 2 * tl_segments;
+    memset(tl_to, 0, sizeof(tl_to));
+    tl_to_ms = 0;
+    tl_to_transition = 0;
+    tl_next_keyframe();                 // keyframe 0
+    if (tl_left) tl_next_keyframe();    // intervalo entre os keyframes 0 e 1
+}}
+
+uint16_t tl_segment_start(uint8_t k) {{
+    if (k >= tl_segments) return NUM_LEDS;
+    uint16_t pos = tl_starts_pos + 2 * k;
+    uint16_t start = pgm_read_byte(&TIMELINE_DATA[pos]) | (pgm_read_byte(&TIMELINE_DATA[pos + 1]) << 8);
+    return start < NUM_LEDS ? start : NUM_LEDS;
+}}
+
+void apply_timeline(Effect& effect) {{
+    // Effect.wave_width guarda a posição da linha do tempo em TIMELINE_DATA
+    if (timeline_rewind) {{
+        timeline_rewind = false;
+        tl_rewind(effect.wave_width);
+    }}
+    uint32_t loop_ms = tl_duration ? (millis() - timeline_start) % tl_duration : 0;
+    if (loop_ms < tl_from_ms) tl_rewind(effect.wave_width);  // recomeçou
+    while (tl_left && loop_ms >= tl_to_ms) tl_next_keyframe();
+
+    uint32_t span = tl_to_ms - tl_from_ms;
+    uint8_t frac = 255;
+    if (span != 0 && loop_ms < tl_to_ms) {{
+        frac = (uint8_t)((loop_ms - tl_from_ms) * 255 / span);
+        if (tl_transition == 2) frac = 0;                    // Degrau
+        else if (tl_transition == 1) frac = ease_in_out8(frac);  // Suave
+    }}
+
+    for (uint8_t k = 0; k < tl_segments; k++) {{
+        uint16_t start = tl_segment_start(k);
+        uint16_t end = tl_segment_start(k + 1);
+        if (end <= start) continue;
+        CRGB color(
+            mix8(tl_from[k][0], tl_to[k][0], frac, 255),
+            mix8(tl_from[k][1], tl_to[k][1], frac, 255),
+            mix8(tl_from[k][2], tl_to[k][2], frac, 255)
+        );
+        fill_solid(&leds[start], end - start, color);
+    }}
+}}
+''',
+    ),
+    # Mistura com denominador 256 (só deslocamento, sem divisão): efeitos calculados a cada quadro
+    Fragment(
+        "color_lerp",
+        flash_bytes=40,
+        functions='''
+uint8_t lerp256(uint8_t a, uint8_t b, uint8_t frac) {{
+    return ((uint16_t)a * (256 - frac) + (uint16_t)b * frac) >> 8;
+}}
+''',
+    ),
+    # Estado por LED e gerador random8 do FastLED, semeado com Effect.seed a cada troca de efeito
+    Fragment(
+        "fx_state",
+        flash_bytes=60,
+        hooks={"effect_reset": "    memset(fx_state, 0, sizeof(fx_state));\n    random16_set_seed(active_effect.seed);\n"},
+        globals="uint8_t fx_state[{fx_state_size}];  // brilho (Cintilar) ou calor (Fogo) de cada LED\n",
+    ),
+    Fragment(
+        "effect_rainbow",
+        effect_type=4,
+        animated=True,
+        flash_bytes=260,  # sin8
+        hooks={
+            "effect_cases": '''        case 4:  // Arco-íris
+            apply_rainbow(effect);
+            break;
+''',
+            "effect_reset": "    rainbow_phase = 0;\n",
+        },
+        globals=f"#define RAINBOW_STEP {RAINBOW_STEP}\nuint8_t rainbow_phase = 0;\n",
+        functions='''
+void apply_rainbow(Effect& effect) {{
+    // wave_width = LEDs por volta completa do arco-íris
+    uint16_t step = (uint16_t)(65536UL / (effect.wave_width ? effect.wave_width : 1));
+    uint16_t hue16 = 0;
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        uint8_t hue = (hue16 >> 8) + rainbow_phase;
+        leds[i] = CRGB(sin8(hue), sin8(hue + 85), sin8(hue + 170));
+        hue16 += step;
+    }}
+    rainbow_phase += RAINBOW_STEP;
+}}
+''',
+    ),
+    Fragment(
+        "effect_twinkle",
+        requires=("fx_state", "color_lerp"),
+        effect_type=5,
+        animated=True,
+        flash_bytes=280,
+        hooks={"effect_cases": '''        case 5:  // Cintilar
+            apply_twinkle(effect);
+            break;
+'''},
+        globals=f"#define TWINKLE_FADE {TWINKLE_FADE}\n",
+        functions='''
+void apply_twinkle(Effect& effect) {{
+    // Cada LED apaga um pouco; algumas faíscas novas acendem em color1 (chance = density/256)
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        fx_state[i] = qsub8(fx_state[i], TWINKLE_FADE);
+    }}
+    for (uint16_t s = 0; s < 1 + NUM_LEDS / 32; s++) {{
+        if (random8() < effect.density) fx_state[random16(NUM_LEDS)] = 255;
+    }}
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        uint8_t level = fx_state[i];
+        leds[i] = CRGB(
+            lerp256(effect.r2, effect.r1, level),
+            lerp256(effect.g2, effect.g1, level),
+            lerp256(effect.b2, effect.b1, level)
+        );
+    }}
+}}
+''',
+    ),
+    Fragment(
+        "effect_fire",
+        requires=("fx_state", "color_lerp"),
+        effect_type=6,
+        animated=True,
+        flash_bytes=420,
+        hooks={"effect_cases": '''        case 6:  // Fogo
+            apply_fire(effect);
+            break;
+'''},
+        globals=f"#define FIRE_COOLING {FIRE_COOLING}\n",
+        functions='''
+CRGB heat_color(const Effect& effect, uint8_t heat) {{
+    // preto -> color2 -> color1 -> branco, em três faixas de 64 (só deslocamentos)
+    uint8_t t192 = (uint8_t)(((uint16_t)heat * 191) >> 8) + (heat ? 1 : 0);
+    uint8_t ramp = (t192 & 0x3F) << 2;
+    if (t192 & 0x80) {{
+        return CRGB(lerp256(effect.r1, 255, ramp), lerp256(effect.g1, 255, ramp), lerp256(effect.b1, 255, ramp));
+    }}
+    if (t192 & 0x40) {{
+        return CRGB(lerp256(effect.r2, effect.r1, ramp), lerp256(effect.g2, effect.g1, ramp),
+                    lerp256(effect.b2, effect.b1, ramp));
+    }}
+    return CRGB(lerp256(0, effect.r2, ramp), lerp256(0, effect.g2, ramp), lerp256(0, effect.b2, ramp));
+}}
+
+void apply_fire(Effect& effect) {{
+    // Fire2012: esfria, o calor sobe pela fita e faíscas (chance = density/256) surgem na base
+    uint16_t cooling = (FIRE_COOLING * 10) / NUM_LEDS + 2;
+    uint8_t cool = cooling > 255 ? 255 : cooling;
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        fx_state[i] = qsub8(fx_state[i], random8(0, cool));
+    }}
+    for (uint16_t k = NUM_LEDS; k-- > 2;) {{
+        fx_state[k] = (fx_state[k - 1] + fx_state[k - 2] + fx_state[k - 2]) / 3;
+    }}
+    if (random8() < effect.density) {{
+        uint8_t y = random8(7);
+        if (y < NUM_LEDS) fx_state[y] = qadd8(fx_state[y], random8(160, 255));
+    }}
+    for (uint16_t i = 0; i < NUM_LEDS; i++) {{
+        leds[i] = heat_color(effect, fx_state[i]);
+    }}
+}}
+''',
+    ),
+    # Animação pré-calculada no host e gravada na flash (ver app/baked_animation.py): paleta + RLE
+    Fragment(
+        "effect_baked",
+        effect_type=7,
+        animated=True,
+        flash_bytes=240,
+        hooks={
+            "effect_cases": '''        case 7:  // Pré-calculado
+            apply_baked(effect);
+            break;
+''',
+            "effect_reset": "    baked_rewind = true;\n",
+        },
+        globals='''
+// ===== Animações pré-calculadas =====
+{baked_table}
+bool baked_rewind = true;
+uint16_t baked_pos;       // próximo byte do quadro atual
+uint16_t baked_palette;   // início da paleta (3 bytes por cor)
+uint16_t baked_left;      // quadros até o fim do ciclo
+''',
+        functions='''
+void baked_start(uint16_t offset) {{
+    baked_left = pgm_read_byte(&BAKED_DATA[offset]) | (pgm_read_byte(&BAKED_DATA[offset + 1]) << 8);
+    uint16_t colors = pgm_read_byte(&BAKED_DATA[offset + 2]) + 1;
+    baked_palette = offset + 3;
+    baked_pos = baked_palette + 3 * colors;
+}}
+
+CRGB baked_color(uint8_t index) {{
+    uint16_t p = baked_palette + 3 * index;
+    return CRGB(pgm_read_byte(&BAKED_DATA[p]), pgm_read_byte(&BAKED_DATA[p + 1]), pgm_read_byte(&BAKED_DATA[p + 2]));
+}}
+
+void apply_baked(Effect& effect) {{
+    // Effect.wave_width guarda a posição da animação em BAKED_DATA; no fim do ciclo, recomeça
+    if (baked_rewind || baked_left == 0) {{
+        baked_rewind = false;
+        baked_start(effect.wave_width);
+    }}
+    uint16_t i = 0;
+    while (i < NUM_LEDS) {{
+        uint8_t control = pgm_read_byte(&BAKED_DATA[baked_pos++]);
+        uint8_t count = (control & 0x7F) + 1;
+        if (control & 0x80) {{
+            fill_solid(&leds[i], count, baked_color(pgm_read_byte(&BAKED_DATA[baked_pos++])));
+        }} else {{
+            for (uint8_t k = 0; k < count; k++) {{
+                leds[i + k] = baked_color(pgm_read_byte(&BAKED_DATA[baked_pos++]));
+            }}
+        }}
+        i += count;
+    }}
+    baked_left--;
+}}
+''',
+    ),
+    Fragment(
+        "serial",
+        flash_bytes=900,  # HardwareSerial (buffers, ISRs)
+        setup="    Serial.begin({serial_baud});\n",
+    ),
+    Fragment(
+        "serial_reader",
+        requires=("serial",),
+        flash_bytes=100,
+        loop='''    // Recebe comando serial se disponível
+    if (Serial.available()) {{
+{serial_commands}    }}
+''',
+    ),
+    # Controle ao vivo pelo host (app/daemon.py): "L" + comando binário + XOR, resposta "K"/"E" + comando.
+    # S = seleciona efeito da flash, P = substitui o Effect ativo, F = quadro RGB enviado pelo host
+    Fragment(
+        "live_control",
+        requires=("serial_reader",),
+        flash_bytes=420,
+        hooks={"serial_commands": '''        if (Serial.peek() == 'L') {{
+            Serial.read();
+            live_command();
+            return;
+        }}
+'''},
+        globals='''
+// ===== Controle ao vivo =====
+#define LIVE_FRAME_TYPE 0xFE  // Effect.type enquanto a fita mostra um quadro enviado pelo host
+#define LIVE_EFFECT_BYTES 14  // Effect no formato do host (EFFECT_STRUCT de app/daemon.py), sem padding
+#define LIVE_CHUNK_LEDS 64    // LEDs por leitura do quadro: o tamanho em bytes cabe em 16 bits
+''',
+        functions='''
+bool live_read(uint8_t* dst, uint16_t len, uint8_t& checksum) {{
+    if (Serial.readBytes((char*)dst, len) != len) return false;
+    for (uint16_t i = 0; i < len; i++) checksum ^= dst[i];
+    return true;
+}}
+
+uint16_t live_u16(const uint8_t* src) {{
+    return src[0] | ((uint16_t)src[1] << 8);
+}}
+
+bool live_checksum_ok(uint8_t checksum) {{
+    uint8_t received;
+    return Serial.readBytes((char*)&received, 1) == 1 && received == checksum;
+}}
+
+bool live_type_supported(uint8_t type) {{
+    return {supported_condition};
+}}
+
+void live_command() {{
+    uint8_t checksum = 0;
+    uint8_t cmd;
+    if (!live_read(&cmd, 1, checksum)) return;
+    bool ok = false;
+    if (cmd == 'S') {{
+        uint8_t index;
+        ok = live_read(&index, 1, checksum) && live_checksum_ok(checksum) && index < NUM_EFFECTS;
+        if (ok) select_effect(index);
+    }} else if (cmd == 'P') {{
+        // Campo a campo, little-endian: o layout da struct Effect (padding) muda com a placa
+        uint8_t raw[LIVE_EFFECT_BYTES];
+        ok = live_read(raw, sizeof(raw), checksum) && live_checksum_ok(checksum) && live_type_supported(raw[0]);
+        if (ok) {{
+            Effect effect;
+            effect.type = raw[0];
+            effect.r1 = raw[1];
+            effect.g1 = raw[2];
+            effect.b1 = raw[3];
+            effect.r2 = raw[4];
+            effect.g2 = raw[5];
+            effect.b2 = raw[6];
+            effect.speed_ms = live_u16(&raw[7]);
+            effect.wave_width = live_u16(&raw[9]);
+            effect.density = raw[11];
+            effect.seed = live_u16(&raw[12]);
+            active_effect = effect;
+{effect_reset}            needs_render = true;
+        }}
+    }} else if (cmd == 'F') {{
+        // início e quantidade de LEDs (u16 LE) e o RGB direto no buffer, em blocos de LIVE_CHUNK_LEDS
+        uint8_t raw[4];
+        ok = live_read(raw, sizeof(raw), checksum);
+        uint16_t start = live_u16(&raw[0]);
+        uint16_t count = live_u16(&raw[2]);
+        ok = ok && start <= NUM_LEDS && count <= NUM_LEDS - start;
+        for (uint16_t i = 0; ok && i < count; i += LIVE_CHUNK_LEDS) {{
+            uint16_t chunk = count - i < LIVE_CHUNK_LEDS ? count - i : LIVE_CHUNK_LEDS;
+            ok = live_read((uint8_t*)&leds[start + i], chunk * 3, checksum);
+        }}
+        ok = ok && live_checksum_ok(checksum);
+        if (ok) {{
+            active_effect.type = LIVE_FRAME_TYPE;  // estático e sem case: o quadro fica na fita
+            needs_render = true;
+        }}
+    }}
+    Serial.write(ok ? 'K' : 'E');
+    Serial.write(cmd);
+}}
+''',
+    ),
+    # Comando "T<segundos>" sincroniza o relógio a partir do host
+    Fragment(
+        "serial_clock",
+        requires=("serial_reader", "schedule"),
+        flash_bytes=60,
+        hooks={"serial_commands": '''        if (Serial.peek() == 'T') {{
+            Serial.read();
+            set_clock((uint32_t)Serial.parseInt());
+            return;
+        }}
+'''},
+    ),
+    # Número do efeito pela serial (troca manual de preset)
+    Fragment(
+        "serial_select",
+        requires=("serial_reader",),
+        flash_bytes=420,  # Stream::parseInt
+        hooks={"serial_commands": '''        int effect_num = Serial.parseInt();
+        if (effect_num >= 0 && effect_num < NUM_EFFECTS) {{
+            select_effect(effect_num);
+        }}
+'''},
+    ),
+    # Agendador mensal + standby (modo "12 meses"). Espelhado em app/scheduler.py
+    Fragment(
+        "schedule",
+        flash_bytes=900,  # divisões de 32 bits do calendário civil
+        globals='''
+// ===== Agendamento mensal e standby =====
+// Mês (1..12) -> índice em effects[]; 0xFF = mês sem preset
+const uint8_t MONTH_EFFECT[12] PROGMEM = {{{month_table}}};
+#define NO_EFFECT 0xFF
+#define HAS_STANDBY {has_standby}
+#define STANDBY_START {standby_start}   // minutos desde 00:00
+#define STANDBY_END {standby_end}
+bool clock_valid = false;
+uint32_t clock_epoch = 0;          // segundos locais desde 1970 no último sync
+uint32_t clock_millis = 0;         // millis() no último sync
+uint32_t last_schedule_check = 0;
+uint8_t scheduled_month = 0;
+bool standby_active = false;
+''',
+        loop='''
+    update_schedule();
+    if (standby_active) {{
+        if (frame_dirty) {{
+            FastLED.show();
+            frame_dirty = false;
+        }}
+        return;
+    }}
+''',
+        functions='''
+// Só o relógio interno: usado na leitura periódica do RTC (não grava de volta nele)
+void update_clock(uint32_t epoch) {{
+    clock_epoch = epoch;
+    clock_millis = millis();
+    clock_valid = true;
+}}
+
+// Sync vindo do host (comando T): também acerta o RTC e reavalia o mês
+void set_clock(uint32_t epoch) {{
+    update_clock(epoch);
+    scheduled_month = 0;
+{rtc_adjust}}}
+
+uint32_t clock_now() {{
+    return clock_epoch + (millis() - clock_millis) / 1000;
+}}
+
+void clock_to_civil(uint32_t epoch, uint8_t* month, uint16_t* minute_of_day) {{
+    uint32_t days = epoch / 86400UL;
+    *minute_of_day = (epoch % 86400UL) / 60;
+    uint32_t z = days + 719468UL;
+    uint32_t era = z / 146097UL;
+    uint32_t doe = z - era * 146097UL;
+    uint32_t yoe = (doe - doe / 1460 + doe / 36524 - doe / 146096) / 365;
+    uint32_t doy = doe - (365 * yoe + yoe / 4 - yoe / 100);
+    uint32_t mp = (5 * doy + 2) / 153;
+    *month = mp < 10 ? mp + 3 : mp - 9;
+}}
+
+bool in_standby(uint16_t minute_of_day) {{
+    if (!HAS_STANDBY || STANDBY_START == STANDBY_END) return false;
+    if (STANDBY_START < STANDBY_END) {{
+        return minute_of_day >= STANDBY_START && minute_of_day < STANDBY_END;
+    }}
+    return minute_of_day >= STANDBY_START || minute_of_day < STANDBY_END;
+}}
+
+void update_schedule() {{
+{rtc_poll}    if (!clock_valid) return;
+    if (millis() - last_schedule_check < 1000 && scheduled_month != 0) return;
+    last_schedule_check = millis();
+
+    uint8_t month;
+    uint16_t minute_of_day;
+    clock_to_civil(clock_now(), &month, &minute_of_day);
+
+    if (month != scheduled_month) {{
+        scheduled_month = month;
+        uint8_t wanted = pgm_read_byte(&MONTH_EFFECT[month - 1]);
+        select_effect(wanted == NO_EFFECT ? DEFAULT_EFFECT : wanted);
+    }}
+
+    bool standby = in_standby(minute_of_day);
+    if (standby != standby_active) {{
+        standby_active = standby;
+        if (standby) {{
+            fill_solid(leds, NUM_LEDS, CRGB::Black);
+            frame_dirty = true;
+        }} else {{
+            needs_render = true;
+        }}
+    }}
+}}
+''',
+    ),
+    # Relógio em um RTC DS3231 (config["rtc"]); o horário sobrevive a resets
+    Fragment(
+        "rtc",
+        requires=("schedule",),
+        flash_bytes=2600,  # Wire (I2C) + RTClib
+        includes="#include <RTClib.h>\n",
+        globals="RTC_DS3231 rtc;\nuint32_t last_rtc_read = 0;\n",
+        setup="    rtc.begin();\n",
+        hooks={
+            "rtc_adjust": "    rtc.adjust(DateTime(epoch));\n",
+            "rtc_poll": '''    if (!clock_valid || millis() - last_rtc_read >= 60000UL) {{
+        last_rtc_read = millis();
+        if (!rtc.lostPower()) {{
+            update_clock(rtc.now().unixtime());
+        }}
+    }}
+''',
+        },
+    ),
+    # Contadores de desempenho enviados ao host em um registro binário (ver app/telemetry.py):
+    # A5 5A | versão | tamanho | payload (little-endian) | XOR do payload
+    Fragment(
+        "telemetry",
+        requires=("serial",),
+        flash_bytes=520,
+        globals='''
+// ===== Telemetria =====
+#define TELEMETRY_INTERVAL_MS {telemetry_interval_ms}
+#define TELEMETRY_VERSION 1
+#ifndef SERIAL_RX_BUFFER_SIZE
+#define SERIAL_RX_BUFFER_SIZE 64
+#endif
+struct TelemetryRecord {{
+    uint32_t uptime_ms;
+    uint16_t frames;        // FastLED.show() no período
+    uint16_t loops;         // voltas do loop() no período (satura em 65535)
+    uint32_t apply_us;      // tempo total em apply_effect()
+    uint32_t show_us;       // tempo total em FastLED.show() (micros() atrasa com interrupções desligadas)
+    uint16_t max_loop_us;   // maior volta do loop() (satura em 65535)
+    uint16_t free_sram;     // só no AVR; 0xFFFF nas outras placas
+    uint8_t rx_full;        // vezes em que o buffer de recepção serial estava cheio
+    uint8_t effect;
+}} __attribute__((packed));
+TelemetryRecord telemetry;
+uint32_t telemetry_last = 0;
+uint32_t telemetry_loop_start = 0;
+uint32_t telemetry_mark = 0;
+#if defined(__AVR__)
+extern char* __brkval;
+extern char __heap_start;
+#endif
+''',
+        hooks={
+            "loop_start": "    telemetry_tick();\n",
+            "apply_start": "    telemetry_mark = micros();\n",
+            "apply_end": "    telemetry.apply_us += micros() - telemetry_mark;\n",
+            "show_start": "        telemetry_mark = micros();\n",
+            "show_end": "        telemetry.show_us += micros() - telemetry_mark;\n        telemetry.frames++;\n",
+        },
+        functions='''
+uint16_t free_sram() {{
+#if defined(__AVR__)
+    // Símbolos do avr-libc: distância entre a pilha e o topo do heap
+    char top;
+    return (uint16_t)(&top - (__brkval ? __brkval : &__heap_start));
+#else
+    return 0xFFFF;  // sem medida fora do AVR
+#endif
+}}
+
+void telemetry_tick() {{
+    uint32_t now_us = micros();
+    if (telemetry_loop_start != 0) {{
+        uint32_t loop_us = now_us - telemetry_loop_start;
+        if (loop_us > telemetry.max_loop_us) telemetry.max_loop_us = loop_us > 65535UL ? 65535 : loop_us;
+    }}
+    telemetry_loop_start = now_us;
+    if (telemetry.loops < 65535) telemetry.loops++;
+    if (Serial.available() >= SERIAL_RX_BUFFER_SIZE - 1 && telemetry.rx_full < 255) telemetry.rx_full++;
+
+    uint32_t now = millis();
+    if (now - telemetry_last < TELEMETRY_INTERVAL_MS) return;
+    telemetry_last = now;
+
+    telemetry.uptime_ms = now;
+    telemetry.free_sram = free_sram();
+    telemetry.effect = current_effect;
+    const uint8_t* payload = (const uint8_t*)&telemetry;
+    uint8_t checksum = 0;
+    for (uint8_t i = 0; i < sizeof(TelemetryRecord); i++) checksum ^= payload[i];
+    uint8_t header[4] = {{0xA5, 0x5A, TELEMETRY_VERSION, sizeof(TelemetryRecord)}};
+    Serial.write(header, sizeof(header));
+    Serial.write(payload, sizeof(TelemetryRecord));
+    Serial.write(checksum);
+    memset(&telemetry, 0, sizeof(telemetry));
+    telemetry_loop_start = micros();  // não conta o envio na próxima volta
+}}
+''',
+    ),
+]
+
+FRAGMENTS_BY_NAME = {fragment.name: fragment for fragment in FRAGMENTS}
+
+# Fragmento de cada tipo de efeito (Effect.type)
+EFFECT_FRAGMENTS = {
+    fragment.effect_type: fragment.name for fragment in FRAGMENTS if fragment.effect_type is not None
+}
+
+# O que o template monolítico antigo sempre emitia (base do relatório de economia)
+MONOLITHIC_FRAGMENTS = ("core", "effect_solid", "effect_gradient", "effect_wave",
+                        "serial", "serial_reader", "serial_select")
+
+
+def resolve_fragments(names):
+    """Fecha `names` pelas dependências e devolve os fragmentos na ordem de emissão"""
+    wanted = set()
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in wanted:
+            continue
+        if name not in FRAGMENTS_BY_NAME:
+            raise KeyError(f"Fragmento de firmware desconhecido: {name}")
+        wanted.add(name)
+        pending.extend(FRAGMENTS_BY_NAME[name].requires)
+    return [fragment for fragment in FRAGMENTS if fragment.name in wanted]
+
+
+def estimate_flash(fragments):
+    """Soma das estimativas de flash (bytes) de uma lista de fragmentos"""
+    return sum(fragment.flash_bytes for fragment in fragments)
@@ -2,192 +2,459 @@
 firmware_generator.py - Gera código Arduino customizado a partir de presets
 """
 import os
+from datetime import datetime
+
+from app.baked_animation import BAKEABLE_EFFECTS, BAKED_TYPE, bake_preset
+from app.config_manager import MAX_LEDS
+from app.effect_kernels import DEFAULT_DENSITY, DEFAULT_SEED
+from app.firmware_fragments import (
+    EFFECT_FRAGMENTS, FRAGMENTS, MONOLITHIC_FRAGMENTS, SECTIONS, estimate_flash, resolve_fragments
+)
+from app.scheduler import NO_EFFECT, build_schedule, standby_window
+from app.timeline import FRAME_MS, Timeline, encode_timeline
+
+# Tamanho de cada entrada de effects[] na flash (8 x uint8_t + 3 x uint16_t)
+EFFECT_STRUCT_BYTES = 14
+# Flash disponível para o sketch quando config["flash_budget"] não é dado (Arduino Uno)
+DEFAULT_FLASH_BUDGET = 32256
+# Tempo de envio de um LED WS2812 (24 bits a 800 kHz), para a estimativa do FastLED.show()
+WS2812_US_PER_LED = 30
 
 
 class FirmwareGenerator:
     """
     Gera código Arduino (.ino) customizado baseado em configuração e presets.
+
+    O sketch é montado a partir dos fragmentos de app/firmware_fragments.py:
+    só entram os efeitos e recursos que os presets escolhidos usam. O último
+    relatório de montagem (fragmentos, flash estimada e economizada) fica em
+    `last_report`.
     """
     
+    # Esqueleto do sketch; as seções e hooks vêm dos fragmentos incluídos
     FIRMWARE_TEMPLATE = '''
 #include <FastLED.h>
-
+{includes}
 #define NUM_LEDS {total_leds}
 #define NUM_PORTS {num_ports}
 
 // Portas de dados para cada saída de LEDs (referência)
 const uint8_t DATA_PINS[NUM_PORTS] = {{{data_pins_array}}};
 
-// Array de arrays para armazenar LEDs de cada porta
-CRGB leds[NUM_PORTS][NUM_LEDS];
+// Buffer único da fachada (índices lógicos); cada porta envia o seu trecho
+CRGB leds[NUM_LEDS];
 
 // Struct para definir cada efeito
 struct Effect {{
-    const char* name;
-    uint8_t type;        // 0=Solid, 1=Gradient, 2=Wave
+    uint8_t type;        // 0=Solid, 1=Gradient, 2=Wave, 3=Timeline, 4=Rainbow, 5=Twinkle, 6=Fire, 7=Baked
     uint8_t r1, g1, b1;
     uint8_t r2, g2, b2;
     uint16_t speed_ms;
-    uint16_t wave_width;
-}} effects[] = {{
+    uint16_t wave_width; // Timeline/Baked: posição da tabela em TIMELINE_DATA/BAKED_DATA
+    uint8_t density;     // Twinkle/Fire: chance de faísca por quadro (0-255)
+    uint16_t seed;       // semente do random8 do FastLED
+}};
+
+// Tabela de efeitos fica na flash; só o efeito atual é copiado para a RAM
+const Effect effects[] PROGMEM = {{
 {effect_definitions}
 }};
 
 #define NUM_EFFECTS (sizeof(effects) / sizeof(effects[0]))
+#define DEFAULT_EFFECT {default_effect}
 
+Effect active_effect;
 uint8_t current_effect = 0;
 uint32_t last_update = 0;
-uint16_t wave_index = 0;
-
+bool needs_render = true;   // efeito atual ainda não foi desenhado
+bool frame_dirty = false;   // buffer mudou desde o último FastLED.show()
+{globals}
 void setup() {{
     // Configura FastLED para todas as portas (chamadas geradas com pinos constantes)
 {add_leds_calls}
     FastLED.setBrightness(255);
-    Serial.begin(9600);
+{setup}    select_effect(DEFAULT_EFFECT);
 }}
 
 void loop() {{
-    apply_effect(effects[current_effect]);
-    
-    // Mostra efeito (FastLED.show atualiza todos os controladores registrados)
-    FastLED.show();
-    
-    // Recebe comando serial se disponível
-    if (Serial.available()) {{
-        int effect_num = Serial.parseInt();
-        if (effect_num >= 0 && effect_num < NUM_EFFECTS) {{
-            current_effect = effect_num;
-            wave_index = 0;
-        }}
+{loop_start}{loop}
+{apply_start}    apply_effect(active_effect);
+{apply_end}
+    // FastLED.show() desliga interrupções (~30us por LED e porta): só envia quando o buffer mudou
+    if (frame_dirty) {{
+{show_start}        FastLED.show();
+{show_end}        frame_dirty = false;
     }}
 }}
 
-void apply_effect(Effect& effect) {{
-    uint32_t now = millis();
-    if (now - last_update < effect.speed_ms) return;
-    last_update = now;
-    
-    switch (effect.type) {{
-        case 0:  // Cor Sólida
-            apply_solid(effect);
-            break;
-        case 1:  // Gradiente
-            apply_gradient(effect);
-            break;
-        case 2:  // Onda
-            apply_wave(effect);
-            break;
-    }}
+void select_effect(uint8_t effect_num) {{
+    current_effect = effect_num;
+    memcpy_P(&active_effect, &effects[effect_num], sizeof(Effect));
+{effect_reset}    needs_render = true;
 }}
 
-void apply_solid(Effect& effect) {{
-    CRGB color(effect.r1, effect.g1, effect.b1);
-    for (int port = 0; port < NUM_PORTS; port++) {{
-        fill_solid(leds[port], NUM_LEDS, color);
-    }}
+bool effect_is_static(const Effect& effect) {{
+    // Só os efeitos animados incluídos mudam de quadro com o tempo
+    return {static_condition};
 }}
 
-void apply_gradient(Effect& effect) {{
-    for (int port = 0; port < NUM_PORTS; port++) {{
-        for (int i = 0; i < NUM_LEDS; i++) {{
-            float t = (float)i / (float)(NUM_LEDS - 1);
-            uint8_t r = (uint8_t)(effect.r1 * (1.0 - t) + effect.r2 * t);
-            uint8_t g = (uint8_t)(effect.g1 * (1.0 - t) + effect.g2 * t);
-            uint8_t b = (uint8_t)(effect.b1 * (1.0 - t) + effect.b2 * t);
-            leds[port][i] = CRGB(r, g, b);
-        }}
+void apply_effect(Effect& effect) {{
+    if (effect_is_static(effect)) {{
+        if (!needs_render) return;
+    }} else {{
+        uint32_t now = millis();
+        if (!needs_render && now - last_update < effect.speed_ms) return;
+        // Mantém o ritmo no período do efeito; se atrasou mais de um quadro, ressincroniza
+        last_update += effect.speed_ms;
+        if (needs_render || now - last_update >= effect.speed_ms) last_update = now;
     }}
-}}
+    needs_render = false;
 
-void apply_wave(Effect& effect) {{
-    uint16_t wave_width = effect.wave_width;
-    
-    for (int port = 0; port < NUM_PORTS; port++) {{
-        for (int i = 0; i < NUM_LEDS; i++) {{
-            int relative_pos = (i - wave_index + NUM_LEDS) % NUM_LEDS;
-            float blend = 0.0;
-            
-            if (relative_pos < wave_width) {{
-                blend = 1.0 - ((float)relative_pos / (float)wave_width);
-            }}
-            
-            uint8_t r = (uint8_t)(effect.r1 * blend + effect.r2 * (1.0 - blend));
-            uint8_t g = (uint8_t)(effect.g1 * blend + effect.g2 * (1.0 - blend));
-            uint8_t b = (uint8_t)(effect.b1 * blend + effect.b2 * (1.0 - blend));
-            
-            leds[port][i] = CRGB(r, g, b);
-        }}
-    }}
-    
-    wave_index = (wave_index + 1) % NUM_LEDS;
+    switch (effect.type) {{
+{effect_cases}    }}
+    frame_dirty = true;
 }}
-'''
-    
+{functions}'''
+
     def __init__(self, total_leds, config):
         self.total_leds = total_leds
         self.config = config
+        self.last_report = None
     
-    def generate_firmware(self, presets):
+    def generate_firmware(self, presets, scheduled=False, now=None, telemetry=None):
         """
         Gera código Arduino a partir de uma lista de presets.
         Retorna string com o código .ino pronto para upload.
+
+        Com `scheduled=True` todos os presets mensais vão para a flash e o
+        sketch escolhe sozinho o preset do mês (relógio RTC ou sincronizado
+        pela serial) e apaga a fita na janela `config["standby"]`.
+
+        Com `telemetry=True` (padrão: config["telemetry"]) o sketch envia
+        contadores de desempenho pela serial a cada
+        config["telemetry_interval_ms"] (ver app/telemetry.py).
+
+        Com config["bake_effects"], efeitos periódicos (Onda, Arco-íris) vão
+        pré-calculados para a flash enquanto couberem em config["flash_budget"]
+        (ver app/baked_animation.py).
         """
-        # Gera definições dos efeitos
-        effect_defs = self._generate_effect_definitions(presets)
-        
-        # Determina pinos usados (padrão: 2..7). Pode ser substituído via config['data_pins']
-        default_pins = [2, 3, 4, 5, 6, 7]
-        pins = self.config.get("data_pins", default_pins)
-        # Limpa e garante inteiros
-        pins = [int(p) for p in pins]
-        num_ports = len(pins)
-        data_pins_array = ", ".join(str(p) for p in pins)
-
-        # Gera chamadas FastLED.addLeds com pinos constantes (necessário para o template do FastLED)
-        add_calls_lines = []
-        for idx, pin in enumerate(pins):
-            add_calls_lines.append(f"    FastLED.addLeds<WS2812B, {pin}, GRB>(leds[{idx}], NUM_LEDS);")
-        add_leds_calls = "\n".join(add_calls_lines)
-
-        # Substitui no template
-        firmware_code = self.FIRMWARE_TEMPLATE.format(
+        if not 1 <= self.total_leds <= MAX_LEDS:
+            raise ValueError(f"{self.total_leds} LEDs: o firmware aceita de 1 a {MAX_LEDS} (índices uint16_t)")
+        context = {}
+        features = {"core"}
+        if scheduled:
+            effects, month_table = build_schedule(presets, self._get_speed_ms)
+            effects = list(effects)
+            now = now or datetime.now()
+            default_effect = month_table[now.month - 1]
+            if default_effect == NO_EFFECT:
+                default_effect = 0
+            context.update(self._schedule_context(month_table))
+            features.update(("schedule", "serial_clock"))
+            if self._uses_rtc():
+                features.add("rtc")
+        else:
+            effects = [p for p in presets if p.get("ativo")]
+            default_effect = 0
+
+        timeline_data, timeline_offsets, max_segments = self._build_timelines(effects)
+        context.update(
+            timeline_table=self._timeline_table(timeline_data),
+            timeline_max_segments=max_segments,
+            fx_state_size="NUM_LEDS",
+        )
+
+        if telemetry is None:
+            telemetry = bool(self.config.get("telemetry", False))
+        if telemetry:
+            features.add("telemetry")
+            context["telemetry_interval_ms"] = int(self.config.get("telemetry_interval_ms", 1000))
+
+        # Troca de efeito pela serial só faz sentido com mais de um efeito na flash
+        if scheduled or len(effects) > 1 or self.config.get("serial_control"):
+            features.add("serial_select")
+        # Parâmetros e quadros enviados pelo daemon (app/daemon.py)
+        if self.config.get("live_control"):
+            features.add("live_control")
+        context["serial_baud"] = int(self.config.get("serial_baud", 9600))
+
+        fixed_bytes = max(1, len(effects)) * EFFECT_STRUCT_BYTES + len(timeline_data)
+        if self.config.get("bake_effects"):
+            baked_data, baked_offsets = self._bake_effects(effects, features, fixed_bytes)
+        else:
+            baked_data, baked_offsets = b"", [None] * len(effects)
+        context["baked_table"] = self._data_table("BAKED_DATA", baked_data)
+        features.update(EFFECT_FRAGMENTS[code] for code in self._effect_codes(effects, baked_offsets))
+        effect_defs = self._generate_effect_definitions(
+            effects, only_active=False, timeline_offsets=timeline_offsets, baked_offsets=baked_offsets
+        )
+
+        ports = self.port_segments()
+        context.update(
             total_leds=self.total_leds,
-            num_ports=num_ports,
-            data_pins_array=data_pins_array,
-            add_leds_calls=add_leds_calls,
-            effect_definitions=effect_defs
+            num_ports=len(ports),
+            data_pins_array=", ".join(str(pin) for pin, _, _, _ in ports),
+            add_leds_calls=self._add_leds_calls(ports),
+            effect_definitions=effect_defs,
+            default_effect=default_effect,
         )
-        
+        fragments = resolve_fragments(features)
+        firmware_code = self._assemble(fragments, context)
+        self.last_report = self._build_report(fragments, features, len(effects),
+                                              len(timeline_data) + len(baked_data))
+        self.last_report.update(self._ports_report(ports))
+        self.last_report["baked"] = [e.get("nome_mes", e.get("tipo")) for e, offset
+                                     in zip(effects, baked_offsets) if offset is not None]
+        self.last_report["baked_bytes"] = len(baked_data)
         return firmware_code
+
+    def port_segments(self):
+        """Trecho de leds[] enviado por cada porta: lista de (pino, início, quantidade, rótulo).
+
+        Sem config["ports"], todas as portas de config["data_pins"] (padrão 2..7)
+        mostram a fachada inteira, lendo o mesmo buffer. Com config["ports"],
+        cada porta leva só o seu trecho, dado por letras de config["letters"]
+        ({"pin": 2, "letters": "PHO"}) ou por início e tamanho
+        ({"pin": 3, "start": 21, "leds": 14}).
+        """
+        ports = self.config.get("ports")
+        if not ports:
+            pins = [int(p) for p in self.config.get("data_pins", [2, 3, 4, 5, 6, 7])]
+            return [(pin, 0, self.total_leds, "") for pin in pins]
+
+        segments = []
+        for entry in ports:
+            pin = int(entry["pin"])
+            if "letters" in entry:
+                start, count = self._letters_segment(pin, entry["letters"])
+                label = ", ".join(entry["letters"])
+            else:
+                start, count = int(entry.get("start", 0)), int(entry.get("leds", 0))
+                label = ""
+            if count < 1 or start < 0 or start + count > self.total_leds:
+                raise ValueError(f"Porta {pin}: trecho {start}..{start + count - 1} fora dos "
+                                 f"{self.total_leds} LEDs")
+            segments.append((pin, start, count, label))
+        return segments
+
+    def _letters_segment(self, pin, letters):
+        """Início e tamanho do trecho formado pelas letras (as faixas precisam ser vizinhas)"""
+        ranges = self.config.get("letters", {})
+        spans = []
+        for letter in letters:
+            if letter not in ranges:
+                raise ValueError(f"Porta {pin}: letra {letter} não está mapeada em 'letters'")
+            start, end = (int(v) for v in ranges[letter])
+            spans.append((min(start, end), max(start, end)))
+        spans.sort()
+        for (_, end), (start, _) in zip(spans, spans[1:]):
+            if start != end + 1:
+                raise ValueError(f"Porta {pin}: as letras {', '.join(letters)} não formam um trecho contínuo")
+        return spans[0][0], spans[-1][1] - spans[0][0] + 1
+
+    @staticmethod
+    def _parallel_layout(ports):
+        """Tamanho por porta quando a saída paralela do FastLED serve (portas iguais e seguidas)"""
+        if len(ports) < 2:
+            return None
+        count = ports[0][2]
+        if all(start == k * count and n == count for k, (_, start, n, _) in enumerate(ports)):
+            return count
+        return None
+
+    def _add_leds_calls(self, ports):
+        """Chamadas FastLED.addLeds com pinos constantes (necessário para o template do FastLED)"""
+        lines = []
+        for pin, start, count, label in ports:
+            comment = f"  // {label}" if label else ""
+            lines.append(f"    FastLED.addLeds<WS2812B, {pin}, GRB>(leds, {start}, {count});{comment}")
+        calls = "\n".join(lines)
+        per_port = self._parallel_layout(ports)
+        if per_port is None:
+            return calls
+        # Teensy 4.x: um único controlador envia todas as portas ao mesmo tempo.
+        # No ESP32 cada porta já usa um canal RMT próprio e o show() também é paralelo.
+        pins = ", ".join(str(pin) for pin, _, _, _ in ports)
+        return (f"#if defined(__IMXRT1062__)\n"
+                f"    FastLED.addLeds<NUM_PORTS, WS2812B, {pins}, GRB>(leds, {per_port});\n"
+                f"#else\n{calls}\n#endif")
+
+    def _ports_report(self, ports):
+        """Portas do sketch e tempo estimado do FastLED.show() (portas em sequência ou em paralelo)"""
+        counts = [count for _, _, count, _ in ports]
+        return {
+            "ports": [{"pin": pin, "start": start, "leds": count} for pin, start, count, _ in ports],
+            "show_us": sum(counts) * WS2812_US_PER_LED,
+            "show_us_parallel": max(counts) * WS2812_US_PER_LED,
+            "parallel_output": self._parallel_layout(ports) is not None,
+        }
+
+    def _assemble(self, fragments, context):
+        """Junta seções e hooks dos fragmentos no esqueleto do sketch"""
+        animated = [f"effect.type != {fragment.effect_type}" for fragment in fragments if fragment.animated]
+        context["static_condition"] = " && ".join(animated) if animated else "true"
+        # Tipos que o controle ao vivo aceita: os efeitos incluídos, menos os que leem tabelas da flash
+        supported = [f"type == {fragment.effect_type}" for fragment in fragments
+                     if fragment.effect_type is not None and fragment.name not in ("effect_timeline", "effect_baked")]
+        context["supported_condition"] = " || ".join(supported) if supported else "false"
+        # Hooks primeiro: são placeholders usados dentro das seções de outros fragmentos
+        hook_names = {hook for fragment in FRAGMENTS for hook in fragment.hooks}
+        for hook in hook_names:
+            context[hook] = "".join(
+                fragment.hooks[hook].format(**context) for fragment in fragments if hook in fragment.hooks
+            )
+
+        for section in SECTIONS:
+            context[section] = "".join(
+                fragment.sections[section].format(**context)
+                for fragment in fragments if section in fragment.sections
+            )
+
+        return self.FIRMWARE_TEMPLATE.format(**context)
+
+    def _build_report(self, fragments, features, num_effects, data_bytes=0):
+        """Resumo da montagem: fragmentos usados e flash estimada/economizada em relação ao template completo"""
+        table_bytes = max(1, num_effects) * EFFECT_STRUCT_BYTES + data_bytes
+        flash = estimate_flash(fragments) + table_bytes
+        monolithic = resolve_fragments(set(MONOLITHIC_FRAGMENTS) | set(features))
+        included = [fragment.name for fragment in fragments]
+        return {
+            "fragments": included,
+            "omitted": [fragment.name for fragment in monolithic if fragment.name not in included],
+            "flash_estimate": flash,
+            "flash_saved": estimate_flash(monolithic) + table_bytes - flash,
+        }
+
+    def _effect_codes(self, effects, baked_offsets):
+        """Tipos de efeito (Effect.type) presentes na flash"""
+        codes = {BAKED_TYPE if offset is not None else self._get_effect_type_code(e.get("tipo"))
+                 for e, offset in zip(effects, baked_offsets)}
+        return codes or {0}
+
+    def _bake_effects(self, effects, features, fixed_bytes):
+        """Pré-calcula os efeitos periódicos que cabem na flash.
+
+        Cada candidato entra só se a estimativa do sketch inteiro (fragmentos +
+        tabelas) continuar dentro de config["flash_budget"]; os demais seguem
+        calculados no Arduino.
+
+        Returns:
+            (bytes de BAKED_DATA, posição de cada efeito na tabela ou None)
+        """
+        budget = int(self.config.get("flash_budget", DEFAULT_FLASH_BUDGET))
+        offsets = [None] * len(effects)
+        data = bytearray()
+        for i, preset in enumerate(effects):
+            if preset.get("tipo") not in BAKEABLE_EFFECTS:
+                continue
+            table = bake_preset(preset, self.total_leds)
+            # As posições são uint16_t (Effect.wave_width), como na linha do tempo
+            if table is None or len(data) + len(table) > 0xFFFF:
+                continue
+            trial = offsets[:i] + [len(data)] + offsets[i + 1:]
+            names = set(features) | {EFFECT_FRAGMENTS[code] for code in self._effect_codes(effects, trial)}
+            flash = estimate_flash(resolve_fragments(names)) + fixed_bytes + len(data) + len(table)
+            if flash <= budget:
+                offsets = trial
+                data += table
+        return bytes(data), offsets
+
+    def _build_timelines(self, effects):
+        """Compila as linhas do tempo em uma única tabela para a flash.
+
+        Returns:
+            (bytes da tabela, posição de cada efeito na tabela ou None, maior
+            número de segmentos)
+        """
+        data = bytearray()
+        offsets = []
+        max_segments = 1
+        for preset in effects:
+            if preset.get("tipo") != "Linha do tempo":
+                offsets.append(None)
+                continue
+            timeline = Timeline.from_preset(preset, self.total_leds)
+            offsets.append(len(data))
+            data += encode_timeline(timeline)
+            max_segments = max(max_segments, len(timeline.starts))
+        # As posições são uint16_t (Effect.wave_width) e a tabela é lida com pgm_read_byte (64 KB)
+        if len(data) > 0xFFFF:
+            raise ValueError(f"Linhas do tempo ocupam {len(data)} bytes; o limite é 65535")
+        return bytes(data), offsets, max_segments
+
+    def _timeline_table(self, data):
+        """Array PROGMEM com as tabelas das linhas do tempo, 16 bytes por linha"""
+        return self._data_table("TIMELINE_DATA", data)
+
+    def _data_table(self, name, data):
+        """Array PROGMEM de bytes, 16 por linha"""
+        data = data or b"\x00"
+        lines = [
+            "    " + ", ".join(f"0x{byte:02X}" for byte in data[i:i + 16]) + ","
+            for i in range(0, len(data), 16)
+        ]
+        return f"const uint8_t {name}[] PROGMEM = {{\n" + "\n".join(lines) + "\n};"
+
+    def _uses_rtc(self):
+        """Indica se o relógio vem de um RTC DS3231 (config['rtc']) em vez do host"""
+        return str(self.config.get("rtc", "")).upper() == "DS3231"
+
+    def _schedule_context(self, month_table):
+        """Valores da tabela mês -> efeito e da janela de standby para o fragmento de agendamento"""
+        window = standby_window(self.config)
+        return {
+            "month_table": ", ".join(str(idx) for idx in month_table),
+            "has_standby": 1 if window else 0,
+            "standby_start": window[0] if window else 0,
+            "standby_end": window[1] if window else 0,
+        }
     
-    def _generate_effect_definitions(self, presets):
+    def _generate_effect_definitions(self, presets, only_active=True, timeline_offsets=None, baked_offsets=None):
         """Gera as definições das structs dos efeitos"""
         definitions = []
         
         for i, preset in enumerate(presets):
-            if not preset.get("ativo"):
+            if only_active and not preset.get("ativo"):
                 continue
             
-            effect_type = self._get_effect_type_code(preset.get("tipo"))
-            r1, g1, b1 = self._hex_to_rgb(preset.get("color1", "#FF0000"))
-            r2, g2, b2 = self._hex_to_rgb(preset.get("color2", "#0000FF"))
-            speed_ms = self._get_speed_ms(preset.get("velocidade", "Médio"))
-            wave_width = preset.get("wave_width", 10)
+            offset = timeline_offsets[i] if timeline_offsets else None
+            baked = baked_offsets[i] if baked_offsets else None
+            (effect_type, r1, g1, b1, r2, g2, b2, speed_ms, wave_width,
+             density, seed) = self.effect_fields(preset, offset, baked)
             
             definition = (
-                f'    {{"{preset.get("nome_mes", f"Preset {i}")}", {effect_type}, '
-                f'{r1}, {g1}, {b1}, {r2}, {g2}, {b2}, {speed_ms}, {wave_width}}}'
+                f'    {{{effect_type}, {r1}, {g1}, {b1}, {r2}, {g2}, {b2}, {speed_ms}, {wave_width}, '
+                f'{density}, {seed}}},  // {preset.get("nome_mes", f"Preset {i}")}'
             )
             definitions.append(definition)
         
-        return ",\n".join(definitions) if definitions else '    {"Default", 0, 255, 0, 0, 0, 0, 0, 300, 0}'
+        return "\n".join(definitions) if definitions else '    {0, 255, 0, 0, 0, 0, 0, 300, 0, 0, 0},  // Default'
+    
+    def effect_fields(self, preset, timeline_offset=None, baked_offset=None):
+        """Campos da struct Effect de um preset, na ordem da struct"""
+        effect_type = self._get_effect_type_code(preset.get("tipo"))
+        r1, g1, b1 = self._hex_to_rgb(preset.get("color1", "#FF0000"))
+        r2, g2, b2 = self._hex_to_rgb(preset.get("color2", "#0000FF"))
+        speed_ms = self._get_speed_ms(preset.get("velocidade", "Médio"))
+        wave_width = preset.get("wave_width", 10)
+        if timeline_offset is not None:
+            speed_ms, wave_width = FRAME_MS, timeline_offset
+        if baked_offset is not None:
+            effect_type, wave_width = BAKED_TYPE, baked_offset
+        density = max(0, min(255, int(preset.get("densidade", DEFAULT_DENSITY))))
+        seed = int(preset.get("semente", DEFAULT_SEED)) & 0xFFFF
+        return (effect_type, r1, g1, b1, r2, g2, b2, speed_ms, wave_width, density, seed)
     
     def _get_effect_type_code(self, effect_type):
         """Mapeia tipo de efeito para código numérico"""
         mapping = {
             "Cor sólida": 0,
             "Gradiente": 1,
-            "Onda": 2
+            "Onda": 2,
+            "Linha do tempo": 3,
+            "Arco-íris": 4,
+            "Cintilar": 5,
+            "Fogo": 6,
         }
         return mapping.get(effect_type, 0)
     
@@ -208,7 +475,7 @@ void apply_wave(Effect& effect) {{
         }
         return mapping.get(speed_label, 150)
     
-    def save_firmware(self, presets, output_file=None):
+    def save_firmware(self, presets, output_file=None, scheduled=False, telemetry=None):
         """Salva firmware em arquivo .ino"""
         if output_file is None:
             output_file = os.path.join(
@@ -216,7 +483,7 @@ void apply_wave(Effect& effect) {{
             )
         
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        firmware_code = self.generate_firmware(presets)
+        firmware_code = self.generate_firmware(presets, scheduled=scheduled, telemetry=telemetry)
         
         with open(output_file, "w", encoding="utf-8") as f:
             f.write(firmware_code)
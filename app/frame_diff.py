@@ -0,0 +1,80 @@
+"""
+frame_diff.py - Diferença entre quadros RGB do preview
+
+Compara cada quadro novo com o último exibido e devolve só os LEDs que
+mudaram: quadros idênticos (Cor sólida, Gradiente, efeitos lentos entre dois
+passos) nem chegam a repintar, e os demais repintam só as células alteradas.
+
+A comparação é de bytes (memcmp no CPython), sem numpy: o quadro inteiro
+primeiro, depois blocos de BLOCK_LEDS e LED a LED apenas dentro dos blocos
+que diferem.
+"""
+
+BLOCK_LEDS = 16
+
+
+class FrameDiff:
+    """Último quadro exibido + contadores de quadros e células que não precisaram ser repintados"""
+
+    def __init__(self, total_leds, block_leds=BLOCK_LEDS):
+        self.total_leds = total_leds
+        self.block_size = max(1, block_leds) * 3
+        self._last = bytearray(total_leds * 3)
+        self._valid = False
+        self.frames = 0
+        self.skipped_frames = 0
+        self.cells = 0
+        self.skipped_cells = 0
+
+    def reset(self):
+        """Esquece o último quadro: o próximo conta como todo alterado"""
+        self._valid = False
+
+    def compare(self, frame):
+        """
+        LEDs alterados desde o último quadro e guarda `frame` como o novo último.
+
+        Retorna None para "repinte tudo" (primeiro quadro ou mais da metade
+        alterada), uma lista vazia para um quadro idêntico ou a lista ordenada
+        dos índices alterados.
+        """
+        last = self._last
+        size = len(last)
+        new = frame if len(frame) == size else bytes(frame[:size])
+        self.frames += 1
+        self.cells += self.total_leds
+
+        if not self._valid:
+            last[:] = new
+            self._valid = True
+            return None
+        if new == last:
+            self.skipped_frames += 1
+            self.skipped_cells += self.total_leds
+            return []
+
+        step = self.block_size
+        blocks = [start for start in range(0, size, step) if new[start:start + step] != last[start:start + step]]
+        if len(blocks) * step * 2 > size:
+            # Mais da metade mudou: a repintura será completa, não vale procurar LED a LED
+            last[:] = new
+            return None
+
+        changed = []
+        for start in blocks:
+            end = min(size, start + step)
+            for o in range(start, end, 3):
+                if new[o:o + 3] != last[o:o + 3]:
+                    changed.append(o // 3)
+            last[start:end] = new[start:end]
+        self.skipped_cells += self.total_leds - len(changed)
+        return changed
+
+    def stats(self):
+        """Contadores desde a criação (dict, para exibir ou registrar)"""
+        return {
+            "frames": self.frames,
+            "skipped_frames": self.skipped_frames,
+            "cells": self.cells,
+            "skipped_cells": self.skipped_cells,
+        }
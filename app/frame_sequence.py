@@ -0,0 +1,282 @@
+"""
+frame_sequence.py - Sequências de quadros pré-renderizadas em disco (.pals)
+
+Para shows longos: o renderizador grava os quadros uma vez, à medida que
+desenha, e a reprodução (preview ou daemon) lê o arquivo via mmap. Cada
+quadro é uma fatia (memoryview) do arquivo mapeado: nada é copiado nem
+carregado inteiro na memória.
+
+Formato (little-endian):
+    cabeçalho de HEADER_SIZE bytes:
+        "PALS", versão (u16), tamanho do cabeçalho (u16),
+        ordem das cores (3 bytes ASCII, ex. "RGB"), 1 byte livre,
+        quantidade de LEDs (u32), fps x 1000 (u32), 12 bytes livres
+    quadros contíguos de LEDs x 3 bytes, na ordem de cores do cabeçalho
+
+A quantidade de quadros vem do tamanho do arquivo (um quadro incompleto no
+fim é ignorado), então um arquivo ainda sendo gravado já pode ser lido.
+
+Uso:
+    python -m app.frame_sequence render show.pals --mes 12 --seconds 600 --fps 30
+    python -m app.frame_sequence info show.pals
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b"PALS"
+VERSION = 1
+HEADER = struct.Struct("<4sHH3sxII12x")
+HEADER_SIZE = HEADER.size
+COLOR_ORDERS = ("RGB", "RBG", "GRB", "GBR", "BRG", "BGR")
+
+
+class FrameSequenceError(ValueError):
+    """Arquivo de sequência inválido ou quadro de tamanho errado"""
+
+
+def _check_color_order(color_order):
+    if color_order not in COLOR_ORDERS:
+        raise FrameSequenceError(f"Ordem de cores inválida: {color_order} (opções: {', '.join(COLOR_ORDERS)})")
+
+
+def reorder(src, dst, src_order, dst_order):
+    """Copia um quadro de `src` para `dst` trocando a ordem dos canais (ex. GRB -> RGB)"""
+    for i, channel in enumerate(dst_order):
+        j = src_order.index(channel)
+        dst[i::3] = src[j::3]
+    return dst
+
+
+# -----------------------------------------
+# Gravação
+# -----------------------------------------
+class FrameSequenceWriter:
+    """Grava quadros no fim do arquivo, um por vez (`write`), a partir do cabeçalho"""
+
+    def __init__(self, path, led_count, fps, color_order="RGB"):
+        _check_color_order(color_order)
+        if led_count < 1 or fps <= 0:
+            raise FrameSequenceError("led_count e fps precisam ser positivos")
+        self.path = path
+        self.led_count = led_count
+        self.fps = fps
+        self.color_order = color_order
+        self.frame_size = led_count * 3
+        self.frame_count = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, HEADER_SIZE, color_order.encode("ascii"),
+                                     led_count, round(fps * 1000)))
+
+    def write(self, frame):
+        """Acrescenta um quadro (bytes-like de led_count x 3 bytes, na ordem do cabeçalho)"""
+        if len(frame) != self.frame_size:
+            raise FrameSequenceError(f"Quadro com {len(frame)} bytes; esperados {self.frame_size}")
+        self._file.write(frame)
+        self.frame_count += 1
+
+    def flush(self):
+        """Deixa os quadros gravados até aqui visíveis para um leitor"""
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------------------------
+# Leitura
+# -----------------------------------------
+class FrameSequence:
+    """
+    Sequência mapeada em memória. `sequence[i]` é uma memoryview do quadro i
+    (válida até `close`); `read` avança um cursor, com `seek` e repetição.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            header = self._file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise FrameSequenceError(f"{path}: arquivo curto demais para uma sequência")
+            magic, version, header_size, color_order, led_count, fps_milli = HEADER.unpack(header)
+            if magic != MAGIC:
+                raise FrameSequenceError(f"{path}: não é uma sequência de quadros (.pals)")
+            if version > VERSION:
+                raise FrameSequenceError(f"{path}: versão {version} não suportada (máx. {VERSION})")
+            self.color_order = color_order.decode("ascii")
+            _check_color_order(self.color_order)
+            if led_count < 1 or fps_milli < 1:
+                raise FrameSequenceError(f"{path}: cabeçalho inválido")
+            self.led_count = led_count
+            self.fps = fps_milli / 1000
+            self.frame_size = led_count * 3
+            self._offset = header_size
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._view = memoryview(self._mmap)
+        self.frame_count = max(0, (len(self._mmap) - self._offset) // self.frame_size)
+        self.position = 0
+
+    @property
+    def duration(self):
+        """Duração em segundos"""
+        return self.frame_count / self.fps
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.frame_count
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"Quadro {index} fora da sequência ({self.frame_count} quadros)")
+        start = self._offset + index * self.frame_size
+        return self._view[start:start + self.frame_size]
+
+    def __iter__(self):
+        for index in range(self.frame_count):
+            yield self[index]
+
+    def frame_rgb(self, index, out=None):
+        """Quadro em RGB: a própria fatia quando o arquivo já é RGB, senão convertido em `out`"""
+        frame = self[index]
+        if self.color_order == "RGB":
+            return frame
+        if out is None:
+            out = bytearray(self.frame_size)
+        return reorder(frame, out, self.color_order, "RGB")
+
+    def index_at(self, seconds, loop=False):
+        """Quadro exibido `seconds` após o início; None depois do fim (sem `loop`)"""
+        if self.frame_count == 0:
+            return None
+        index = int(max(0.0, seconds) * self.fps)
+        if index >= self.frame_count:
+            if not loop:
+                return None
+            index %= self.frame_count
+        return index
+
+    def seek(self, index):
+        """Posiciona o cursor no quadro `index` (negativo conta do fim)"""
+        if index < 0:
+            index += self.frame_count
+        self.position = max(0, min(self.frame_count, index))
+
+    def seek_time(self, seconds):
+        self.seek(int(max(0.0, seconds) * self.fps))
+
+    def read(self, loop=False):
+        """Quadro do cursor e avança; no fim volta ao início com `loop`, senão retorna None"""
+        if self.position >= self.frame_count:
+            if not loop or self.frame_count == 0:
+                return None
+            self.position = 0
+        frame = self[self.position]
+        self.position += 1
+        return frame
+
+    def close(self):
+        """Fecha o mapeamento. Fatias ainda em uso impedem o fechamento (BufferError)"""
+        if self._mmap.closed:
+            return
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_sequence(path, preset, total_leds, seconds, fps=30, color_order="RGB",
+                    use_native=True, progress=None):
+    """Renderiza `seconds` do preset a `fps` quadros por segundo, gravando à medida que desenha.
+
+    Os quadros seguem o tempo do efeito (um quadro novo do renderizador a cada
+    speed_ms), como no Arduino. Retorna a quantidade de quadros gravados.
+    """
+    from app.effect_renderer import EffectRenderer
+
+    renderer = EffectRenderer(total_leds, use_native=use_native)
+    renderer.set_params(preset)
+    renderer.reset()
+    frame = bytearray(renderer.frame_size())
+    out = bytearray(renderer.frame_size())
+    renderer.render_into(frame)
+    shown_until = renderer.speed_ms  # o quadro em `frame` vale até este instante (ms)
+    total = int(seconds * fps)
+    with FrameSequenceWriter(path, total_leds, fps, color_order) as writer:
+        for k in range(total):
+            t = k * 1000 / fps
+            while t >= shown_until:
+                renderer.render_into(frame)
+                shown_until += renderer.speed_ms
+            writer.write(frame if color_order == "RGB" else reorder(frame, out, "RGB", color_order))
+            if progress and (k + 1) % 256 == 0:
+                progress(k + 1, total)
+    if progress:
+        progress(total, total)
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sequências de quadros pré-renderizadas (.pals)")
+    sub = parser.add_subparsers(dest="action", required=True)
+    render = sub.add_parser("render", help="renderiza um preset em um arquivo .pals")
+    render.add_argument("path")
+    render.add_argument("--mes", type=int, required=True, help="preset salvo do mês")
+    render.add_argument("--seconds", type=float, default=60, help="duração (%(default)s s)")
+    render.add_argument("--fps", type=float, default=30, help="quadros por segundo (%(default)s)")
+    render.add_argument("--leds", type=int, help="LEDs (padrão: total_leds do config.json)")
+    render.add_argument("--color-order", default="RGB", choices=COLOR_ORDERS)
+    info = sub.add_parser("info", help="mostra o cabeçalho de um arquivo .pals")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.action == "info":
+        try:
+            with FrameSequence(args.path) as sequence:
+                print(f"{sequence.led_count} LEDs, {sequence.fps:g} fps, {sequence.color_order}, "
+                      f"{sequence.frame_count} quadros ({sequence.duration:.1f} s)")
+        except (OSError, FrameSequenceError) as e:
+            print(f"Erro: {e}")
+            return 1
+        return 0
+
+    from app.config_manager import load_config
+    from app.presets_manager import PresetsManager
+
+    preset = PresetsManager().get_preset(args.mes)
+    if preset is None:
+        print(f"Erro: preset do mês {args.mes} não existe")
+        return 1
+    leds = args.leds or int(load_config().get("total_leds", 92))
+
+    def progress(done, total):
+        print(f"\r{done}/{total} quadros", end="", flush=True)
+
+    count = render_sequence(args.path, preset, leds, args.seconds, args.fps, args.color_order, progress=progress)
+    print(f"\n{count} quadros gravados em {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+image_io.py - Gravação de imagens PNG sem dependências (zlib + struct)
+
+Usado pelas miniaturas dos presets e pelas folhas de contato de
+tools/effect_sweep.py, geradas fora da thread da GUI (e fora do Qt): RGB de
+8 bits, sem transparência.
+"""
+import os
+import struct
+import threading
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(width, height, rgb, level=6):
+    """PNG de `width` x `height` a partir de bytes RGB (linha a linha, 3 bytes por pixel)"""
+    stride = width * 3
+    if len(rgb) != stride * height:
+        raise ValueError(f"Esperados {stride * height} bytes RGB, recebidos {len(rgb)}")
+    view = memoryview(rgb)
+    # Filtro 0 (nenhum) em cada linha: as miniaturas têm poucas cores e comprimem bem assim
+    raw = b"".join(b"\x00" + view[y * stride:(y + 1) * stride] for y in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(raw, level)) + _chunk(b"IEND", b""))
+
+
+def write_png(path, width, height, rgb, level=6):
+    """Grava o PNG de forma atômica (arquivo temporário + rename); retorna `path`"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_png(width, height, rgb, level))
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,250 @@
+"""
+layout.py - Layouts físicos de LEDs carregados de arquivo (CSV/JSON)
+
+O layout (posição x, y de cada LED) é lido uma vez, validado e compilado em
+arrays compactos: coordenadas, ordem de varredura e vizinhos. O resultado
+fica em um arquivo binário ao lado do layout (`<arquivo>.layout.bin`),
+invalidado pelo hash do conteúdo, para que instalações grandes abram sem
+reprocessar a geometria.
+
+Formatos aceitos:
+- JSON: {"cols": 20, "rows": 4, "leds": [[x, y], ...]} (índice = posição na lista)
+        ou {"positions": {"0": [x, y], ...}}
+- CSV:  linhas "indice,x,y" (cabeçalho opcional)
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import struct
+from array import array
+
+DEFAULT_LAYOUT_FILE = os.path.join(os.path.dirname(__file__), "layouts", "fachada.json")
+
+CACHE_SUFFIX = ".layout.bin"
+CACHE_MAGIC = b"PALC"
+CACHE_VERSION = 1
+# magic, versão, sha256 do layout, total de LEDs, colunas, linhas
+CACHE_HEADER = struct.Struct("<4sH32sIII")
+
+NO_NEIGHBOR = -1
+
+
+class LayoutError(ValueError):
+    """Layout inválido (arquivo malformado, LEDs duplicados ou faltando)"""
+
+
+class CompiledLayout:
+    """
+    Layout compilado em arrays compactos (`array`), prontos para o preview.
+
+    Atributos:
+        xs, ys: coordenadas de cada LED (índice do LED -> célula)
+        order: índices dos LEDs em ordem de varredura (linha a linha)
+        neighbors: 4 vizinhos por LED (esquerda, direita, cima, baixo), -1 se não houver
+        issues: avisos encontrados na validação
+    """
+
+    def __init__(self, name, cols, rows, xs, ys, order, neighbors, issues=None):
+        self.name = name
+        self.cols = cols
+        self.rows = rows
+        self.xs = xs
+        self.ys = ys
+        self.order = order
+        self.neighbors = neighbors
+        self.issues = issues or []
+
+    @property
+    def total_leds(self):
+        return len(self.xs)
+
+    def positions(self):
+        """Dict índice -> (x, y), no formato usado pelo LinearLEDPreview (sem as lacunas)"""
+        return {i: (x, y) for i, (x, y) in enumerate(zip(self.xs, self.ys)) if x >= 0}
+
+    def neighbors_of(self, index):
+        """Vizinhos (esquerda, direita, cima, baixo) de um LED; -1 quando não há"""
+        return tuple(self.neighbors[index * 4:index * 4 + 4])
+
+
+# -----------------------------------------
+# Leitura
+# -----------------------------------------
+def _parse_json(text):
+    data = json.loads(text)
+    name = data.get("name", "")
+    if "leds" in data:
+        positions = {i: tuple(p) for i, p in enumerate(data["leds"])}
+    elif "positions" in data:
+        positions = {int(k): tuple(v) for k, v in data["positions"].items()}
+    else:
+        raise LayoutError("Layout JSON precisa da chave 'leds' ou 'positions'")
+    return name, data.get("cols"), data.get("rows"), positions
+
+
+def _parse_csv(text):
+    positions = {}
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), 1):
+        if not row or row[0].strip().startswith("#"):
+            continue
+        try:
+            index, x, y = (int(v) for v in row[:3])
+        except ValueError:
+            if line_no == 1:
+                continue  # cabeçalho
+            raise LayoutError(f"Linha {line_no} inválida no CSV: {row}")
+        if index in positions:
+            raise LayoutError(f"LED {index} aparece mais de uma vez (linha {line_no})")
+        positions[index] = (x, y)
+    return "", None, None, positions
+
+
+def parse_layout(text, fmt):
+    """Converte o conteúdo do arquivo em (nome, cols, rows, posições)"""
+    if fmt == "csv":
+        return _parse_csv(text)
+    return _parse_json(text)
+
+
+def validate_positions(positions, cols=None, rows=None):
+    """Lista problemas do layout: índices faltando, coordenadas repetidas e fora da grade"""
+    issues = []
+    if not positions:
+        return ["Layout sem LEDs"]
+
+    total = max(positions) + 1
+    missing = [i for i in range(total) if i not in positions]
+    if missing:
+        shown = ", ".join(str(i) for i in missing[:10])
+        issues.append(f"{len(missing)} LED(s) sem posição (lacunas): {shown}")
+
+    seen = {}
+    for index in sorted(positions):
+        x, y = positions[index]
+        if x < 0 or y < 0 or (cols and x >= cols) or (rows and y >= rows):
+            issues.append(f"LED {index} fora da grade: ({x}, {y})")
+        if (x, y) in seen:
+            issues.append(f"LEDs {seen[(x, y)]} e {index} na mesma posição ({x}, {y})")
+        else:
+            seen[(x, y)] = index
+    return issues
+
+
+def compile_layout(name, cols, rows, positions, issues=None):
+    """Compila posições em arrays compactos (coordenadas, ordem e vizinhos)"""
+    total = max(positions) + 1 if positions else 0
+    cols = cols or (max(x for x, _ in positions.values()) + 1 if positions else 0)
+    rows = rows or (max(y for _, y in positions.values()) + 1 if positions else 0)
+
+    xs = array("i", (positions.get(i, (-1, -1))[0] for i in range(total)))
+    ys = array("i", (positions.get(i, (-1, -1))[1] for i in range(total)))
+    order = array("i", sorted(positions, key=lambda i: (positions[i][1], positions[i][0])))
+
+    by_cell = {}
+    for index in order:
+        by_cell.setdefault(positions[index], index)
+    neighbors = array("i", [NO_NEIGHBOR]) * (total * 4)
+    for index, (x, y) in positions.items():
+        for k, cell in enumerate(((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1))):
+            neighbors[index * 4 + k] = by_cell.get(cell, NO_NEIGHBOR)
+
+    return CompiledLayout(name, cols, rows, xs, ys, order, neighbors, issues)
+
+
+# -----------------------------------------
+# Cache binário
+# -----------------------------------------
+def _write_cache(path, digest, layout):
+    try:
+        with open(path, "wb") as f:
+            f.write(CACHE_HEADER.pack(
+                CACHE_MAGIC, CACHE_VERSION, digest, layout.total_leds, layout.cols, layout.rows
+            ))
+            meta = json.dumps({"name": layout.name, "issues": layout.issues}).encode("utf-8")
+            f.write(struct.pack("<I", len(meta)) + meta)
+            for arr in (layout.xs, layout.ys, layout.order, layout.neighbors):
+                f.write(struct.pack("<I", len(arr)))
+                arr.tofile(f)
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar cache de layout {path}: {e}")
+
+
+def _read_cache(path, digest):
+    """Retorna o layout do cache ou None se ausente, antigo ou de outro conteúdo"""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(CACHE_HEADER.size)
+            if len(header) != CACHE_HEADER.size:
+                return None
+            magic, version, cached_digest, _, cols, rows = CACHE_HEADER.unpack(header)
+            if magic != CACHE_MAGIC or version != CACHE_VERSION or cached_digest != digest:
+                return None
+            (meta_len,) = struct.unpack("<I", f.read(4))
+            meta = json.loads(f.read(meta_len).decode("utf-8"))
+            arrays = []
+            for _ in range(4):
+                (count,) = struct.unpack("<I", f.read(4))
+                arr = array("i")
+                arr.fromfile(f, count)
+                arrays.append(arr)
+    except (OSError, EOFError, struct.error, ValueError):
+        return None
+    return CompiledLayout(meta["name"], cols, rows, *arrays, issues=meta["issues"])
+
+
+def layout_path_from_config(config):
+    """Caminho do layout em config["layout_file"] (relativo à pasta app/) ou o padrão"""
+    path = (config or {}).get("layout_file")
+    if not path:
+        return DEFAULT_LAYOUT_FILE
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), path)
+    return path
+
+
+def led_count_mismatch(layout, config):
+    """Aviso quando o layout e config["total_leds"] (o total do firmware) diferem; None se batem"""
+    config_leds = (config or {}).get("total_leds")
+    if config_leds is None or config_leds == layout.total_leds:
+        return None
+    return (f"O layout tem {layout.total_leds} LEDs, mas a configuração tem {config_leds}: "
+            f"o preview não corresponde ao firmware gerado")
+
+
+def load_layout(path=None, strict=True, use_cache=True):
+    """Carrega e compila um layout, usando o cache binário quando o conteúdo não mudou.
+
+    Args:
+        path: arquivo .json ou .csv (padrão: layout da fachada em app/layouts)
+        strict: se True, lança LayoutError quando a validação encontra problemas;
+                se False, os problemas ficam em `layout.issues`
+        use_cache: lê/grava o arquivo `<path>.layout.bin`
+    """
+    path = path or DEFAULT_LAYOUT_FILE
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content).digest()
+    cache_path = path + CACHE_SUFFIX
+
+    layout = _read_cache(cache_path, digest) if use_cache else None
+    if layout is None:
+        layout = _compile_file(path, content)
+        if use_cache:
+            _write_cache(cache_path, digest, layout)
+
+    if layout.issues and strict:
+        raise LayoutError(f"Layout inválido em {path}:\n- " + "\n- ".join(layout.issues))
+    return layout
+
+
+def _compile_file(path, content):
+    fmt = "csv" if path.lower().endswith(".csv") else "json"
+    try:
+        name, cols, rows, positions = parse_layout(content.decode("utf-8"), fmt)
+    except (ValueError, TypeError) as e:
+        raise LayoutError(f"Layout inválido em {path}: {e}") from e
+
+    issues = validate_positions(positions, cols, rows)
+    return compile_layout(name, cols, rows, positions, issues)
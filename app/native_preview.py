@@ -0,0 +1,291 @@
+"""
+native_preview.py - Funções de efeito do firmware compiladas para o host
+
+Compila os mesmos trechos C++ que o gerador emite para o Arduino
+(app/firmware_fragments.py) como biblioteca compartilhada e os chama via
+ctypes. O preview passa a mostrar exatamente o que o dispositivo vai
+desenhar, byte a byte. Sem compilador C++ disponível, `load_backend()`
+retorna None e o EffectRenderer usa a implementação em Python.
+
+Os globais do firmware (fita, semente, estado dos efeitos) viram membros de
+um EffectContext: cada renderizador tem o seu e passa a instância em toda
+chamada, então previews em paralelo não interferem entre si.
+
+A biblioteca fica em cache no diretório temporário, com o hash do código-fonte
+no nome: só é recompilada quando os fragmentos de efeito mudam.
+"""
+import ctypes
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from app.effect_kernels import DEFAULT_SEED
+from app.firmware_fragments import EFFECT_FRAGMENTS, resolve_fragments
+from app.timeline import MAX_SEGMENTS
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "phoneaid_native_preview")
+COMPILERS = ("c++", "g++", "clang++")
+
+# NUM_LEDS e os laços do firmware são uint16_t
+MAX_NATIVE_LEDS = 65535
+
+HOST_PRELUDE = '''
+#include <stdint.h>
+#include <string.h>
+
+// Flash do AVR no host: leitura direta
+#define PROGMEM
+#define pgm_read_byte(addr) (*(const uint8_t*)(addr))
+
+struct CRGB {{
+    uint8_t r, g, b;
+    CRGB() {{}}
+    CRGB(uint8_t r_, uint8_t g_, uint8_t b_) : r(r_), g(g_), b(b_) {{}}
+}};
+
+static inline void fill_solid(CRGB* leds, int count, const CRGB& color) {{
+    for (int i = 0; i < count; i++) leds[i] = color;
+}}
+
+struct Effect {{
+    uint8_t type;
+    uint8_t r1, g1, b1;
+    uint8_t r2, g2, b2;
+    uint16_t speed_ms;
+    uint16_t wave_width;
+    uint8_t density;
+    uint16_t seed;
+}};
+
+// Primitivas de 8 bits do FastLED 3.x (implementação em C, espelhada em app/effect_kernels.py)
+static inline uint8_t qadd8(uint8_t a, uint8_t b) {{ int t = a + b; return t > 255 ? 255 : t; }}
+static inline uint8_t qsub8(uint8_t a, uint8_t b) {{ int t = a - b; return t < 0 ? 0 : t; }}
+static const uint8_t b_m16_interleave[] = {{ 0, 49, 49, 41, 90, 27, 117, 10 }};
+static inline uint8_t sin8(uint8_t theta) {{
+    uint8_t offset = theta;
+    if (theta & 0x40) offset = (uint8_t)255 - offset;
+    offset &= 0x3F;
+    uint8_t secoffset = offset & 0x0F;
+    if (theta & 0x40) ++secoffset;
+    uint8_t section = offset >> 4;
+    uint8_t b = b_m16_interleave[section * 2];
+    uint8_t m16 = b_m16_interleave[section * 2 + 1];
+    uint8_t mx = (m16 * secoffset) >> 4;
+    int8_t y = mx + b;
+    if (theta & 0x80) y = -y;
+    y += 128;
+    return y;
+}}
+
+// Tudo o que no firmware é global (fita, relógio, semente, estado dos efeitos)
+// fica num contexto por renderizador: dois previews não mexem no estado um do outro
+struct EffectContext {{
+    // No host a fita tem tamanho definido em tempo de execução e o buffer da
+    // fachada aponta direto para o buffer RGB do preview
+    uint16_t NUM_LEDS = 0;
+    CRGB* leds = 0;
+    uint32_t host_millis = 0;
+    const uint8_t* effect_data = 0;
+    Effect active_effect;
+
+    uint32_t millis() {{ return host_millis; }}
+
+    uint16_t rand16seed = {default_seed};
+    void random16_set_seed(uint16_t seed) {{ rand16seed = seed; }}
+    uint16_t random16() {{ rand16seed = (uint16_t)(rand16seed * 2053 + 13849); return rand16seed; }}
+    uint16_t random16(uint16_t lim) {{ return (uint16_t)(((uint32_t)random16() * lim) >> 16); }}
+    uint8_t random8() {{
+        random16();
+        return (uint8_t)((uint8_t)(rand16seed & 0xFF) + (uint8_t)(rand16seed >> 8));
+    }}
+    uint8_t random8(uint8_t lim) {{ return (uint8_t)((random8() * lim) >> 8); }}
+    uint8_t random8(uint8_t min, uint8_t lim) {{ return random8((uint8_t)(lim - min)) + min; }}
+'''
+
+HOST_ENTRY = '''
+    uint16_t render(const Effect* source, uint8_t* out, uint16_t num_leds, uint16_t index,
+                    uint32_t now_ms, const uint8_t* data, uint8_t reset) {{
+        Effect effect = *source;
+        active_effect = effect;
+        NUM_LEDS = num_leds;
+        leds = (CRGB*)out;
+        host_millis = now_ms;
+        effect_data = data;
+        if (reset) {{
+{effect_reset}        }}
+{set_index}
+        switch (effect.type) {{
+{effect_cases}        }}
+        return {get_index};
+    }}
+}};
+
+extern "C" void* native_context_new() {{
+    return new EffectContext();
+}}
+
+extern "C" void native_context_free(void* context) {{
+    delete (EffectContext*)context;
+}}
+
+extern "C" uint16_t native_render(void* context, const Effect* source, uint8_t* out, uint16_t num_leds,
+                                  uint16_t index, uint32_t now_ms, const uint8_t* data, uint8_t reset) {{
+    return ((EffectContext*)context)->render(source, out, num_leds, index, now_ms, data, reset);
+}}
+'''
+
+
+class NativeEffect(ctypes.Structure):
+    """Espelho da struct Effect do firmware"""
+    _fields_ = [
+        ("type", ctypes.c_uint8),
+        ("r1", ctypes.c_uint8), ("g1", ctypes.c_uint8), ("b1", ctypes.c_uint8),
+        ("r2", ctypes.c_uint8), ("g2", ctypes.c_uint8), ("b2", ctypes.c_uint8),
+        ("speed_ms", ctypes.c_uint16),
+        ("wave_width", ctypes.c_uint16),
+        ("density", ctypes.c_uint8),
+        ("seed", ctypes.c_uint16),
+    ]
+
+
+# Valores que no firmware vêm dos presets; no host as tabelas chegam por native_render
+HOST_CONTEXT = {
+    "timeline_table": "#define TIMELINE_DATA effect_data",
+    "baked_table": "#define BAKED_DATA effect_data",
+    "timeline_max_segments": MAX_SEGMENTS,
+    "fx_state_size": MAX_NATIVE_LEDS,
+}
+
+
+def host_source():
+    """Código C++ da biblioteca: trechos de efeito do firmware + ponto de entrada"""
+    fragments = resolve_fragments(EFFECT_FRAGMENTS.values())
+    parts = [HOST_PRELUDE.format(default_seed=DEFAULT_SEED)]
+    for fragment in fragments:
+        for section in ("globals", "functions"):
+            if section in fragment.sections:
+                parts.append(fragment.sections[section].format(**HOST_CONTEXT))
+    uses_index = any("wave_index" in fragment.sections.get("globals", "") for fragment in fragments)
+    parts.append(HOST_ENTRY.format(
+        effect_cases="".join(f.hooks["effect_cases"].format() for f in fragments if "effect_cases" in f.hooks),
+        effect_reset="".join(f.hooks["effect_reset"].format() for f in fragments if "effect_reset" in f.hooks),
+        set_index="        wave_index = index;" if uses_index else "        (void)index;",
+        get_index="wave_index" if uses_index else "index",
+    ))
+    return "\n".join(parts)
+
+
+def _library_suffix():
+    if sys.platform.startswith("win"):
+        return ".dll"
+    if sys.platform == "darwin":
+        return ".dylib"
+    return ".so"
+
+
+def build_library(source=None, cache_dir=CACHE_DIR):
+    """Compila (ou reaproveita do cache) a biblioteca; retorna o caminho ou None"""
+    source = source or host_source()
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    lib_path = os.path.join(cache_dir, f"effects_{digest}{_library_suffix()}")
+    if os.path.exists(lib_path):
+        return lib_path
+
+    compiler = next((c for c in COMPILERS if shutil.which(c)), None)
+    if compiler is None:
+        return None
+
+    os.makedirs(cache_dir, exist_ok=True)
+    src_path = os.path.join(cache_dir, f"effects_{digest}.cpp")
+    with open(src_path, "w", encoding="utf-8") as f:
+        f.write(source)
+    # Compila em nome temporário: outro processo nunca carrega um arquivo pela metade
+    tmp_path = f"{lib_path}.{os.getpid()}.tmp"
+    try:
+        result = subprocess.run(
+            [compiler, "-O2", "-shared", "-fPIC", "-o", tmp_path, src_path],
+            capture_output=True, text=True, timeout=120
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Aviso: preview nativo indisponível ({e})")
+        return None
+    if result.returncode != 0:
+        print(f"Aviso: falha ao compilar preview nativo:\n{result.stderr.strip()}")
+        return None
+    os.replace(tmp_path, lib_path)
+    return lib_path
+
+
+class NativeContext:
+    """Estado do firmware (fita, semente, estado dos efeitos) de um renderizador, no lado C++"""
+
+    def __init__(self, lib):
+        self._free = lib.native_context_free
+        self.handle = lib.native_context_new()
+        if not self.handle:
+            raise MemoryError("contexto do preview nativo")
+
+    def __del__(self):
+        if getattr(self, "handle", None):
+            self._free(self.handle)
+            self.handle = None
+
+
+class NativeBackend:
+    """Renderiza quadros chamando as funções de efeito compiladas"""
+
+    def __init__(self, lib_path):
+        self.lib_path = lib_path
+        self._lib = ctypes.CDLL(lib_path)
+        self._lib.native_context_new.argtypes = []
+        self._lib.native_context_new.restype = ctypes.c_void_p
+        self._lib.native_context_free.argtypes = [ctypes.c_void_p]
+        self._lib.native_context_free.restype = None
+        self._render = self._lib.native_render
+        self._render.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(NativeEffect), ctypes.c_void_p, ctypes.c_uint16, ctypes.c_uint16,
+            ctypes.c_uint32, ctypes.c_char_p, ctypes.c_uint8
+        ]
+        self._render.restype = ctypes.c_uint16
+
+    def new_context(self):
+        """Contexto próprio para um renderizador (a biblioteca é compartilhada, o estado não)"""
+        return NativeContext(self._lib)
+
+    def make_effect(self, effect_type, color1, color2, speed_ms, wave_width, density=0, seed=DEFAULT_SEED):
+        return NativeEffect(effect_type, *color1, *color2, speed_ms, wave_width, density, seed)
+
+    def render(self, context, effect, buf, total_leds, index, now_ms=0, data=None, reset=False):
+        """Desenha um quadro em `buf` (bytearray, in-place); retorna o índice após o quadro.
+
+        `context` vem de new_context() e guarda o estado entre quadros; `now_ms`
+        é o millis() visto pelo efeito, `data` a tabela do efeito (ex.: linha do
+        tempo, bytes) e `reset` repete o que select_effect() faz no firmware.
+        """
+        address = ctypes.addressof((ctypes.c_uint8 * len(buf)).from_buffer(buf))
+        return self._render(context.handle, ctypes.byref(effect), address, total_leds, index,
+                            now_ms & 0xFFFFFFFF, data, 1 if reset else 0)
+
+
+_backend = None
+_backend_loaded = False
+_backend_lock = threading.Lock()
+
+
+def load_backend():
+    """Backend nativo compartilhado (compilado na primeira chamada) ou None"""
+    global _backend, _backend_loaded
+    with _backend_lock:
+        if not _backend_loaded:
+            _backend_loaded = True
+            try:
+                lib_path = build_library()
+                _backend = NativeBackend(lib_path) if lib_path else None
+            except OSError as e:
+                print(f"Aviso: preview nativo indisponível ({e})")
+                _backend = None
+        return _backend
@@ -0,0 +1,313 @@
+"""
+preset_store.py - Armazenamento de presets em SQLite, com histórico de revisões
+
+Alternativa ao presets/efeitos.json para quando há muitos presets de campanha
+(datas comemorativas, promoções, variações por loja). Ativado pela chave
+"presets_db" do config; o PresetsManager continua com a mesma API.
+
+Tabelas:
+
+    presets    um registro por preset: mês (ou NULL), loja, se é o preset do
+               mês (`slot`), se está ativo e qual revisão está em uso
+    revisions  conteúdo JSON de cada versão do preset; só recebe INSERTs
+               (triggers bloqueiam UPDATE e DELETE), então voltar a uma
+               versão antiga é gravar uma revisão nova com o conteúdo dela
+    preset_tags etiquetas livres ("natal", "promoção", ...)
+
+O banco roda em modo WAL: a interface lê enquanto outra instância (o gerador
+em lote, por exemplo) grava, e cada alteração grava só as linhas envolvidas
+em vez do arquivo inteiro.
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+SCHEMA_VERSION = 1
+
+# Campos guardados fora do JSON da revisão (mudar o ativo não cria revisão)
+_ROW_FIELDS = ("mes", "ativo")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    id INTEGER PRIMARY KEY,
+    mes INTEGER,
+    loja TEXT NOT NULL DEFAULT '',
+    slot INTEGER NOT NULL DEFAULT 0,
+    ativo INTEGER NOT NULL DEFAULT 0,
+    revision INTEGER,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS revisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    preset_id INTEGER NOT NULL REFERENCES presets(id),
+    data TEXT NOT NULL,
+    note TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS preset_tags (
+    preset_id INTEGER NOT NULL REFERENCES presets(id),
+    tag TEXT NOT NULL,
+    PRIMARY KEY (tag, preset_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_presets_mes ON presets(mes);
+CREATE INDEX IF NOT EXISTS idx_presets_loja ON presets(loja, mes);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_presets_slot ON presets(loja, mes) WHERE slot = 1;
+CREATE INDEX IF NOT EXISTS idx_revisions_preset ON revisions(preset_id, id);
+CREATE INDEX IF NOT EXISTS idx_tags_preset ON preset_tags(preset_id);
+CREATE TRIGGER IF NOT EXISTS revisions_no_update BEFORE UPDATE ON revisions
+BEGIN SELECT RAISE(ABORT, 'revisões não podem ser alteradas'); END;
+CREATE TRIGGER IF NOT EXISTS revisions_no_delete BEFORE DELETE ON revisions
+BEGIN SELECT RAISE(ABORT, 'revisões não podem ser apagadas'); END;
+"""
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+class SQLitePresetStore:
+    """
+    Presets em um banco SQLite.
+
+    Os 12 presets mensais de cada loja são os registros com `slot = 1`; os
+    demais são presets de campanha, listados com `iter_presets`.
+    Uma conexão é compartilhada entre threads, protegida por um lock.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        directory = os.path.dirname(db_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # -----------------------------------------
+    # Infraestrutura
+    # -----------------------------------------
+    @contextmanager
+    def _transaction(self):
+        """Transação de escrita (BEGIN IMMEDIATE ... COMMIT/ROLLBACK)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn.cursor()
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _clean(data):
+        return {k: v for k, v in data.items() if k not in _ROW_FIELDS}
+
+    def _add_revision(self, cur, preset_id, data, note=""):
+        cur.execute(
+            "INSERT INTO revisions (preset_id, data, note, created_at) VALUES (?, ?, ?, ?)",
+            (preset_id, json.dumps(self._clean(data), ensure_ascii=False, sort_keys=True), note, _now())
+        )
+        revision = cur.lastrowid
+        cur.execute("UPDATE presets SET revision = ?, updated_at = ? WHERE id = ?",
+                    (revision, _now(), preset_id))
+        return revision
+
+    def _set_tags(self, cur, preset_id, tags):
+        cur.execute("DELETE FROM preset_tags WHERE preset_id = ?", (preset_id,))
+        cur.executemany("INSERT OR IGNORE INTO preset_tags (preset_id, tag) VALUES (?, ?)",
+                        [(preset_id, str(tag).strip().lower()) for tag in tags if str(tag).strip()])
+
+    @staticmethod
+    def _row_to_preset(row):
+        preset = {"mes": row["mes"]}
+        preset.update(json.loads(row["data"]))
+        preset["ativo"] = bool(row["ativo"])
+        return preset
+
+    _SELECT = ("SELECT p.id, p.mes, p.loja, p.slot, p.ativo, p.revision, p.updated_at, r.data "
+               "FROM presets p JOIN revisions r ON r.id = p.revision")
+
+    # -----------------------------------------
+    # Presets mensais (API do PresetsManager)
+    # -----------------------------------------
+    def is_empty(self, loja=""):
+        return not self._query("SELECT 1 FROM presets WHERE slot = 1 AND loja = ? LIMIT 1", (loja,))
+
+    def get_slot(self, mes, loja=""):
+        """Preset do mês `mes` da loja (dict) ou None"""
+        rows = self._query(self._SELECT + " WHERE p.slot = 1 AND p.loja = ? AND p.mes = ?", (loja, mes))
+        return self._row_to_preset(rows[0]) if rows else None
+
+    def list_slots(self, loja=""):
+        """Os presets mensais da loja, em ordem de mês"""
+        rows = self._query(self._SELECT + " WHERE p.slot = 1 AND p.loja = ? ORDER BY p.mes", (loja,))
+        return [self._row_to_preset(row) for row in rows]
+
+    def get_active_slot(self, loja=""):
+        rows = self._query(self._SELECT + " WHERE p.slot = 1 AND p.loja = ? "
+                           "ORDER BY p.ativo DESC, p.mes LIMIT 1", (loja,))
+        return self._row_to_preset(rows[0]) if rows else None
+
+    def save_slot(self, mes, data, loja="", note="", ativo=None):
+        """Grava uma nova revisão do preset do mês (cria o registro se não existir)"""
+        with self._transaction() as cur:
+            row = cur.execute("SELECT id, ativo FROM presets WHERE slot = 1 AND loja = ? AND mes = ?",
+                              (loja, mes)).fetchone()
+            if row is None:
+                cur.execute("INSERT INTO presets (mes, loja, slot, ativo, updated_at) VALUES (?, ?, 1, ?, ?)",
+                            (mes, loja, int(bool(data.get("ativo") if ativo is None else ativo)), _now()))
+                preset_id = cur.lastrowid
+            else:
+                preset_id = row["id"]
+                if ativo is not None:
+                    cur.execute("UPDATE presets SET ativo = ? WHERE id = ?", (int(bool(ativo)), preset_id))
+            return self._add_revision(cur, preset_id, data, note)
+
+    def set_active_slot(self, mes, loja=""):
+        """Marca só o preset do mês `mes` como ativo"""
+        with self._transaction() as cur:
+            cur.execute("UPDATE presets SET ativo = (mes = ?) WHERE slot = 1 AND loja = ?", (mes, loja))
+
+    def slot_id(self, mes, loja=""):
+        rows = self._query("SELECT id FROM presets WHERE slot = 1 AND loja = ? AND mes = ?", (loja, mes))
+        return rows[0]["id"] if rows else None
+
+    # -----------------------------------------
+    # Presets de campanha
+    # -----------------------------------------
+    def add_preset(self, data, mes=None, loja="", tags=(), note=""):
+        """Cria um preset de campanha; retorna o id"""
+        with self._transaction() as cur:
+            cur.execute("INSERT INTO presets (mes, loja, slot, ativo, updated_at) VALUES (?, ?, 0, 0, ?)",
+                        (mes, loja, _now()))
+            preset_id = cur.lastrowid
+            self._add_revision(cur, preset_id, data, note)
+            self._set_tags(cur, preset_id, tags)
+            return preset_id
+
+    def update_preset(self, preset_id, data, note=""):
+        """Grava uma nova revisão de qualquer preset; retorna o id da revisão"""
+        with self._transaction() as cur:
+            if cur.execute("SELECT 1 FROM presets WHERE id = ?", (preset_id,)).fetchone() is None:
+                raise KeyError(f"Preset {preset_id} não existe")
+            return self._add_revision(cur, preset_id, data, note)
+
+    def set_tags(self, preset_id, tags):
+        with self._transaction() as cur:
+            self._set_tags(cur, preset_id, tags)
+
+    def get(self, preset_id):
+        """Preset pelo id, com "id", "loja", "revisao" e "tags" (ou None)"""
+        rows = self._query(self._SELECT + " WHERE p.id = ?", (preset_id,))
+        return self._with_meta(rows[0]) if rows else None
+
+    def _with_meta(self, row):
+        preset = self._row_to_preset(row)
+        preset["id"] = row["id"]
+        preset["loja"] = row["loja"]
+        preset["revisao"] = row["revision"]
+        preset["tags"] = [r["tag"] for r in self._query(
+            "SELECT tag FROM preset_tags WHERE preset_id = ? ORDER BY tag", (row["id"],))]
+        return preset
+
+    def iter_presets(self, mes=None, tag=None, loja=None, batch_size=100):
+        """
+        Percorre presets (mensais e de campanha) filtrando por mês, etiqueta e loja.
+        É um gerador: as linhas são lidas do banco em lotes de `batch_size`,
+        então listas grandes não são carregadas de uma vez.
+        """
+        join, where, params = self._filters(mes, tag, loja)
+        sql = self._SELECT + join + " WHERE " + " AND ".join(where + ["p.id > ?"]) + " ORDER BY p.id LIMIT ?"
+        last_id = 0
+        while True:
+            rows = self._query(sql, params + [last_id, batch_size])
+            for row in rows:
+                yield self._with_meta(row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]["id"]
+
+    def count(self, mes=None, tag=None, loja=None):
+        join, where, params = self._filters(mes, tag, loja)
+        sql = "SELECT COUNT(*) FROM presets p" + join
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._query(sql, params)[0][0]
+
+    @staticmethod
+    def _filters(mes, tag, loja):
+        """JOIN, condições e parâmetros dos filtros por mês, etiqueta e loja (todos indexados)"""
+        join, where, params = "", [], []
+        if tag is not None:
+            join = " JOIN preset_tags t ON t.preset_id = p.id"
+            where.append("t.tag = ?")
+            params.append(str(tag).strip().lower())
+        if mes is not None:
+            where.append("p.mes = ?")
+            params.append(mes)
+        if loja is not None:
+            where.append("p.loja = ?")
+            params.append(loja)
+        return join, where, params
+
+    # -----------------------------------------
+    # Histórico
+    # -----------------------------------------
+    def history(self, preset_id):
+        """Revisões do preset, da mais nova para a mais antiga: [{"revisao", "data", "nota", "criado_em"}]"""
+        rows = self._query("SELECT id, data, note, created_at FROM revisions WHERE preset_id = ? "
+                           "ORDER BY id DESC", (preset_id,))
+        return [{"revisao": row["id"], "data": json.loads(row["data"]), "nota": row["note"],
+                 "criado_em": row["created_at"]} for row in rows]
+
+    def rollback(self, preset_id, revision):
+        """Volta o preset ao conteúdo de `revision` (gravando uma revisão nova)"""
+        with self._transaction() as cur:
+            row = cur.execute("SELECT data FROM revisions WHERE id = ? AND preset_id = ?",
+                              (revision, preset_id)).fetchone()
+            if row is None:
+                raise KeyError(f"Revisão {revision} não pertence ao preset {preset_id}")
+            return self._add_revision(cur, preset_id, json.loads(row["data"]),
+                                      f"rollback para a revisão {revision}")
+
+    # -----------------------------------------
+    # efeitos.json
+    # -----------------------------------------
+    def import_json(self, path, loja="", note="importado de efeitos.json"):
+        """Importa os presets mensais de um efeitos.json; retorna quantos foram gravados"""
+        with open(path, "r", encoding="utf-8") as f:
+            presets = json.load(f).get("presets", [])
+        count = 0
+        for preset in presets:
+            if isinstance(preset, dict) and 1 <= int(preset.get("mes", 0)) <= 12:
+                self.save_slot(int(preset["mes"]), preset, loja=loja, note=note,
+                               ativo=bool(preset.get("ativo")))
+                count += 1
+        return count
+
+    def export_json(self, path, loja=""):
+        """Grava os presets mensais da loja no formato do efeitos.json"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        presets = self.list_slots(loja)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"presets": presets, "last_updated": _now()}, f, indent=4, ensure_ascii=False)
+        return len(presets)
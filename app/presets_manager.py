@@ -1,15 +1,25 @@
 """
 presets_manager.py - Gerenciador de presets mensais (até 12)
+
+Por padrão os presets ficam em presets/efeitos.json. Com a chave "presets_db"
+no config (caminho relativo à pasta app/), ficam em um banco SQLite com
+histórico de revisões e presets de campanha (ver preset_store.py); a chave
+"loja" escolhe de qual loja são os 12 presets mensais.
 """
 import json
 import os
 from datetime import datetime
 
+from app.config_manager import load_config
+from app.effect_kernels import DEFAULT_DENSITY, DEFAULT_SEED
+from app.preset_store import SQLitePresetStore
+
 
 class PresetsManager:
     """
     Gerencia até 12 presets mensais (um para cada mês).
-    Salva/carrega de presets/efeitos.json.
+    Salva/carrega de presets/efeitos.json ou, com `db_file`, de um banco SQLite
+    (`store`); o efeitos.json continua servindo para importar e exportar.
     """
     
     MONTHS = [
@@ -30,6 +40,8 @@ class PresetsManager:
                 "color2": "#0000FF",
                 "velocidade": "Médio",
                 "wave_width": 10,
+                "densidade": DEFAULT_DENSITY,  # Cintilar/Fogo: chance de faísca por quadro
+                "semente": DEFAULT_SEED,       # Cintilar/Fogo: sequência aleatória (igual no preview e no Arduino)
                 "blink": False,
                 "blink_speed": "Médio",
                 "descricao": f"Efeito padrão de {PresetsManager.MONTHS[i]}"
@@ -37,14 +49,47 @@ class PresetsManager:
             for i in range(12)
         ]
     
-    def __init__(self, presets_file=None):
+    def __init__(self, presets_file=None, db_file=None, loja=None):
+        if presets_file is None and db_file is None:
+            config = load_config()
+            db_file = config.get("presets_db")
+            if db_file and not os.path.isabs(db_file):
+                db_file = os.path.join(os.path.dirname(__file__), db_file)
+            if loja is None:
+                loja = config.get("loja", "")
         if presets_file is None:
             presets_file = os.path.join(
                 os.path.dirname(__file__), "presets", "efeitos.json"
             )
         self.presets_file = presets_file
-        self.presets = self._load_presets()
-    
+        self.loja = loja or ""
+        self.store = None
+        if db_file:
+            self.store = SQLitePresetStore(db_file)
+            self._init_store()
+        else:
+            self._presets = self._load_presets()
+
+    @property
+    def presets(self):
+        """Lista dos 12 presets (com SQLite, lida do banco a cada acesso)"""
+        if self.store is not None:
+            return self.store.list_slots(self.loja)
+        return self._presets
+
+    def _init_store(self):
+        """Banco novo: importa o efeitos.json existente ou grava os presets padrão"""
+        if not self.store.is_empty(self.loja):
+            return
+        if os.path.exists(self.presets_file) and os.path.getsize(self.presets_file) > 0:
+            try:
+                if self.store.import_json(self.presets_file, loja=self.loja):
+                    return
+            except Exception as e:
+                print(f"Erro ao importar presets: {e}. Usando padrão.")
+        for preset in self._create_default_presets():
+            self.store.save_slot(preset["mes"], preset, loja=self.loja, note="padrão")
+
     def _load_presets(self):
         """Carrega presets do arquivo ou cria padrão"""
         os.makedirs(os.path.dirname(self.presets_file), exist_ok=True)
@@ -61,7 +106,9 @@ class PresetsManager:
         return self._create_default_presets()
     
     def save_presets(self):
-        """Salva presets em arquivo"""
+        """Salva presets em arquivo (com SQLite cada alteração já é gravada na hora)"""
+        if self.store is not None:
+            return
         os.makedirs(os.path.dirname(self.presets_file), exist_ok=True)
         with open(self.presets_file, "w", encoding="utf-8") as f:
             json.dump(
@@ -74,6 +121,8 @@ class PresetsManager:
     def get_preset(self, mes):
         """Retorna preset de um mês (1-12)"""
         if 1 <= mes <= 12:
+            if self.store is not None:
+                return self.store.get_slot(mes, self.loja)
             for preset in self.presets:
                 if preset["mes"] == mes:
                     return preset
@@ -81,6 +130,13 @@ class PresetsManager:
     
     def update_preset(self, mes, effect_data):
         """Atualiza preset de um mês com dados de efeito"""
+        if self.store is not None:
+            preset = self.store.get_slot(mes, self.loja)
+            if preset is None:
+                return False
+            preset.update(effect_data)
+            self.store.save_slot(mes, preset, loja=self.loja, ativo=True)
+            return True
         for preset in self.presets:
             if preset["mes"] == mes:
                 preset.update(effect_data)
@@ -95,6 +151,8 @@ class PresetsManager:
     
     def get_active_preset(self):
         """Retorna o preset ativo (ou o primeiro se nenhum estiver ativo)"""
+        if self.store is not None:
+            return self.store.get_active_slot(self.loja)
         for preset in self.presets:
             if preset.get("ativo"):
                 return preset
@@ -102,9 +160,52 @@ class PresetsManager:
     
     def set_active_preset(self, mes):
         """Define qual preset é o ativo (só um por vez)"""
+        if self.store is not None:
+            self.store.set_active_slot(mes, self.loja)
+            return
         for preset in self.presets:
             preset["ativo"] = (preset["mes"] == mes)
         self.save_presets()
+
+    # -----------------------------------------
+    # Histórico e efeitos.json (histórico só com SQLite)
+    # -----------------------------------------
+    def history(self, mes):
+        """Revisões do preset do mês, da mais nova para a mais antiga ([] sem SQLite)"""
+        if self.store is None:
+            return []
+        preset_id = self.store.slot_id(mes, self.loja)
+        return self.store.history(preset_id) if preset_id is not None else []
+
+    def rollback(self, mes, revision):
+        """Volta o preset do mês a uma revisão anterior (só com SQLite)"""
+        if self.store is None:
+            return False
+        preset_id = self.store.slot_id(mes, self.loja)
+        if preset_id is None:
+            return False
+        self.store.rollback(preset_id, revision)
+        return True
+
+    def export_json(self, path=None):
+        """Grava os 12 presets no formato do efeitos.json (padrão: presets_file)"""
+        path = path or self.presets_file
+        if self.store is not None:
+            return self.store.export_json(path, loja=self.loja)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"presets": self.presets, "last_updated": datetime.now().isoformat()},
+                      f, indent=4, ensure_ascii=False)
+        return len(self.presets)
+
+    def import_json(self, path=None):
+        """Substitui os presets pelos de um efeitos.json; retorna quantos foram lidos"""
+        path = path or self.presets_file
+        if self.store is not None:
+            return self.store.import_json(path, loja=self.loja)
+        with open(path, "r", encoding="utf-8") as f:
+            self._presets = json.load(f).get("presets", [])
+        self.save_presets()
+        return len(self._presets)
     
     def validate_preset(self, preset):
         """Valida se um preset tem os campos necessários"""
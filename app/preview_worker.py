@@ -0,0 +1,179 @@
+"""
+preview_worker.py - Renderização do preview em thread de fundo
+
+O renderizador produz quadros em um buffer triplo; a GUI só pega o quadro
+pronto mais recente. A troca usa apenas operações atômicas de `deque`
+(append/pop), sem locks no caminho de pintura.
+"""
+import threading
+import time
+from collections import deque
+
+from app.effect_renderer import EffectRenderer
+from app.frame_sequence import FrameSequence
+
+
+class FrameTripleBuffer:
+    """
+    Três buffers RGB pré-alocados que circulam entre produtor e consumidor.
+
+    Cada buffer está sempre em exatamente um lugar: com o produtor (sendo
+    desenhado), em `_ready` (pronto, ainda não exibido), em `_free` ou na
+    frente (exibido pela GUI). O consumidor nunca espera pelo produtor.
+    """
+
+    def __init__(self, frame_size, count=3):
+        if count < 3:
+            raise ValueError("FrameTripleBuffer precisa de pelo menos 3 buffers")
+        self.buffers = [bytearray(frame_size) for _ in range(count)]
+        self._front = 0
+        self._free = deque(range(1, count))
+        self._ready = deque()
+        self.published = 0
+
+    def acquire(self):
+        """Produtor: retorna o índice de um buffer livre para desenhar"""
+        return self._free.popleft()
+
+    def publish(self, index):
+        """Produtor: entrega o buffer desenhado; um quadro antigo não exibido volta a ficar livre"""
+        try:
+            stale = self._ready.pop()
+        except IndexError:
+            stale = None
+        self._ready.append(index)
+        if stale is not None:
+            self._free.append(stale)
+        self.published += 1
+
+    def take_latest(self):
+        """Consumidor: retorna o quadro mais recente ou None se não houver quadro novo"""
+        try:
+            index = self._ready.pop()
+        except IndexError:
+            return None
+        self._free.append(self._front)
+        self._front = index
+        return self.buffers[index]
+
+    @property
+    def front(self):
+        """Quadro exibido atualmente (pertence ao consumidor)"""
+        return self.buffers[self._front]
+
+
+class PreviewRenderWorker(threading.Thread):
+    """
+    Thread que renderiza o efeito no ritmo do próprio efeito (speed_ms).
+    A GUI envia pedidos com `set_effect()` e lê quadros de `frames`.
+    """
+
+    def __init__(self, total_leds):
+        super().__init__(daemon=True)
+        self.renderer = EffectRenderer(total_leds)
+        self.frames = FrameTripleBuffer(self.renderer.frame_size())
+        self.is_running = True
+        self.paused = False
+        self._requests = deque(maxlen=1)  # só o pedido mais recente importa
+        self._wake = threading.Event()
+
+    def set_effect(self, params, animate):
+        """Troca o efeito (reinicia a animação). `animate=False` gera um único quadro parado"""
+        self._requests.append((dict(params), animate))
+        self._wake.set()
+
+    def set_sequence(self, sequence, loop=True):
+        """Reproduz uma FrameSequence (app/frame_sequence.py) no lugar do efeito, no fps dela"""
+        if sequence.led_count != self.renderer.total_leds:
+            raise ValueError(f"Sequência de {sequence.led_count} LEDs; o preview tem {self.renderer.total_leds}")
+        self._requests.append((sequence, loop))
+        self._wake.set()
+
+    def pause(self):
+        """Suspende a animação (preview fora da tela); o quadro atual é mantido"""
+        self.paused = True
+        self._wake.set()
+
+    def resume(self):
+        """Retoma do mesmo quadro em que a animação parou"""
+        self.paused = False
+        self._wake.set()
+
+    def stop(self):
+        """Para a thread de renderização"""
+        self.is_running = False
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout=1)
+
+    def _render(self, advance):
+        index = self.frames.acquire()
+        self.renderer.render_into(self.frames.buffers[index], advance=advance)
+        self.frames.publish(index)
+
+    def _show_sequence_frame(self, sequence, index):
+        buf_index = self.frames.acquire()
+        buf = self.frames.buffers[buf_index]
+        if sequence.color_order == "RGB":
+            buf[:] = sequence[index]
+        else:
+            sequence.frame_rgb(index, buf)
+        self.frames.publish(buf_index)
+
+    def run(self):
+        animate = False
+        next_due = 0.0
+        sequence = None
+        loop = False
+        started = 0.0
+        shown = 0
+
+        while self.is_running:
+            if self.paused:
+                # Congela o relógio da animação: na volta, continua da mesma fase
+                paused_at = time.monotonic()
+                while self.paused and self.is_running:
+                    self._wake.wait()
+                    self._wake.clear()
+                paused_for = time.monotonic() - paused_at
+                next_due += paused_for
+                started += paused_for
+                continue
+
+            try:
+                params, animate = self._requests.pop()
+            except IndexError:
+                params = None
+
+            now = time.monotonic()
+            if isinstance(params, FrameSequence):
+                # O quadro vem do relógio: se a thread atrasar, quadros são pulados
+                sequence, loop, started, shown = params, animate, now, 0
+                animate = len(sequence) > 1
+                if len(sequence):
+                    self._show_sequence_frame(sequence, 0)
+                next_due = now + 1.0 / sequence.fps
+            elif params is not None:
+                sequence = None
+                self.renderer.set_params(params)
+                self.renderer.reset()
+                self._render(advance=animate)
+                next_due = now + self.renderer.speed_ms / 1000.0
+            elif animate and now >= next_due and sequence is not None:
+                index = sequence.index_at(now - started, loop)
+                if index is None:
+                    animate = False  # fim da sequência sem repetição: fica no último quadro
+                else:
+                    if index != shown:
+                        self._show_sequence_frame(sequence, index)
+                        shown = index
+                    next_due = started + (int((now - started) * sequence.fps) + 1) / sequence.fps
+            elif animate and now >= next_due:
+                self._render(advance=True)
+                next_due += self.renderer.speed_ms / 1000.0
+                if now - next_due > self.renderer.speed_ms / 1000.0:
+                    next_due = now  # atrasou mais de um quadro: ressincroniza
+
+            timeout = max(0.0, next_due - time.monotonic()) if animate else None
+            self._wake.wait(timeout)
+            self._wake.clear()
@@ -0,0 +1,146 @@
+"""
+scheduler.py - Agendamento mensal de presets e janela de standby
+
+Espelha em Python, com a mesma aritmética inteira, o agendador emitido pelo
+FirmwareGenerator no modo "12 meses". Assim a escolha do preset do mês e o
+apagamento no horário de standby podem ser simulados sem hardware.
+"""
+import json
+from datetime import datetime, timezone
+
+NO_EFFECT = 0xFF  # mês sem preset: mantém o efeito atual
+SECONDS_PER_DAY = 86400
+
+
+def parse_hhmm(value):
+    """Converte "HH:MM" em minutos desde a meia-noite (0..1439)"""
+    hours, minutes = str(value).strip().split(":")
+    hours, minutes = int(hours), int(minutes)
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError(f"Horário inválido: {value!r}")
+    return hours * 60 + minutes
+
+
+def standby_window(config):
+    """Retorna (início, fim) do standby em minutos, ou None se não configurado"""
+    standby = config.get("standby") if config else None
+    if not standby or not standby.get("start") or not standby.get("end"):
+        return None
+    return parse_hhmm(standby["start"]), parse_hhmm(standby["end"])
+
+
+def in_standby(minute_of_day, start, end):
+    """Indica se o minuto está dentro da janela [start, end), que pode cruzar a meia-noite"""
+    if start == end:
+        return False
+    if start < end:
+        return start <= minute_of_day < end
+    return minute_of_day >= start or minute_of_day < end
+
+
+def effect_key(preset, speed_ms):
+    """Chave que identifica efeitos idênticos (para deduplicar a tabela em flash)"""
+    return (
+        preset.get("tipo"),
+        str(preset.get("color1", "#FF0000")).lower(),
+        str(preset.get("color2", "#0000FF")).lower(),
+        speed_ms(preset.get("velocidade", "Médio")),
+        preset.get("wave_width", 10),
+        preset.get("densidade"),
+        preset.get("semente"),
+        # Linha do tempo: segmentos e keyframes também distinguem o efeito
+        json.dumps([preset.get("segmentos"), preset.get("keyframes")], sort_keys=True),
+    )
+
+
+def build_schedule(presets, speed_ms):
+    """Monta a tabela de efeitos únicos e o mapa mês -> índice do efeito.
+
+    Args:
+        presets: lista de presets mensais (campo "mes" de 1 a 12)
+        speed_ms: função que converte o label de velocidade em milissegundos
+
+    Returns:
+        (efeitos, month_table): lista de presets únicos na ordem de emissão e
+        lista de 12 índices (NO_EFFECT quando o mês não tem preset).
+    """
+    effects = []
+    index_by_key = {}
+    month_table = [NO_EFFECT] * 12
+
+    for preset in sorted(presets, key=lambda p: p.get("mes", 0)):
+        mes = preset.get("mes")
+        if not isinstance(mes, int) or not 1 <= mes <= 12:
+            continue
+        key = effect_key(preset, speed_ms)
+        if key not in index_by_key:
+            index_by_key[key] = len(effects)
+            effects.append(preset)
+        month_table[mes - 1] = index_by_key[key]
+
+    return effects, month_table
+
+
+def local_epoch(when=None):
+    """Segundos desde 1970 no horário local (formato enviado ao Arduino no comando T)"""
+    when = when or datetime.now()
+    return int(when.replace(tzinfo=timezone.utc).timestamp())
+
+
+def civil_from_epoch(epoch):
+    """Converte segundos locais em (ano, mês, dia, minuto do dia).
+
+    Mesmo algoritmo (days_from_civil invertido) e mesmas divisões inteiras
+    usados em `clock_to_civil()` no firmware.
+    """
+    days = epoch // SECONDS_PER_DAY
+    minute_of_day = (epoch % SECONDS_PER_DAY) // 60
+
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    year = yoe + era * 400 + (1 if month <= 2 else 0)
+    return year, month, day, minute_of_day
+
+
+class ScheduleSimulator:
+    """
+    Simula o agendador do firmware: qual efeito roda e se a fita está apagada.
+    """
+
+    def __init__(self, month_table, window=None, default_effect=0):
+        self.month_table = list(month_table)
+        self.window = window
+        self.default_effect = default_effect
+
+    def state_at(self, epoch=None):
+        """Estado do dispositivo para um horário local (None = relógio não sincronizado)"""
+        if epoch is None:
+            return {"effect": self.default_effect, "month": None, "standby": False}
+
+        _, month, _, minute = civil_from_epoch(epoch)
+        effect = self.month_table[month - 1]
+        if effect == NO_EFFECT:
+            effect = self.default_effect
+        standby = bool(self.window) and in_standby(minute, *self.window)
+        return {"effect": effect, "month": month, "standby": standby}
+
+    def simulate(self, start_epoch, end_epoch, step=60):
+        """Percorre o intervalo e retorna apenas as mudanças de estado.
+
+        Returns:
+            lista de (epoch, estado) — o primeiro item é o estado inicial.
+        """
+        transitions = []
+        last = None
+        for epoch in range(start_epoch, end_epoch, step):
+            state = self.state_at(epoch)
+            if state["effect"] != (last or {}).get("effect") or state["standby"] != (last or {}).get("standby"):
+                transitions.append((epoch, state))
+            last = state
+        return transitions
@@ -0,0 +1,148 @@
+"""
+selection_model.py - Seleção ordenada de células da grade (mapeamento da fachada)
+
+A seleção é um conjunto ordenado (dict do Python, que preserva a ordem de
+inserção): testar, incluir e remover uma célula é O(1), e a ordem em que as
+células foram escolhidas vira a ordem dos LEDs na fita. Cada operação
+retorna o conjunto de células que mudaram, para a interface redesenhar só
+essas.
+
+Células são tuplas (x, y) = (coluna, linha), como as posições do layout.
+`to_layout` gera o JSON de layout lido por app/layout.py (o mesmo usado
+pelo preview da aba de efeitos).
+"""
+import json
+
+REPLACE, ADD, TOGGLE, REMOVE = "replace", "add", "toggle", "remove"
+
+
+class SelectionModel:
+    """Conjunto ordenado de células com âncora para seleção por intervalo (Shift)"""
+
+    def __init__(self, cells=()):
+        self._cells = dict.fromkeys(cells)
+        self.anchor = None
+
+    def __len__(self):
+        return len(self._cells)
+
+    def __contains__(self, cell):
+        return cell in self._cells
+
+    def __iter__(self):
+        return iter(self._cells)
+
+    @property
+    def cells(self):
+        """Células na ordem da seleção"""
+        return list(self._cells)
+
+    def apply(self, cells, mode=REPLACE):
+        """Aplica `cells` (em ordem) com o modo dado; retorna as células que mudaram"""
+        cells = list(cells)
+        if mode == REPLACE:
+            new = dict.fromkeys(cells)
+            changed = {c for c in self._cells if c not in new} | {c for c in new if c not in self._cells}
+            self._cells = new
+        elif mode == ADD:
+            changed = {c for c in cells if c not in self._cells}
+            for cell in cells:
+                self._cells.setdefault(cell)
+        elif mode == REMOVE:
+            changed = {c for c in cells if c in self._cells}
+            for cell in changed:
+                del self._cells[cell]
+        elif mode == TOGGLE:
+            changed = set()
+            for cell in dict.fromkeys(cells):
+                if cell in self._cells:
+                    del self._cells[cell]
+                else:
+                    self._cells[cell] = None
+                changed.add(cell)
+        else:
+            raise ValueError(f"Modo de seleção desconhecido: {mode}")
+        if cells:
+            self.anchor = cells[-1]
+        return changed
+
+    def clear(self):
+        return self.apply((), REPLACE)
+
+    def index_map(self):
+        """Dict célula -> índice do LED (posição na seleção)"""
+        return {cell: i for i, cell in enumerate(self._cells)}
+
+    def to_positions(self):
+        """Dict índice -> (x, y), o formato de LinearLEDPreview.set_led_grid_positions"""
+        return {i: cell for i, cell in enumerate(self._cells)}
+
+    def to_layout(self, cols, rows, name="capturado"):
+        """Layout no formato JSON de app/layout.py: LED i fica na i-ésima célula selecionada"""
+        return {"name": name, "cols": cols, "rows": rows, "leds": [list(cell) for cell in self._cells]}
+
+    def to_json(self, cols, rows, name="capturado"):
+        return json.dumps(self.to_layout(cols, rows, name), ensure_ascii=False)
+
+
+# -----------------------------------------
+# Formas de seleção (células em ordem de fiação)
+# -----------------------------------------
+def rect_cells(a, b, serpentine=False):
+    """Células do retângulo entre `a` e `b`, linha a linha a partir do canto `a`.
+
+    Com `serpentine`, linhas alternadas invertem o sentido (fita em zigue-zague).
+    """
+    (x0, y0), (x1, y1) = a, b
+    xs = list(range(x0, x1 + 1)) if x1 >= x0 else list(range(x0, x1 - 1, -1))
+    ys = range(y0, y1 + 1) if y1 >= y0 else range(y0, y1 - 1, -1)
+    cells = []
+    for k, y in enumerate(ys):
+        row = xs[::-1] if serpentine and k % 2 else xs
+        cells.extend((x, y) for x in row)
+    return cells
+
+
+def range_cells(a, b, cols):
+    """Intervalo do Shift: linha reta de `a` até `b` (mesma linha ou coluna) ou,
+    senão, as células entre as duas na ordem de leitura da grade"""
+    (x0, y0), (x1, y1) = a, b
+    if y0 == y1:
+        step = 1 if x1 >= x0 else -1
+        return [(x, y0) for x in range(x0, x1 + step, step)]
+    if x0 == x1:
+        step = 1 if y1 >= y0 else -1
+        return [(x0, y) for y in range(y0, y1 + step, step)]
+    start, end = y0 * cols + x0, y1 * cols + x1
+    step = 1 if end >= start else -1
+    return [(i % cols, i // cols) for i in range(start, end + step, step)]
+
+
+def _inside(px, py, polygon):
+    """Ponto dentro do polígono (regra par-ímpar)"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > py) != (yj > py) and px < (xj - xi) * (py - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def lasso_cells(polygon, cols, rows):
+    """Células cujo centro está dentro do laço (`polygon` em unidades de célula),
+    em ordem de leitura; só a caixa envolvente do laço é testada"""
+    if len(polygon) < 3:
+        return []
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    x_min, x_max = max(0, int(min(xs))), min(cols - 1, int(max(xs)))
+    y_min, y_max = max(0, int(min(ys))), min(rows - 1, int(max(ys)))
+    return [
+        (x, y)
+        for y in range(y_min, y_max + 1)
+        for x in range(x_min, x_max + 1)
+        if _inside(x + 0.5, y + 0.5, polygon)
+    ]
@@ -1,9 +1,13 @@
 """
 serial_utils.py - Utilitários simplificados para comunicação serial com Arduino
 """
+import time
+
 import serial
 import serial.tools.list_ports
 
+from app.scheduler import local_epoch
+
 
 def get_available_ports():
     """Retorna lista de portas seriais disponíveis"""
@@ -90,3 +94,28 @@ def probe_port(port, baudrate=9600, timeout=1):
         except Exception:
             pass
         return False
+
+
+def sync_clock(port, baudrate=9600, boot_delay=2.0, when=None):
+    """Envia o horário local ao firmware agendado (comando "T<segundos>").
+
+    Abrir a porta reinicia a maioria dos Arduinos (DTR), por isso aguarda
+    `boot_delay` segundos antes de enviar. Com um RTC DS3231 o horário também
+    fica gravado no módulo; sem RTC o Arduino precisa de novo sync após reset.
+
+    Retorna True se o comando foi enviado.
+    """
+    ser = open_serial_port(port, baudrate)
+    if ser is None:
+        return False
+
+    try:
+        time.sleep(boot_delay)
+        ser.write(f"T{local_epoch(when)}\n".encode("ascii"))
+        ser.flush()
+        return True
+    except Exception as e:
+        print(f"Erro ao sincronizar relógio em {port}: {e}")
+        return False
+    finally:
+        close_serial_port(ser)
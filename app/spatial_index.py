@@ -0,0 +1,71 @@
+"""
+spatial_index.py - Índice espacial em grade uniforme para posições de LEDs
+
+Resolve "qual LED está neste ponto" e "quais LEDs estão neste retângulo"
+olhando só os baldes vizinhos, em vez de percorrer todos os LEDs. Funciona
+com dezenas de milhares de LEDs.
+"""
+import math
+
+
+class GridSpatialIndex:
+    """
+    Agrupa pontos (índice -> (x, y)) em baldes quadrados de lado `bucket_size`.
+    As coordenadas são as do layout (uma unidade = uma célula da grade).
+    """
+
+    def __init__(self, positions=None, bucket_size=8.0):
+        self.bucket_size = float(bucket_size)
+        self.buckets = {}
+        self.positions = {}
+        if positions:
+            self.rebuild(positions)
+
+    def rebuild(self, positions):
+        """Reconstrói o índice a partir de um dict índice -> (x, y)"""
+        self.positions = dict(positions)
+        self.buckets = {}
+        size = self.bucket_size
+        for index, (x, y) in self.positions.items():
+            key = (int(math.floor(x / size)), int(math.floor(y / size)))
+            self.buckets.setdefault(key, []).append(index)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _bucket_range(self, x0, y0, x1, y1):
+        size = self.bucket_size
+        for bx in range(int(math.floor(x0 / size)), int(math.floor(x1 / size)) + 1):
+            for by in range(int(math.floor(y0 / size)), int(math.floor(y1 / size)) + 1):
+                bucket = self.buckets.get((bx, by))
+                if bucket:
+                    yield bucket
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Índices cujos pontos estão dentro do retângulo [x0, x1] x [y0, y1]"""
+        if x0 > x1:
+            x0, x1 = x1, x0
+        if y0 > y1:
+            y0, y1 = y1, y0
+        found = []
+        positions = self.positions
+        for bucket in self._bucket_range(x0, y0, x1, y1):
+            for index in bucket:
+                x, y = positions[index]
+                if x0 <= x <= x1 and y0 <= y <= y1:
+                    found.append(index)
+        return found
+
+    def nearest(self, x, y, max_distance):
+        """Índice do ponto mais próximo de (x, y) até `max_distance`, ou None"""
+        best = None
+        best_d2 = max_distance * max_distance
+        positions = self.positions
+        for bucket in self._bucket_range(x - max_distance, y - max_distance,
+                                         x + max_distance, y + max_distance):
+            for index in bucket:
+                px, py = positions[index]
+                d2 = (px - x) ** 2 + (py - y) ** 2
+                if d2 <= best_d2:
+                    best, best_d2 = index, d2
+        return best
@@ -0,0 +1,172 @@
+"""
+telemetry.py - Leitura da telemetria enviada pelo firmware (fragmento "telemetry")
+
+Formato de cada registro (little-endian, como no AVR):
+
+    A5 5A | versão (1) | tamanho do payload (22) | payload | XOR do payload
+
+Payload: uptime_ms u32, frames u16, loops u16, apply_us u32, show_us u32,
+max_loop_us u16, free_sram u16, rx_full u8, effect u8.
+
+free_sram só é medido no AVR (símbolos do avr-libc); nas outras placas o
+firmware envia FREE_SRAM_UNKNOWN.
+
+Um TelemetryReader (thread) lê a porta serial, valida os registros e guarda
+os mais recentes em um buffer circular, de onde a interface e o exportador
+CSV leem.
+"""
+import csv
+import struct
+import threading
+import time
+from collections import deque
+
+from app.serial_utils import close_serial_port, open_serial_port
+
+SYNC = b"\xA5\x5A"
+VERSION = 1
+PAYLOAD = struct.Struct("<IHHIIHHBB")
+FIELDS = ("uptime_ms", "frames", "loops", "apply_us", "show_us",
+          "max_loop_us", "free_sram", "rx_full", "effect")
+FREE_SRAM_UNKNOWN = 0xFFFF
+HEADER_SIZE = len(SYNC) + 2
+RECORD_SIZE = HEADER_SIZE + PAYLOAD.size + 1
+
+# Colunas do CSV: campos brutos + métricas derivadas
+CSV_COLUMNS = ("host_time",) + FIELDS + ("interval_ms", "fps", "apply_ms_per_frame", "show_ms_per_frame")
+
+
+def _checksum(payload):
+    value = 0
+    for byte in payload:
+        value ^= byte
+    return value
+
+
+def encode_record(**fields):
+    """Monta um registro como o firmware envia (útil para testes e simulação)"""
+    payload = PAYLOAD.pack(*(int(fields.get(name, 0)) for name in FIELDS))
+    return SYNC + bytes((VERSION, len(payload))) + payload + bytes((_checksum(payload),))
+
+
+class TelemetryParser:
+    """Extrai registros de um fluxo de bytes, ressincronizando em lixo ou checksum inválido"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.bad_records = 0
+
+    def feed(self, data):
+        """Acrescenta bytes e retorna a lista de registros completos (dicts)"""
+        buf = self._buffer
+        buf += data
+        records = []
+        while True:
+            start = buf.find(SYNC)
+            if start < 0:
+                # guarda só um possível primeiro byte de sincronismo
+                del buf[:max(0, len(buf) - 1)]
+                break
+            if start:
+                del buf[:start]
+            if len(buf) < HEADER_SIZE:
+                break
+            version, size = buf[2], buf[3]
+            if version != VERSION or size != PAYLOAD.size:
+                self.bad_records += 1
+                del buf[:1]
+                continue
+            if len(buf) < RECORD_SIZE:
+                break
+            payload = bytes(buf[HEADER_SIZE:HEADER_SIZE + size])
+            if _checksum(payload) != buf[HEADER_SIZE + size]:
+                self.bad_records += 1
+                del buf[:1]
+                continue
+            del buf[:RECORD_SIZE]
+            records.append(dict(zip(FIELDS, PAYLOAD.unpack(payload))))
+        return records
+
+
+def derive_metrics(record, previous=None):
+    """Acrescenta intervalo, FPS e tempo médio por quadro ao registro"""
+    interval = record["uptime_ms"] - previous["uptime_ms"] if previous else 0
+    frames = record["frames"]
+    record["interval_ms"] = interval if interval > 0 else None
+    record["fps"] = round(frames * 1000.0 / interval, 2) if interval > 0 else None
+    record["apply_ms_per_frame"] = round(record["apply_us"] / frames / 1000.0, 3) if frames else None
+    record["show_ms_per_frame"] = round(record["show_us"] / frames / 1000.0, 3) if frames else None
+    return record
+
+
+class TelemetryReader(threading.Thread):
+    """
+    Thread que lê a telemetria de uma porta serial para um buffer circular.
+    Registros mais antigos que `capacity` são descartados.
+    """
+
+    def __init__(self, port, baudrate=9600, capacity=3600):
+        super().__init__(daemon=True)
+        self.port = port
+        self.baudrate = baudrate
+        self.records = deque(maxlen=capacity)
+        self.parser = TelemetryParser()
+        self.is_running = True
+        self.error = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        ser = open_serial_port(self.port, self.baudrate, timeout=0.2)
+        if ser is None:
+            self.error = f"Não foi possível abrir {self.port}"
+            return
+        previous = None
+        try:
+            while self.is_running:
+                data = ser.read(ser.in_waiting or 1)
+                if not data:
+                    continue
+                now = time.time()
+                for record in self.parser.feed(data):
+                    record["host_time"] = now
+                    derive_metrics(record, previous)
+                    previous = record
+                    with self._lock:
+                        self.records.append(record)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            close_serial_port(ser)
+
+    def stop(self):
+        self.is_running = False
+        if self.is_alive():
+            self.join(timeout=1)
+
+    def latest(self):
+        """Registro mais recente ou None"""
+        with self._lock:
+            return self.records[-1] if self.records else None
+
+    def snapshot(self):
+        """Cópia dos registros do buffer (mais antigo primeiro)"""
+        with self._lock:
+            return list(self.records)
+
+    @property
+    def bad_records(self):
+        return self.parser.bad_records
+
+    def export_csv(self, path):
+        """Grava os registros do buffer em CSV; retorna quantos foram gravados"""
+        return export_csv(self.snapshot(), path)
+
+
+def export_csv(records, path):
+    """Grava registros de telemetria em CSV (uma linha por registro)"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+    return len(records)
@@ -0,0 +1,206 @@
+"""
+thumbnail_cache.py - Miniaturas dos presets para os seletores de mês
+
+Cada miniatura é o layout da fachada (um pixel por célula da grade, reduzido
+para caber em THUMB_WIDTH x THUMB_HEIGHT) desenhado com o EffectRenderer.
+Efeitos animados guardam THUMB_FRAMES quadros espalhados por um ciclo do
+efeito, empilhados na vertical em um único PNG; efeitos parados, um quadro.
+
+Os PNGs ficam em disco (app/thumbnails/ ou config["thumbnail_dir"]) com o
+nome igual ao hash dos parâmetros do preset + hash do layout + versão. Mudar
+o preset ou o layout muda o nome, então miniaturas antigas nunca são
+reaproveitadas por engano; as que sobram são apagadas por `prune`.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from app.effect_kernels import RAINBOW_STEP
+from app.effect_renderer import EffectRenderer
+from app.image_io import write_png
+from app.timeline import FRAME_MS, Timeline
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), "thumbnails")
+
+THUMB_WIDTH = 96
+THUMB_HEIGHT = 24
+THUMB_FRAMES = 8
+# Sobe quando o desenho das miniaturas muda (invalida todo o cache)
+THUMB_VERSION = 1
+MAX_FILES = 256
+
+BACKGROUND = b"\x20\x20\x20"
+STATIC_EFFECTS = ("Cor sólida", "Gradiente")
+# Campos que não mudam o desenho do efeito
+IGNORED_FIELDS = ("mes", "nome_mes", "ativo", "descricao", "id", "loja", "revisao", "tags")
+# Quadros descartados antes da primeira amostra (faíscas e fogo começam apagados)
+WARMUP_FRAMES = {"Cintilar": 30, "Fogo": 60}
+
+
+def thumbnail_dir_from_config(config):
+    """Pasta do cache em config["thumbnail_dir"] (relativa à pasta app/) ou a padrão"""
+    path = (config or {}).get("thumbnail_dir")
+    if not path:
+        return DEFAULT_CACHE_DIR
+    if not os.path.isabs(path):
+        path = os.path.join(os.path.dirname(__file__), path)
+    return path
+
+
+def layout_key(layout):
+    """Hash da geometria do layout (grade e posição de cada LED)"""
+    h = hashlib.sha256(f"{layout.cols}x{layout.rows}".encode())
+    h.update(layout.xs.tobytes())
+    h.update(layout.ys.tobytes())
+    return h.hexdigest()
+
+
+def preset_key(preset, layout_hash, size=(THUMB_WIDTH, THUMB_HEIGHT)):
+    """Nome da miniatura: hash dos parâmetros que afetam o desenho + layout + tamanho + versão"""
+    params = {k: v for k, v in preset.items() if k not in IGNORED_FIELDS}
+    text = json.dumps([THUMB_VERSION, list(size), layout_hash, params],
+                      sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class ThumbnailCache:
+    """
+    Cache em disco das miniaturas de um layout.
+    `get` só consulta o disco; `render` desenha e grava (chamar fora da GUI).
+    """
+
+    def __init__(self, layout, cache_dir=None, width=THUMB_WIDTH, height=THUMB_HEIGHT):
+        self.layout = layout
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.layout_hash = layout_key(layout)
+        self._build_pixel_map(width, height)
+
+    def _build_pixel_map(self, width, height):
+        """LED de cada pixel da miniatura (-1 = fundo), uma vez por layout"""
+        layout = self.layout
+        cols, rows = max(1, layout.cols), max(1, layout.rows)
+        scale = min(width / cols, height / rows)
+        self.width = max(1, int(cols * scale))
+        self.height = max(1, int(rows * scale))
+        cells = {}
+        for led, (x, y) in enumerate(zip(layout.xs, layout.ys)):
+            if x >= 0:
+                cells[(x, y)] = led
+        # Com células de 3 px ou mais, a borda fica escura e cada LED aparece separado
+        gap = scale >= 3
+        pixel_map = []
+        for py in range(self.height):
+            cy = int(py / scale)
+            edge_y = gap and int((py + 1) / scale) != cy
+            for px in range(self.width):
+                cx = int(px / scale)
+                edge = edge_y or (gap and int((px + 1) / scale) != cx)
+                pixel_map.append(-1 if edge else cells.get((cx, cy), -1))
+        self.pixel_map = pixel_map
+
+    def path_for(self, preset):
+        return os.path.join(self.cache_dir, preset_key(preset, self.layout_hash, (self.width, self.height)) + ".png")
+
+    def get(self, preset):
+        """Caminho da miniatura se já estiver em disco, senão None"""
+        path = self.path_for(preset)
+        return path if os.path.exists(path) else None
+
+    def frame_count(self, preset):
+        return 1 if preset.get("tipo", "Cor sólida") in STATIC_EFFECTS else THUMB_FRAMES
+
+    def _stride(self, preset):
+        """Quadros do renderizador entre duas amostras (um ciclo do efeito em THUMB_FRAMES)"""
+        effect_type = preset.get("tipo")
+        total_leds = self.layout.total_leds
+        if effect_type == "Onda":
+            cycle = total_leds
+        elif effect_type == "Linha do tempo":
+            cycle = Timeline.from_preset(preset, total_leds).duration_ms // FRAME_MS
+        elif effect_type == "Arco-íris":
+            cycle = 256 // RAINBOW_STEP
+        else:
+            cycle = THUMB_FRAMES * 2
+        return max(1, cycle // THUMB_FRAMES)
+
+    def render(self, preset):
+        """Desenha os quadros do preset e grava o PNG; retorna o caminho"""
+        total_leds = self.layout.total_leds
+        renderer = EffectRenderer(total_leds)
+        renderer.set_params(preset)
+        renderer.reset()
+        frame = bytearray(renderer.frame_size())
+        for _ in range(WARMUP_FRAMES.get(preset.get("tipo"), 0)):
+            renderer.render_into(frame)
+
+        count = self.frame_count(preset)
+        stride = self._stride(preset)
+        sheet = []
+        for _ in range(count):
+            renderer.render_into(frame)
+            for _ in range(stride - 1):
+                renderer.render_into(frame)
+            colors = [bytes(frame[i:i + 3]) for i in range(0, total_leds * 3, 3)]
+            colors.append(BACKGROUND)  # índice -1
+            sheet.append(b"".join([colors[led] for led in self.pixel_map]))
+
+        path = self.path_for(preset)
+        write_png(path, self.width, self.height * count, b"".join(sheet))
+        return path
+
+    def get_or_render(self, preset):
+        return self.get(preset) or self.render(preset)
+
+    def prune(self, keep=(), max_files=MAX_FILES):
+        """Apaga as miniaturas mais antigas além de `max_files` (nunca as de `keep`)"""
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".png")]
+        except OSError:
+            return 0
+        if len(names) <= max_files:
+            return 0
+        keep = {os.path.basename(p) for p in keep}
+        paths = [os.path.join(self.cache_dir, n) for n in names if n not in keep]
+        paths.sort(key=lambda p: os.path.getmtime(p))
+        removed = 0
+        for path in paths[:len(names) - max_files]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class ThumbnailWorker(threading.Thread):
+    """
+    Thread que garante as miniaturas de uma lista de presets.
+    `callback(tag, path, frames)` é chamado para cada uma (hit ou recém-desenhada).
+    """
+
+    def __init__(self, cache, jobs, callback):
+        super().__init__(daemon=True)
+        self.cache = cache
+        self.jobs = list(jobs)  # [(tag, preset)]
+        self.callback = callback
+        self.is_running = True
+
+    def run(self):
+        paths = []
+        for tag, preset in self.jobs:
+            if not self.is_running:
+                return
+            try:
+                path = self.cache.get_or_render(preset)
+            except Exception as e:
+                print(f"Aviso: miniatura do preset {tag} não gerada: {e}")
+                continue
+            paths.append(path)
+            if not self.is_running:
+                return  # substituída por outra worker: o resultado não vale mais
+            self.callback(tag, path, self.cache.frame_count(preset))
+        self.cache.prune(keep=paths)
+
+    def stop(self):
+        self.is_running = False
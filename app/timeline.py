@@ -0,0 +1,246 @@
+"""
+timeline.py - Efeito "Linha do tempo": keyframes de cores por segmento
+
+Um preset de linha do tempo guarda:
+
+    "segmentos": [0, 7, 14, ...]          LED inicial de cada segmento (letra ou trecho)
+    "keyframes": [{"tempo_ms": 0, "cores": ["#RRGGBB", ...], "transicao": "Suave"}, ...]
+
+A `transicao` de um keyframe vale do keyframe até o seguinte. Ao chegar no
+último keyframe a linha do tempo recomeça do primeiro.
+
+Para a flash, a linha do tempo é compilada em uma tabela compacta
+(`encode_timeline`): tempos como diferenças em varint e, em cada keyframe, só
+as cores dos segmentos que mudaram (máscara de bits). O firmware percorre a
+tabela em ordem, mantendo na RAM apenas os dois keyframes em volta do instante
+atual. A interpolação é inteira (mix8 em 0..255 e ease_in_out8), espelhada
+aqui byte a byte para o preview.
+"""
+from bisect import bisect_right
+
+TRANSITIONS = ["Linear", "Suave", "Degrau"]
+LINEAR, EASE, STEP = range(3)
+
+MAX_SEGMENTS = 32
+# Com intervalos de até 1 h, (posição * 255) cabe nos 32 bits do AVR
+MAX_GAP_MS = 3600000
+# Período de quadro da linha do tempo (50 quadros/s)
+FRAME_MS = 20
+
+
+def segment_starts(total_leds, count=None, letters=None):
+    """LED inicial de cada segmento: as letras do config (ordenadas) ou `count` trechos iguais"""
+    if letters:
+        starts = sorted({int(bounds[0]) for bounds in letters.values()})
+        starts = [s for s in starts if 0 <= s < total_leds][:MAX_SEGMENTS]
+    else:
+        count = max(1, min(int(count or 1), MAX_SEGMENTS, total_leds))
+        starts = [i * total_leds // count for i in range(count)]
+    if not starts or starts[0] != 0:
+        starts = [0] + starts[:MAX_SEGMENTS - 1]
+    return starts
+
+
+def ease_in_out8(i):
+    """Mesma curva de ease_in_out8() no firmware (quadrática, inteira)"""
+    j = 255 - i if i & 0x80 else i
+    jj2 = ((j * j) >> 8) << 1 & 0xFF
+    return 255 - jj2 if i & 0x80 else jj2
+
+
+def _parse_color(value):
+    value = str(value).lstrip("#")
+    if len(value) == 6:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    return (0, 0, 0)
+
+
+class Timeline:
+    """
+    Linha do tempo normalizada (o que vai para a tabela da flash).
+
+    Atributos:
+        starts: LED inicial de cada segmento (starts[0] == 0)
+        times: instante de cada keyframe em ms (times[0] == 0, não decrescente)
+        colors: por keyframe, uma tupla (r, g, b) por segmento
+        transitions: código da transição de cada keyframe (LINEAR, EASE, STEP)
+    """
+
+    def __init__(self, starts, times, colors, transitions):
+        self.starts = list(starts)
+        self.times = list(times)
+        self.colors = [tuple(frame) for frame in colors]
+        self.transitions = list(transitions)
+        self._runs = None
+        self._runs_for = None
+
+    @property
+    def duration_ms(self):
+        return self.times[-1]
+
+    @classmethod
+    def from_preset(cls, preset, total_leds):
+        """Valida e normaliza os keyframes de um preset (ordena, ajusta tamanhos e limites)"""
+        starts = [int(s) for s in preset.get("segmentos") or [0]]
+        starts = sorted({s for s in starts if 0 <= s < max(1, total_leds)})
+        if not starts or starts[0] != 0:
+            starts = [0] + starts
+        starts = starts[:MAX_SEGMENTS]
+        count = len(starts)
+
+        keyframes = sorted(preset.get("keyframes") or [], key=lambda k: int(k.get("tempo_ms", 0)))
+        if not keyframes:
+            keyframes = [{"tempo_ms": 0, "cores": [preset.get("color1", "#FF0000")]}]
+
+        times, colors, transitions = [], [], []
+        previous = 0
+        for keyframe in keyframes:
+            time_ms = max(previous, int(keyframe.get("tempo_ms", 0)))
+            time_ms = min(time_ms, previous + MAX_GAP_MS)
+            cores = list(keyframe.get("cores") or ["#000000"])
+            # Faltando cores: repete a última; sobrando: ignora
+            cores += [cores[-1]] * (count - len(cores))
+            transition = keyframe.get("transicao", TRANSITIONS[LINEAR])
+            times.append(time_ms)
+            colors.append(tuple(_parse_color(c) for c in cores[:count]))
+            transitions.append(TRANSITIONS.index(transition) if transition in TRANSITIONS else LINEAR)
+            previous = time_ms
+
+        # Antes do primeiro keyframe as cores ficam paradas
+        if times[0] > 0:
+            times.insert(0, 0)
+            colors.insert(0, colors[0])
+            transitions.insert(0, STEP)
+        return cls(starts, times, colors, transitions)
+
+    # -----------------------------------------
+    # Reprodução (espelho de render_timeline() no firmware)
+    # -----------------------------------------
+    def segment_colors(self, elapsed_ms):
+        """Cor de cada segmento `elapsed_ms` após o início (a linha do tempo se repete)"""
+        times = self.times
+        if len(times) == 1:
+            return self.colors[0]
+        loop_ms = elapsed_ms % times[-1] if times[-1] else 0
+        to = min(bisect_right(times, loop_ms, 1), len(times) - 1)
+        frm = to - 1
+        span = times[to] - times[frm]
+        if span == 0 or loop_ms >= times[to]:
+            return self.colors[to]
+
+        frac = (loop_ms - times[frm]) * 255 // span
+        transition = self.transitions[frm]
+        if transition == STEP:
+            return self.colors[frm]
+        if transition == EASE:
+            frac = ease_in_out8(frac)
+        inv = 255 - frac
+        return tuple(
+            tuple((a * inv + b * frac) // 255 for a, b in zip(c1, c2))
+            for c1, c2 in zip(self.colors[frm], self.colors[to])
+        )
+
+    def render(self, elapsed_ms, total_leds):
+        """Quadro RGB da fita: uma cor repetida por segmento"""
+        if self._runs_for != total_leds:
+            bounds = [min(s, total_leds) for s in self.starts] + [total_leds]
+            self._runs = [bounds[k + 1] - bounds[k] for k in range(len(self.starts))]
+            self._runs_for = total_leds
+        return b"".join(bytes(color) * run for color, run in zip(self.segment_colors(elapsed_ms), self._runs))
+
+
+# -----------------------------------------
+# Tabela da flash
+# -----------------------------------------
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_timeline(timeline):
+    """Tabela da flash.
+
+    Formato: segmentos (u8) | keyframes (varint) | duração (varint) |
+    início de cada segmento (u16 LE) | por keyframe: delta de tempo (varint),
+    transição (u8), máscara dos segmentos alterados, RGB de cada alterado.
+    """
+    count = len(timeline.starts)
+    mask_bytes = (count + 7) // 8
+    out = bytearray((count,))
+    out += _varint(len(timeline.times))
+    out += _varint(timeline.duration_ms)
+    for start in timeline.starts:
+        out += start.to_bytes(2, "little")
+
+    previous_time = 0
+    previous = ((0, 0, 0),) * count
+    for time_ms, colors, transition in zip(timeline.times, timeline.colors, timeline.transitions):
+        out += _varint(time_ms - previous_time)
+        out.append(transition)
+        mask = 0
+        changed = bytearray()
+        for k, (color, before) in enumerate(zip(colors, previous)):
+            if color != before:
+                mask |= 1 << k
+                changed += bytes(color)
+        out += mask.to_bytes(mask_bytes, "little")
+        out += changed
+        previous_time, previous = time_ms, colors
+    return bytes(out)
+
+
+def decode_timeline(data, offset=0):
+    """Lê uma tabela gerada por `encode_timeline` (conferência e testes)"""
+    pos = offset
+
+    def varint():
+        nonlocal pos
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    count = data[pos]
+    pos += 1
+    num_keyframes = varint()
+    varint()  # duração (redundante com os tempos)
+    starts = [int.from_bytes(data[pos + 2 * k:pos + 2 * k + 2], "little") for k in range(count)]
+    pos += 2 * count
+    mask_bytes = (count + 7) // 8
+
+    times, colors, transitions = [], [], []
+    time_ms = 0
+    current = [(0, 0, 0)] * count
+    for _ in range(num_keyframes):
+        time_ms += varint()
+        transition = data[pos]
+        mask = int.from_bytes(data[pos + 1:pos + 1 + mask_bytes], "little")
+        pos += 1 + mask_bytes
+        for k in range(count):
+            if mask >> k & 1:
+                current[k] = tuple(data[pos:pos + 3])
+                pos += 3
+        times.append(time_ms)
+        colors.append(tuple(current))
+        transitions.append(transition)
+    return Timeline(starts, times, colors, transitions)
+
+
+def default_keyframes(count, color1="#FF0000", color2="#0000FF"):
+    """Linha do tempo inicial do editor: color1 -> color2 -> color1 em 4 s"""
+    return [
+        {"tempo_ms": 0, "cores": [color1] * count, "transicao": TRANSITIONS[EASE]},
+        {"tempo_ms": 2000, "cores": [color2] * count, "transicao": TRANSITIONS[EASE]},
+        {"tempo_ms": 4000, "cores": [color1] * count, "transicao": TRANSITIONS[EASE]},
+    ]
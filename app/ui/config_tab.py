@@ -4,7 +4,7 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtGui import QFont, QIcon
 from PyQt5.QtCore import Qt, QSize
-from app.config_manager import load_config, save_config
+from app.config_manager import load_config, save_config, MAX_LEDS
 
 class ConfigTab(QWidget):
     def __init__(self):
@@ -35,7 +35,7 @@ class ConfigTab(QWidget):
 
         # Campo de configuração do total de LEDs
         self.total_leds_box = QSpinBox()
-        self.total_leds_box.setMaximum(999)
+        self.total_leds_box.setMaximum(MAX_LEDS)
         self.total_leds_box.setValue(self.config["total_leds"])
         self.layout.addWidget(QLabel("Quantidade total de LEDs:"))
         self.layout.addWidget(self.total_leds_box)
@@ -47,9 +47,9 @@ class ConfigTab(QWidget):
             group = QGroupBox(f"Letra {letter}")
             hbox = QHBoxLayout()
             start_box = QSpinBox()
-            start_box.setMaximum(999)
+            start_box.setMaximum(MAX_LEDS - 1)
             end_box = QSpinBox()
-            end_box.setMaximum(999)
+            end_box.setMaximum(MAX_LEDS - 1)
             if letter in self.config["letters"]:
                 start_box.setValue(self.config["letters"][letter][0])
                 end_box.setValue(self.config["letters"][letter][1])
@@ -4,16 +4,22 @@ effects_tab.py - Aba de editor de efeitos com preview linear
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout,
     QPushButton, QComboBox, QColorDialog, QSlider, QSizePolicy,
-    QCheckBox, QSpinBox, QMessageBox, QGroupBox
+    QCheckBox, QSpinBox, QMessageBox, QGroupBox, QListWidget
 )
 from PyQt5.QtGui import QColor, QFont
 from PyQt5.QtCore import QTimer, Qt
 from datetime import datetime
-import math
 
 from app.config_manager import load_config, save_config
+from app.effect_kernels import DEFAULT_DENSITY, DEFAULT_SEED
+from app.frame_diff import FrameDiff
+from app.layout import led_count_mismatch, load_layout, layout_path_from_config
 from app.presets_manager import PresetsManager
-from app.ui.widgets import LinearLEDPreview
+from app.preview_worker import PreviewRenderWorker
+from app.activity_manager import activity_manager
+from app.thumbnail_cache import thumbnail_dir_from_config
+from app.timeline import MAX_GAP_MS, MAX_SEGMENTS, TRANSITIONS, default_keyframes, segment_starts
+from app.ui.widgets import LinearLEDPreview, PresetThumbnails
 
 
 class EffectsTab(QWidget):
@@ -22,11 +28,21 @@ class EffectsTab(QWidget):
     Permite salvar até 12 presets mensais.
     """
     
+    # Intervalo em que a GUI busca o quadro mais recente do renderizador
+    DISPLAY_INTERVAL_MS = 16
+    # A cada quantos quadros os contadores da diferença são atualizados na dica do preview
+    DIFF_STATS_FRAMES = 60
+    
     def __init__(self):
         super().__init__()
         self.config = load_config()
-        # Use the LED layout provided by the user (ASCII map) — 46 LEDs (indices 0..45)
-        self.total_leds = 46
+        # Layout físico da instalação (config["layout_file"]), compilado e mantido em cache
+        self.layout = load_layout(layout_path_from_config(self.config), strict=False)
+        for issue in self.layout.issues:
+            print(f"Aviso de layout: {issue}")
+        self.total_leds = self.layout.total_leds
+        # O firmware e os segmentos por letra usam config["total_leds"]: a diferença aparece acima do preview
+        self.layout_mismatch = led_count_mismatch(self.layout, self.config)
         # No letter overlay for this view; LEDs are positioned in a grid
         self.letter_mapping = {}
         
@@ -37,15 +53,25 @@ class EffectsTab(QWidget):
         self.color1 = QColor(255, 0, 0)
         self.color2 = QColor(0, 0, 255)
         
-        # Estado da animação
+        # Linha do tempo: LED inicial de cada segmento e keyframes no formato dos presets
+        self.letters = self.config.get("letters") or {}
+        self.timeline_segments = [0]
+        self.timeline_keyframes = []
+        self.segment_color_buttons = []
+        
+        # Estado da animação: o renderizador roda em outra thread e a GUI só exibe os quadros
+        self.render_worker = PreviewRenderWorker(self.total_leds)
+        self.render_worker.start()
+        self.animating = False
+        # Compara cada quadro com o último exibido: iguais não repintam, os demais só nos LEDs alterados
+        self.frame_diff = FrameDiff(self.total_leds)
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_preview_animation)
-        self.wave_index = 0
-        self.blink_state = True
-        self.virtual_leds = [QColor(0, 0, 0) for _ in range(self.total_leds)]
         
         self._init_ui()
         self._load_preset_data()
+        # Fora da tela (ou com o app ocioso) o preview não renderiza nem repinta
+        activity_manager().register(self, self._suspend_preview, self._resume_preview)
     
     def _init_ui(self):
         """Inicializa interface"""
@@ -89,13 +115,20 @@ class EffectsTab(QWidget):
         self.preset_selector.addItems([f"Mês {i}: {m}" for i, m in enumerate(PresetsManager.MONTHS, 1)])
         self.preset_selector.currentIndexChanged.connect(self._on_preset_changed)
         layout.addWidget(self.preset_selector)
+        # Miniatura de cada mês no seletor (desenhadas em thread, guardadas em disco)
+        self.thumbnails = PresetThumbnails(
+            self.preset_selector, self.layout, thumbnail_dir_from_config(self.config)
+        )
+        self._refresh_thumbnails()
         
         # ===== Seção: Tipo de Efeito =====
         effect_group = QGroupBox("🎨 Tipo de Efeito")
         effect_layout = QHBoxLayout()
         
         self.effect_dropdown = QComboBox()
-        self.effect_dropdown.addItems(["Cor sólida", "Gradiente", "Onda"])
+        self.effect_dropdown.addItems(
+            ["Cor sólida", "Gradiente", "Onda", "Linha do tempo", "Arco-íris", "Cintilar", "Fogo"]
+        )
         self.effect_dropdown.currentIndexChanged.connect(self._on_effect_type_changed)
         self.effect_dropdown.setFixedWidth(150)
         
@@ -135,6 +168,7 @@ class EffectsTab(QWidget):
         color_layout.addLayout(color2_row)
         
         color_group.setLayout(color_layout)
+        self.color_group = color_group
         layout.addWidget(color_group)
         
         # ===== Seção: Velocidade =====
@@ -151,6 +185,7 @@ class EffectsTab(QWidget):
         speed_layout.addStretch()
         
         speed_group.setLayout(speed_layout)
+        self.speed_group = speed_group
         layout.addWidget(speed_group)
         
         # ===== Seção: Largura da Onda =====
@@ -175,28 +210,112 @@ class EffectsTab(QWidget):
         self.wave_group = wave_group
         layout.addWidget(wave_group)
         
+        # ===== Seção: Cintilar / Fogo =====
+        fx_group = QGroupBox("✨ Faíscas")
+        fx_layout = QHBoxLayout()
+        
+        self.density_slider = QSlider(Qt.Horizontal)
+        self.density_slider.setRange(0, 255)
+        self.density_slider.setValue(DEFAULT_DENSITY)
+        self.density_slider.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.density_slider.sliderReleased.connect(self._on_preview_update)
+        self.seed_spin = QSpinBox()
+        self.seed_spin.setRange(0, 0xFFFF)
+        self.seed_spin.setValue(DEFAULT_SEED)
+        self.seed_spin.setToolTip("Mesma semente = mesma sequência de faíscas no preview e no Arduino")
+        self.seed_spin.editingFinished.connect(self._on_preview_update)
+        
+        fx_layout.addWidget(QLabel("Densidade:"))
+        fx_layout.addWidget(self.density_slider, stretch=1)
+        fx_layout.addWidget(QLabel("Semente:"))
+        fx_layout.addWidget(self.seed_spin)
+        
+        fx_group.setLayout(fx_layout)
+        self.fx_group = fx_group
+        layout.addWidget(fx_group)
+        
+        # ===== Seção: Linha do Tempo =====
+        timeline_group = QGroupBox("🎞️ Linha do Tempo")
+        timeline_layout = QVBoxLayout()
+        
+        segments_row = QHBoxLayout()
+        self.segment_mode = QComboBox()
+        self.segment_mode.addItems(["Por letra", "Trechos iguais"])
+        self.segment_mode.setFixedWidth(140)
+        if not self.letters:
+            self.segment_mode.setCurrentIndex(1)
+            self.segment_mode.setEnabled(False)
+        self.segment_mode.currentIndexChanged.connect(self._on_segments_changed)
+        self.segment_count = QSpinBox()
+        self.segment_count.setRange(1, min(MAX_SEGMENTS, self.total_leds))
+        self.segment_count.setValue(min(4, self.total_leds))
+        self.segment_count.valueChanged.connect(self._on_segments_changed)
+        segments_row.addWidget(QLabel("Segmentos:"))
+        segments_row.addWidget(self.segment_mode)
+        segments_row.addWidget(self.segment_count)
+        segments_row.addStretch()
+        timeline_layout.addLayout(segments_row)
+        
+        keyframes_row = QHBoxLayout()
+        self.keyframe_list = QListWidget()
+        self.keyframe_list.setFixedHeight(110)
+        self.keyframe_list.currentRowChanged.connect(self._on_keyframe_selected)
+        keyframes_row.addWidget(self.keyframe_list, stretch=1)
+        keyframe_buttons = QVBoxLayout()
+        self.add_keyframe_btn = QPushButton("➕ Adicionar Keyframe")
+        self.add_keyframe_btn.clicked.connect(self._add_keyframe)
+        self.remove_keyframe_btn = QPushButton("🗑️ Remover Keyframe")
+        self.remove_keyframe_btn.clicked.connect(self._remove_keyframe)
+        self.fill_keyframe_btn = QPushButton("🪣 Preencher Segmentos")
+        self.fill_keyframe_btn.clicked.connect(self._fill_keyframe)
+        keyframe_buttons.addWidget(self.add_keyframe_btn)
+        keyframe_buttons.addWidget(self.remove_keyframe_btn)
+        keyframe_buttons.addWidget(self.fill_keyframe_btn)
+        keyframes_row.addLayout(keyframe_buttons)
+        timeline_layout.addLayout(keyframes_row)
+        
+        keyframe_row = QHBoxLayout()
+        self.keyframe_time = QSpinBox()
+        self.keyframe_time.setRange(0, MAX_GAP_MS)
+        self.keyframe_time.setSingleStep(100)
+        self.keyframe_time.setSuffix(" ms")
+        self.keyframe_time.editingFinished.connect(self._on_keyframe_edited)
+        self.keyframe_transition = QComboBox()
+        self.keyframe_transition.addItems(TRANSITIONS)
+        self.keyframe_transition.currentIndexChanged.connect(self._on_keyframe_edited)
+        keyframe_row.addWidget(QLabel("Tempo:"))
+        keyframe_row.addWidget(self.keyframe_time)
+        keyframe_row.addWidget(QLabel("Transição:"))
+        keyframe_row.addWidget(self.keyframe_transition)
+        keyframe_row.addStretch()
+        timeline_layout.addLayout(keyframe_row)
+        
+        # Um botão de cor por segmento do keyframe selecionado
+        self.segment_colors_layout = QHBoxLayout()
+        timeline_layout.addLayout(self.segment_colors_layout)
+        
+        timeline_group.setLayout(timeline_layout)
+        self.timeline_group = timeline_group
+        layout.addWidget(timeline_group)
+        
         # ===== Preview Linear =====
-        preview_label = QLabel("🎬 Preview da Fita de LEDs")
-        preview_label.setFont(QFont("Arial", 11, QFont.Bold))
-        layout.addWidget(preview_label)
+        self.preview_label = QLabel("🎬 Preview da Fita de LEDs")
+        self.preview_label.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.preview_label)
+
+        self.layout_warning = QLabel(f"⚠️ {self.layout_mismatch}")
+        self.layout_warning.setWordWrap(True)
+        self.layout_warning.setStyleSheet("color: #ffaa00;")
+        self.layout_warning.setVisible(self.layout_mismatch is not None)
+        layout.addWidget(self.layout_warning)
         
         self.led_preview = LinearLEDPreview(self.total_leds, self.letter_mapping)
         layout.addWidget(self.led_preview)
 
-        # Set LED positions from the cartesian coordinate map (x, y).
-        led_positions = {
-            0:  (0, 0),   1:  (0, 1),   2:  (2, 3),   3:  (3, 3),   4:  (1, 2),
-            5:  (1, 1),   6:  (5, 3),   7:  (2, 1),   8:  (1, 0),   9:  (3, 2),
-            10: (3, 1),   11: (2, 0),   12: (3, 0),   13: (5, 2),   14: (9, 3),
-            15: (7, 2),   16: (4, 0),   17: (5, 0),   18: (5, 1),   19: (6, 1),
-            20: (8, 1),   21: (6, 0),   22: (9, 2),   23: (10, 2),  24: (12, 3),
-            25: (9, 1),   26: (7, 0),   27: (8, 0),   28: (9, 0),   29: (11, 1),
-            30: (12, 2),  31: (15, 3),  32: (13, 2),  33: (13, 1),  34: (10, 0),
-            35: (11, 1),  36: (11, 0),  37: (15, 1),  38: (15, 2),  39: (18, 3),
-            40: (17, 2),  41: (16, 1),  42: (12, 0),  43: (13, 0),  44: (19, 2),
-            45: (19, 3),
-        }
-        self.led_preview.set_led_grid_positions(led_positions, cols=20, rows=4)
+        # Posições (x, y) de cada LED vindas do arquivo de layout
+        self.led_preview.set_led_grid_positions(
+            self.layout.positions(), cols=self.layout.cols, rows=self.layout.rows
+        )
         
         # ===== Botões de Ação =====
         action_layout = QHBoxLayout()
@@ -217,6 +336,12 @@ class EffectsTab(QWidget):
         # Conecta mudanças de configuração
         self._on_effect_type_changed()
     
+    def _refresh_thumbnails(self):
+        """Ícones dos 12 meses; só presets novos ou alterados são desenhados de novo"""
+        self.thumbnails.refresh(
+            [self.presets_manager.get_preset(mes) for mes in range(1, len(PresetsManager.MONTHS) + 1)]
+        )
+    
     def _on_preset_changed(self):
         """Carrega dados do preset selecionado"""
         mes = self.preset_selector.currentIndex() + 1
@@ -255,28 +380,210 @@ class EffectsTab(QWidget):
         self.wave_width_slider.setValue(wave_width)
         self.wave_width_value.setText(str(wave_width))
         
+        # Cintilar / Fogo
+        self.density_slider.setValue(self.current_preset.get("densidade", DEFAULT_DENSITY))
+        self.seed_spin.setValue(self.current_preset.get("semente", DEFAULT_SEED))
+        
+        self._load_timeline_data()
         self._on_preview_update()
     
     def _on_effect_type_changed(self):
         """Mostra/esconde controles baseado no tipo de efeito"""
         effect_type = self.effect_dropdown.currentText()
         
-        # Cor 2 só aparece em Gradiente e Onda
-        self.color2_btn.setVisible(effect_type in ["Gradiente", "Onda"])
-        self.color2_preview.setVisible(effect_type in ["Gradiente", "Onda"])
+        # Cor 2 só aparece nos efeitos de duas cores
+        two_colors = effect_type in ["Gradiente", "Onda", "Cintilar", "Fogo"]
+        self.color2_btn.setVisible(two_colors)
+        self.color2_preview.setVisible(two_colors)
         
-        # Onda width slider só em Onda
-        self.wave_group.setVisible(effect_type == "Onda")
+        # Largura: tamanho da onda ou LEDs por volta do arco-íris
+        self.wave_group.setVisible(effect_type in ["Onda", "Arco-íris"])
+        self.wave_width_label.setText("LEDs por volta:" if effect_type == "Arco-íris" else "Largura (LEDs):")
+        self.fx_group.setVisible(effect_type in ["Cintilar", "Fogo"])
+        
+        # Linha do tempo tem cores por keyframe e período de quadro próprio; o arco-íris não usa cores
+        timeline = effect_type == "Linha do tempo"
+        self.timeline_group.setVisible(timeline)
+        self.color_group.setVisible(not timeline and effect_type != "Arco-íris")
+        self.speed_group.setVisible(not timeline)
         
         self._on_preview_update()
     
     def _on_preview_update(self):
         """Atualiza preview sem animar (parado)"""
-        self.timer.stop()
-        self.wave_index = 0
-        self.blink_state = True
-        self._generate_led_colors()
-        self.led_preview.update_leds(self.virtual_leds)
+        self.animating = False
+        params = self._current_params()
+        if params["tipo"] == "Linha do tempo":
+            # Parado, o preview mostra o keyframe selecionado
+            row = max(0, self.keyframe_list.currentRow())
+            if row < len(params["keyframes"]):
+                params["keyframes"] = [dict(params["keyframes"][row], tempo_ms=0)]
+        self.render_worker.set_effect(params, animate=False)
+        self.timer.start(self.DISPLAY_INTERVAL_MS)
+    
+    def _current_params(self):
+        """Parâmetros do efeito na interface, no formato dos presets"""
+        params = {
+            "tipo": self.effect_dropdown.currentText(),
+            "color1": self.color1.name(),
+            "color2": self.color2.name(),
+            "velocidade": self.speed_dropdown.currentText(),
+            "wave_width": max(1, self.wave_width_slider.value()),
+            "densidade": self.density_slider.value(),
+            "semente": self.seed_spin.value(),
+        }
+        if params["tipo"] == "Linha do tempo":
+            params["segmentos"] = list(self.timeline_segments)
+            params["keyframes"] = [
+                dict(keyframe, cores=list(keyframe["cores"])) for keyframe in self.timeline_keyframes
+            ]
+        return params
+    
+    # -----------------------------------------
+    # Linha do tempo
+    # -----------------------------------------
+    def _load_timeline_data(self):
+        """Carrega segmentos e keyframes do preset (ou uma linha do tempo inicial)"""
+        segments = self.current_preset.get("segmentos")
+        letter_starts = segment_starts(self.total_leds, letters=self.letters) if self.letters else None
+        
+        self.segment_mode.blockSignals(True)
+        self.segment_count.blockSignals(True)
+        if segments and segments != letter_starts:
+            self.segment_mode.setCurrentIndex(1)
+            self.segment_count.setValue(len(segments))
+        elif self.letters:
+            self.segment_mode.setCurrentIndex(0)
+        self.segment_mode.blockSignals(False)
+        self.segment_count.blockSignals(False)
+        
+        self.timeline_segments = segments or self._segment_starts()
+        keyframes = self.current_preset.get("keyframes")
+        if not keyframes:
+            keyframes = default_keyframes(len(self.timeline_segments), self.color1.name(), self.color2.name())
+        self.timeline_keyframes = [dict(keyframe, cores=list(keyframe["cores"])) for keyframe in keyframes]
+        self._fit_keyframe_colors()
+        self._refresh_keyframe_list(0)
+    
+    def _segment_starts(self):
+        """Segmentos escolhidos na interface: letras do config ou trechos iguais"""
+        by_letter = self.segment_mode.currentIndex() == 0 and bool(self.letters)
+        self.segment_count.setEnabled(not by_letter)
+        if by_letter:
+            return segment_starts(self.total_leds, letters=self.letters)
+        return segment_starts(self.total_leds, count=self.segment_count.value())
+    
+    def _fit_keyframe_colors(self):
+        """Ajusta as cores de cada keyframe ao número de segmentos (repete a última)"""
+        count = len(self.timeline_segments)
+        for keyframe in self.timeline_keyframes:
+            cores = keyframe.get("cores") or ["#000000"]
+            keyframe["cores"] = (cores + [cores[-1]] * count)[:count]
+    
+    def _on_segments_changed(self):
+        self.timeline_segments = self._segment_starts()
+        self._fit_keyframe_colors()
+        self._refresh_keyframe_list(self.keyframe_list.currentRow())
+        self._on_preview_update()
+    
+    def _refresh_keyframe_list(self, select_row=0):
+        """Reordena os keyframes por tempo e redesenha a lista"""
+        selected = self.timeline_keyframes[select_row] if 0 <= select_row < len(self.timeline_keyframes) else None
+        self.timeline_keyframes.sort(key=lambda keyframe: keyframe.get("tempo_ms", 0))
+        
+        self.keyframe_list.blockSignals(True)
+        self.keyframe_list.clear()
+        for keyframe in self.timeline_keyframes:
+            self.keyframe_list.addItem(
+                f"{keyframe.get('tempo_ms', 0) / 1000:.1f} s · {keyframe.get('transicao', TRANSITIONS[0])}"
+                f" · {len(set(keyframe['cores']))} cor(es)"
+            )
+        row = self.timeline_keyframes.index(selected) if selected in self.timeline_keyframes else 0
+        self.keyframe_list.setCurrentRow(row)
+        self.keyframe_list.blockSignals(False)
+        self._on_keyframe_selected(row)
+    
+    def _selected_keyframe(self):
+        row = self.keyframe_list.currentRow()
+        if 0 <= row < len(self.timeline_keyframes):
+            return self.timeline_keyframes[row]
+        return None
+    
+    def _on_keyframe_selected(self, row=None):
+        """Mostra tempo, transição e cores do keyframe selecionado"""
+        keyframe = self._selected_keyframe()
+        self.remove_keyframe_btn.setEnabled(len(self.timeline_keyframes) > 1)
+        if keyframe is None:
+            return
+        self.keyframe_time.blockSignals(True)
+        self.keyframe_transition.blockSignals(True)
+        self.keyframe_time.setValue(int(keyframe.get("tempo_ms", 0)))
+        transition = keyframe.get("transicao", TRANSITIONS[0])
+        self.keyframe_transition.setCurrentIndex(TRANSITIONS.index(transition) if transition in TRANSITIONS else 0)
+        self.keyframe_time.blockSignals(False)
+        self.keyframe_transition.blockSignals(False)
+        self._rebuild_segment_buttons(keyframe)
+        if row is not None and self.effect_dropdown.currentText() == "Linha do tempo":
+            self._on_preview_update()
+    
+    def _rebuild_segment_buttons(self, keyframe):
+        while self.segment_colors_layout.count():
+            item = self.segment_colors_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        self.segment_color_buttons = []
+        self.segment_colors_layout.addWidget(QLabel("Cores:"))
+        for k, color in enumerate(keyframe["cores"]):
+            button = QPushButton(str(k + 1))
+            button.setFixedSize(28, 28)
+            button.setToolTip(f"Segmento {k + 1} (a partir do LED {self.timeline_segments[k]})")
+            button.setStyleSheet(f"min-width: 0; padding: 0; background-color: {color}; border: 2px solid #333;")
+            button.clicked.connect(lambda _checked, k=k: self._pick_segment_color(k))
+            self.segment_colors_layout.addWidget(button)
+            self.segment_color_buttons.append(button)
+        self.segment_colors_layout.addStretch()
+    
+    def _pick_segment_color(self, segment):
+        keyframe = self._selected_keyframe()
+        if keyframe is None:
+            return
+        color = QColorDialog.getColor(QColor(keyframe["cores"][segment]), self, f"Cor do segmento {segment + 1}")
+        if color.isValid():
+            keyframe["cores"][segment] = color.name()
+            self._refresh_keyframe_list(self.keyframe_list.currentRow())
+    
+    def _fill_keyframe(self):
+        """Pinta todos os segmentos do keyframe selecionado com uma cor"""
+        keyframe = self._selected_keyframe()
+        if keyframe is None:
+            return
+        color = QColorDialog.getColor(QColor(keyframe["cores"][0]), self, "Cor de todos os segmentos")
+        if color.isValid():
+            keyframe["cores"] = [color.name()] * len(keyframe["cores"])
+            self._refresh_keyframe_list(self.keyframe_list.currentRow())
+    
+    def _add_keyframe(self):
+        """Duplica o keyframe selecionado 1 s depois do último"""
+        keyframe = self._selected_keyframe() or {"cores": [self.color1.name()], "transicao": TRANSITIONS[1]}
+        last_time = max((k.get("tempo_ms", 0) for k in self.timeline_keyframes), default=-1000)
+        self.timeline_keyframes.append(dict(keyframe, cores=list(keyframe["cores"]), tempo_ms=last_time + 1000))
+        self._fit_keyframe_colors()
+        self._refresh_keyframe_list(len(self.timeline_keyframes) - 1)
+    
+    def _remove_keyframe(self):
+        row = self.keyframe_list.currentRow()
+        if len(self.timeline_keyframes) > 1 and 0 <= row < len(self.timeline_keyframes):
+            del self.timeline_keyframes[row]
+            self._refresh_keyframe_list(min(row, len(self.timeline_keyframes) - 1))
+    
+    def _on_keyframe_edited(self):
+        """Aplica tempo e transição editados ao keyframe selecionado"""
+        keyframe = self._selected_keyframe()
+        if keyframe is None:
+            return
+        keyframe["tempo_ms"] = self.keyframe_time.value()
+        keyframe["transicao"] = self.keyframe_transition.currentText()
+        self._refresh_keyframe_list(self.keyframe_list.currentRow())
     
     def _select_color1(self):
         """Abre diálogo de cor para Cor 1"""
@@ -296,68 +603,49 @@ class EffectsTab(QWidget):
     
     def _start_animation(self):
         """Inicia animação do efeito"""
-        self.timer.stop()
-        self.wave_index = 0
-        self.blink_state = True
-        
-        effect_type = self.effect_dropdown.currentText()
-        speed_label = self.speed_dropdown.currentText()
-        delay_map = {"Lento": 300, "Médio": 150, "Rápido": 70, "Turbo": 30}
-        delay = delay_map.get(speed_label, 150)
-        
-        # Anima todos os efeitos (Cor sólida e Gradiente piscam, Onda move)
-        self.timer.start(delay)
+        # Anima como no Arduino: só Cor sólida e Gradiente ficam parados
+        self.animating = True
+        self.render_worker.set_effect(self._current_params(), animate=True)
+        self.timer.start(self.DISPLAY_INTERVAL_MS)
     
     def update_preview_animation(self):
-        """Chamado pelo timer para atualizar animação"""
-        self._generate_led_colors()
-        self.led_preview.update_leds(self.virtual_leds)
+        """Chamado pelo timer: exibe o quadro pronto mais recente, se houver"""
+        frame = self.render_worker.frames.take_latest()
+        if frame is None:
+            return
+        # Mesmo sem mudança o widget passa a apontar para este buffer: o anterior voltou ao renderizador
+        self.led_preview.update_frame(frame, self.frame_diff.compare(frame))
+        if self.frame_diff.frames % self.DIFF_STATS_FRAMES == 0:
+            self._refresh_diff_stats()
+        if not self.animating:
+            self.timer.stop()
+            self._refresh_diff_stats()
+
+    def _refresh_diff_stats(self):
+        stats = self.frame_diff.stats()
+        frames, cells = max(1, stats["frames"]), max(1, stats["cells"])
+        self.preview_label.setToolTip(
+            f"Quadros sem repintura: {stats['skipped_frames']}/{stats['frames']} "
+            f"({100 * stats['skipped_frames'] // frames}%)\n"
+            f"LEDs sem repintura: {stats['skipped_cells']}/{stats['cells']} "
+            f"({100 * stats['skipped_cells'] // cells}%)"
+        )
     
-    def _generate_led_colors(self):
-        """Gera array de cores dos LEDs baseado no efeito selecionado"""
-        effect_type = self.effect_dropdown.currentText()
-        
-        if effect_type == "Cor sólida":
-            # Pisca (alterna entre cor e preto)
-            if self.blink_state:
-                self.virtual_leds = [self.color1] * self.total_leds
-            else:
-                self.virtual_leds = [QColor(0, 0, 0)] * self.total_leds
-            self.blink_state = not self.blink_state
-        
-        elif effect_type == "Gradiente":
-            # Pisca o gradiente (alterna entre gradiente normal e invertido)
-            self.virtual_leds = []
-            for i in range(self.total_leds):
-                t = i / max(1, self.total_leds - 1)
-                # Se blink_state = True, gradiente normal; False, invertido
-                if self.blink_state:
-                    blend = t
-                else:
-                    blend = 1 - t
-                r = int(self.color1.red() * (1 - blend) + self.color2.red() * blend)
-                g = int(self.color1.green() * (1 - blend) + self.color2.green() * blend)
-                b = int(self.color1.blue() * (1 - blend) + self.color2.blue() * blend)
-                self.virtual_leds.append(QColor(r, g, b))
-            self.blink_state = not self.blink_state
-        
-        elif effect_type == "Onda":
-            wave_width = max(1, self.wave_width_slider.value())
-            self.virtual_leds = []
-            period = 2 * wave_width
-            for i in range(self.total_leds):
-                # faz um gradiente suave tipo vai-e-volta usando cosseno
-                phase = ((i - self.wave_index) % period) / wave_width  # 0..2
-                # blend varia suavemente entre 1 (color1) -> 0 (color2) -> 1 (color1)
-                blend = 0.5 * (1 + math.cos(math.pi * phase))
-                r = int(self.color1.red() * blend + self.color2.red() * (1 - blend))
-                g = int(self.color1.green() * blend + self.color2.green() * (1 - blend))
-                b = int(self.color1.blue() * blend + self.color2.blue() * (1 - blend))
-                self.virtual_leds.append(QColor(r, g, b))
+    def _suspend_preview(self):
+        self.timer.stop()
+        self.render_worker.pause()
+
+    def _resume_preview(self):
+        self.render_worker.resume()
+        # Exibe o quadro pendente; com animação, o timer segue rodando
+        self.timer.start(self.DISPLAY_INTERVAL_MS)
 
-            if self.timer.isActive():
-                # Avança o índice para a próxima frame
-                self.wave_index = (self.wave_index + 1) % self.total_leds
+    def closeEvent(self, event):
+        """Para a thread de renderização ao fechar a aba"""
+        self.timer.stop()
+        self.render_worker.stop()
+        self.thumbnails.stop()
+        super().closeEvent(event)
     
     def _save_preset(self):
         """Salva o efeito atual como preset"""
@@ -369,11 +657,18 @@ class EffectsTab(QWidget):
             "color2": self.color2.name(),
             "velocidade": self.speed_dropdown.currentText(),
             "wave_width": self.wave_width_slider.value(),
+            "densidade": self.density_slider.value(),
+            "semente": self.seed_spin.value(),
             "descricao": f"Efeito salvo em {datetime.now().strftime('%d/%m/%Y %H:%M')}"
         }
+        if effect_data["tipo"] == "Linha do tempo":
+            params = self._current_params()
+            effect_data["segmentos"] = params["segmentos"]
+            effect_data["keyframes"] = params["keyframes"]
         
         self.presets_manager.update_preset(mes, effect_data)
         self.presets_manager.set_active_preset(mes)
+        self._refresh_thumbnails()
         
         QMessageBox.information(
             self,
@@ -3,19 +3,27 @@ installer_tab.py - Aba de instalação e upload de firmware
 Integra monitor de conexão em tempo real com ArduinoMonitor
 """
 import os
+import shutil
+import threading
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QComboBox, 
     QMessageBox, QProgressBar, QFrame, QSpacerItem, QSizePolicy, QGroupBox,
-    QTextEdit
+    QTextEdit, QCheckBox, QFileDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 
 from app.config_manager import load_config
+from app.layout import led_count_mismatch, load_layout, layout_path_from_config
 from app.presets_manager import PresetsManager
 from app.firmware_generator import FirmwareGenerator
-from app.serial_utils import get_available_ports, detect_arduino_ports, probe_port
+from app.batch_builder import run_batch
+from app.serial_utils import get_available_ports, detect_arduino_ports, probe_port, sync_clock
 from app.connection_monitor import ArduinoMonitor
+from app.activity_manager import activity_manager
+from app.telemetry import FREE_SRAM_UNKNOWN, TelemetryReader
+from app.thumbnail_cache import thumbnail_dir_from_config
+from app.ui.widgets import PresetThumbnails
 
 
 class InstallerTab(QWidget):
@@ -23,6 +31,16 @@ class InstallerTab(QWidget):
     Aba para compilação e upload de firmware.
     Monitora status de conexão Arduino em tempo real.
     """
+
+    # Sinais emitidos pela thread do lote (concluídas, total) / resumo ou erro
+    batch_progress = pyqtSignal(int, int)
+    batch_finished = pyqtSignal(dict)
+    # Sinal da thread de sincronização do relógio (porta, enviado)
+    sync_finished = pyqtSignal(str, bool)
+
+    # Intervalo de sondagem das portas com a aba visível / escondida (s)
+    CHECK_INTERVAL_S = 2
+    HIDDEN_CHECK_INTERVAL_S = 30
     
     def __init__(self):
         super().__init__()
@@ -34,14 +52,22 @@ class InstallerTab(QWidget):
         )
         
         # Inicia monitor de conexão
-        self.arduino_monitor = ArduinoMonitor(check_interval=2)
+        self.arduino_monitor = ArduinoMonitor(check_interval=self.CHECK_INTERVAL_S)
         self.arduino_monitor.status_updated.connect(self._on_status_updated)
         self.arduino_monitor.connection_changed.connect(self._on_connection_changed)
         
         self.selected_port = None
         self.firmware_code = None
+        self.batch_thread = None
+        self.sync_thread = None
+        self.telemetry_reader = None
         
         self._init_ui()
+        self.batch_progress.connect(self._on_batch_progress)
+        self.batch_finished.connect(self._on_batch_finished)
+        self.sync_finished.connect(self._on_sync_finished)
+        # Com a aba escondida (ou o app ocioso) as portas são sondadas bem mais devagar
+        activity_manager().register(self, self._suspend_polling, self._resume_polling)
     
     def _init_ui(self):
         """Inicializa interface"""
@@ -102,7 +128,20 @@ class InstallerTab(QWidget):
         self.status_indicator.setStyleSheet("color: #666;")
         status_row.addWidget(self.status_indicator)
         status_row.addStretch()
+
+        self.diagnostics_checkbox = QCheckBox("🩺 Diagnóstico")
+        self.diagnostics_checkbox.toggled.connect(self._toggle_diagnostics)
+        status_row.addWidget(self.diagnostics_checkbox)
         connection_layout.addLayout(status_row)
+
+        # Painel compacto com as métricas de saúde do ArduinoMonitor (atualizado só quando visível)
+        self.diagnostics_label = QLabel("")
+        self.diagnostics_label.setFont(QFont("Courier New", 9))
+        self.diagnostics_label.setStyleSheet("color: #444;")
+        self.diagnostics_label.setVisible(False)
+        connection_layout.addWidget(self.diagnostics_label)
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self._update_diagnostics)
         
         # Seleção de porta
         port_row = QHBoxLayout()
@@ -133,14 +172,28 @@ class InstallerTab(QWidget):
         
         # ===== SEÇÃO 2: Seleção de Preset =====
         preset_group = QGroupBox("📅 Selecione o Preset para Upload")
-        preset_layout = QHBoxLayout()
+        preset_layout = QVBoxLayout()
         
+        preset_row = QHBoxLayout()
         self.preset_selector = QComboBox()
         self.preset_selector.addItems(
             [f"Mês {i}: {m}" for i, m in enumerate(PresetsManager.MONTHS, 1)]
         )
-        preset_layout.addWidget(QLabel("Preset:"))
-        preset_layout.addWidget(self.preset_selector, stretch=1)
+        preset_row.addWidget(QLabel("Preset:"))
+        preset_row.addWidget(self.preset_selector, stretch=1)
+        # Miniaturas dos meses (mesmo cache em disco da aba de efeitos)
+        self.led_layout = load_layout(layout_path_from_config(self.config), strict=False)
+        self.thumbnails = PresetThumbnails(
+            self.preset_selector, self.led_layout, thumbnail_dir_from_config(self.config)
+        )
+        preset_layout.addLayout(preset_row)
+        
+        # Todos os meses em um único firmware: o Arduino troca sozinho de preset
+        self.schedule_checkbox = QCheckBox(
+            "📆 Incluir os 12 meses (troca automática de preset e standby)"
+        )
+        self.schedule_checkbox.toggled.connect(self.preset_selector.setDisabled)
+        preset_layout.addWidget(self.schedule_checkbox)
         
         preset_group.setLayout(preset_layout)
         layout.addWidget(preset_group)
@@ -153,6 +206,14 @@ class InstallerTab(QWidget):
         self.compile_btn = QPushButton("⚙️ Gerar Firmware")
         self.compile_btn.clicked.connect(self._compile_firmware)
         compile_btn_row.addWidget(self.compile_btn)
+
+        self.batch_btn = QPushButton("📦 Gerar Lote (meses x placas)")
+        self.batch_btn.setToolTip(
+            "Gera um sketch por mês, placa e layout de pinos em build/firmware "
+            "(compila com arduino-cli se estiver instalado)"
+        )
+        self.batch_btn.clicked.connect(self._build_batch)
+        compile_btn_row.addWidget(self.batch_btn)
         compile_btn_row.addStretch()
         compile_layout.addLayout(compile_btn_row)
         
@@ -171,7 +232,37 @@ class InstallerTab(QWidget):
         compile_group.setLayout(compile_layout)
         layout.addWidget(compile_group)
         
-        # ===== SEÇÃO 4: Upload =====
+        # ===== SEÇÃO 4: Telemetria =====
+        telemetry_group = QGroupBox("📊 Telemetria do Arduino")
+        telemetry_layout = QVBoxLayout()
+
+        self.telemetry_checkbox = QCheckBox(
+            "Incluir telemetria no firmware (FPS, tempo de efeito/show, SRAM livre)"
+        )
+        self.telemetry_checkbox.setChecked(bool(self.config.get("telemetry", False)))
+        telemetry_layout.addWidget(self.telemetry_checkbox)
+
+        telemetry_btn_row = QHBoxLayout()
+        self.telemetry_btn = QPushButton("▶️ Ler Telemetria")
+        self.telemetry_btn.clicked.connect(self._toggle_telemetry)
+        telemetry_btn_row.addWidget(self.telemetry_btn)
+        self.telemetry_export_btn = QPushButton("💾 Exportar CSV")
+        self.telemetry_export_btn.clicked.connect(self._export_telemetry)
+        self.telemetry_export_btn.setEnabled(False)
+        telemetry_btn_row.addWidget(self.telemetry_export_btn)
+        telemetry_btn_row.addStretch()
+        telemetry_layout.addLayout(telemetry_btn_row)
+
+        self.telemetry_label = QLabel("")
+        self.telemetry_label.setFont(QFont("Courier New", 9))
+        telemetry_layout.addWidget(self.telemetry_label)
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self._update_telemetry)
+
+        telemetry_group.setLayout(telemetry_layout)
+        layout.addWidget(telemetry_group)
+
+        # ===== SEÇÃO 5: Upload =====
         upload_group = QGroupBox("⬆️ Upload para Arduino")
         upload_layout = QVBoxLayout()
         
@@ -180,6 +271,13 @@ class InstallerTab(QWidget):
         self.upload_btn.clicked.connect(self._upload_firmware)
         self.upload_btn.setEnabled(False)
         upload_btn_row.addWidget(self.upload_btn)
+        
+        self.sync_clock_btn = QPushButton("🕒 Sincronizar Relógio")
+        self.sync_clock_btn.setToolTip(
+            "Envia data/hora do computador para o Arduino (firmware com os 12 meses)"
+        )
+        self.sync_clock_btn.clicked.connect(self._sync_clock)
+        upload_btn_row.addWidget(self.sync_clock_btn)
         upload_btn_row.addStretch()
         upload_layout.addLayout(upload_btn_row)
         
@@ -300,6 +398,33 @@ class InstallerTab(QWidget):
         elif "⚠️" in status_msg:
             self.status_indicator.setStyleSheet("color: #ffaa00; font-weight: bold;")
     
+    def _toggle_diagnostics(self, visible):
+        self.diagnostics_label.setVisible(visible)
+        if visible:
+            self._update_diagnostics()
+            self.diagnostics_timer.start(1000)
+        else:
+            self.diagnostics_timer.stop()
+
+    def _update_diagnostics(self):
+        """Mostra as métricas de saúde da conexão"""
+        health = self.arduino_monitor.get_health()
+
+        def ms(value):
+            return "-" if value is None else f"{value:.0f} ms"
+
+        lines = [
+            f"Sondagens: {health['checks']} ({health['probe_failures']} sem resposta) · "
+            f"latência p50 {ms(health['probe_p50_ms'])} / p95 {ms(health['probe_p95_ms'])} / "
+            f"máx {ms(health['probe_max_ms'])}",
+            f"Reconexões: {health['reconnects']} · conectado há {health['connected_for_s']:.0f} s "
+            f"(total {health['connected_total_s']:.0f} s) · status repetidos omitidos: "
+            f"{health['status_suppressed']}",
+        ]
+        if health["last_error"]:
+            lines.append(f"Último erro: {health['last_error']}")
+        self.diagnostics_label.setText("\n".join(lines))
+
     def _on_connection_changed(self, is_connected):
         """Atualiza botão de upload quando conexão muda"""
         self.upload_btn.setEnabled(is_connected and self.firmware_code is not None)
@@ -307,35 +432,135 @@ class InstallerTab(QWidget):
     def _compile_firmware(self):
         """Gera código Arduino a partir do preset selecionado"""
         mes = self.preset_selector.currentIndex() + 1
-        presets = self.presets_manager.get_all_presets()
+        scheduled = self.schedule_checkbox.isChecked()
         
-        # Filtra apenas o preset selecionado
-        selected_preset = self.presets_manager.get_preset(mes)
-        if not selected_preset:
-            QMessageBox.warning(self, "Erro", "Preset não encontrado.")
-            return
+        if scheduled:
+            # Todos os presets mensais vão para a flash
+            presets = self.presets_manager.get_all_presets()
+        else:
+            # Filtra apenas o preset selecionado
+            selected_preset = self.presets_manager.get_preset(mes)
+            if not selected_preset:
+                QMessageBox.warning(self, "Erro", "Preset não encontrado.")
+                return
+            presets = [selected_preset]
         
         try:
             # Gera firmware
-            self.firmware_code = self.firmware_generator.generate_firmware([selected_preset])
+            telemetry = self.telemetry_checkbox.isChecked()
+            self.firmware_code = self.firmware_generator.generate_firmware(
+                presets, scheduled=scheduled, telemetry=telemetry
+            )
             
             # Mostra preview
             self.code_preview.setText(self.firmware_code)
-            self.compile_status.setText("✅ Firmware gerado com sucesso!")
+            report = self.firmware_generator.last_report
+            self.compile_status.setText(
+                f"✅ Firmware gerado com sucesso! (~{report['flash_estimate']} bytes de flash, "
+                f"~{report['flash_saved']} bytes economizados)"
+            )
+            self.compile_status.setToolTip(
+                "Incluído: " + ", ".join(report["fragments"])
+                + ("\nOmitido: " + ", ".join(report["omitted"]) if report["omitted"] else "")
+                + "\nPortas: " + ", ".join(f"pino {p['pin']} ({p['leds']} LEDs)" for p in report["ports"])
+                + f" — FastLED.show() ~{report['show_us'] / 1000:.1f} ms"
+                + (" (paralelo no Teensy 4.x / ESP32: "
+                   f"~{report['show_us_parallel'] / 1000:.1f} ms)" if report["parallel_output"] else "")
+            )
             self.compile_status.setStyleSheet("color: #00aa00;")
+            mismatch = led_count_mismatch(self.led_layout, self.config)
+            if mismatch:
+                self.compile_status.setText(f"{self.compile_status.text()}\n⚠️ {mismatch}")
+                self.compile_status.setStyleSheet("color: #ffaa00;")
             
             # Habilita botão de upload se conectado
             if self.arduino_monitor.is_connected and self.selected_port:
                 self.upload_btn.setEnabled(True)
             
             # Salva arquivo
-            self.firmware_generator.save_firmware([selected_preset])
+            self.firmware_generator.save_firmware(presets, scheduled=scheduled, telemetry=telemetry)
             
         except Exception as e:
             QMessageBox.critical(self, "Erro na Compilação", f"Erro: {str(e)}")
             self.compile_status.setText(f"❌ Erro: {str(e)}")
             self.compile_status.setStyleSheet("color: #ff6b6b;")
     
+    def _build_batch(self):
+        """Gera todos os firmwares (preset x placa x layout) em segundo plano"""
+        if self.batch_thread and self.batch_thread.is_alive():
+            return
+        self.batch_btn.setEnabled(False)
+        self.compile_status.setText("📦 Gerando lote de firmwares...")
+        self.compile_status.setStyleSheet("color: #666;")
+        compile_sketches = shutil.which("arduino-cli") is not None
+        self.batch_thread = threading.Thread(
+            target=self._run_batch, args=(compile_sketches,), daemon=True
+        )
+        self.batch_thread.start()
+
+    def _run_batch(self, compile_sketches):
+        """Roda na thread do lote; resultados voltam por sinais"""
+        try:
+            summary = run_batch(
+                presets=self.presets_manager.get_all_presets(),
+                config=self.config,
+                compile_sketches=compile_sketches,
+                progress=self.batch_progress.emit,
+            )
+        except Exception as e:
+            summary = {"error": str(e)}
+        self.batch_finished.emit(summary)
+
+    def _on_batch_progress(self, done, total):
+        self.compile_status.setText(f"📦 Gerando lote de firmwares... {done}/{total}")
+
+    def _on_batch_finished(self, summary):
+        self.batch_btn.setEnabled(True)
+        if "error" in summary:
+            self.compile_status.setText(f"❌ Erro no lote: {summary['error']}")
+            self.compile_status.setStyleSheet("color: #ff6b6b;")
+            return
+        text = (
+            f"✅ Lote: {summary['built']} gerado(s), {summary['skipped']} sem mudança "
+            f"em {summary['root']}"
+        )
+        if summary["failed"] or summary["too_big"]:
+            text += f" — {summary['failed']} erro(s), {len(summary['too_big'])} grande(s) demais"
+            self.compile_status.setStyleSheet("color: #ffaa00;")
+        else:
+            self.compile_status.setStyleSheet("color: #00aa00;")
+        self.compile_status.setText(text)
+        self.compile_status.setToolTip(f"Manifest: {summary['manifest']}")
+
+    def _sync_clock(self):
+        """Envia o horário local para o firmware agendado (comando T)"""
+        if not self.selected_port:
+            QMessageBox.warning(self, "Erro", "Nenhuma porta selecionada.")
+            return
+        if self.sync_thread and self.sync_thread.is_alive():
+            return
+        # Abrir a porta reinicia o Arduino e sync_clock espera o boot: roda fora da GUI
+        self.sync_clock_btn.setEnabled(False)
+        self.upload_status.setText(f"🕒 Sincronizando relógio em {self.selected_port}...")
+        self.upload_status.setStyleSheet("color: #666;")
+        self.sync_thread = threading.Thread(
+            target=self._run_sync_clock, args=(self.selected_port,), daemon=True
+        )
+        self.sync_thread.start()
+
+    def _run_sync_clock(self, port):
+        """Roda na thread de sincronização; o resultado volta por sinal"""
+        self.sync_finished.emit(port, sync_clock(port, self.config.get("serial_baud", 9600)))
+
+    def _on_sync_finished(self, port, sent):
+        self.sync_clock_btn.setEnabled(True)
+        if sent:
+            self.upload_status.setText("🕒 Relógio do Arduino sincronizado.")
+            self.upload_status.setStyleSheet("color: #00aa00;")
+        else:
+            self.upload_status.setText(f"❌ Não foi possível sincronizar o relógio em {port}")
+            self.upload_status.setStyleSheet("color: #ff6b6b;")
+    
     def _upload_firmware(self):
         """Faz upload do firmware para o Arduino"""
         if not self.selected_port:
@@ -373,7 +598,90 @@ class InstallerTab(QWidget):
             self.upload_status.setStyleSheet("color: #ff6b6b;")
             self.upload_progress.setVisible(False)
     
+    def _toggle_telemetry(self):
+        """Inicia/para a leitura da telemetria na porta selecionada"""
+        if self.telemetry_reader is not None:
+            self._stop_telemetry()
+            return
+        if not self.selected_port:
+            QMessageBox.warning(self, "Erro", "Nenhuma porta selecionada.")
+            return
+        # O monitor abre a porta para sondar (e reinicia a placa): pausa enquanto lemos
+        self.arduino_monitor.pause()
+        self.telemetry_reader = TelemetryReader(self.selected_port, self.config.get("serial_baud", 9600))
+        self.telemetry_reader.start()
+        self.telemetry_btn.setText("⏹️ Parar Telemetria")
+        self.telemetry_export_btn.setEnabled(True)
+        self.telemetry_label.setText("Aguardando registros do Arduino...")
+        self.telemetry_timer.start(1000)
+
+    def _stop_telemetry(self):
+        self.telemetry_timer.stop()
+        if self.telemetry_reader is not None:
+            self.telemetry_reader.stop()
+        self.telemetry_reader = None
+        self.telemetry_btn.setText("▶️ Ler Telemetria")
+        self.arduino_monitor.resume()
+
+    def _update_telemetry(self):
+        """Mostra o registro de telemetria mais recente"""
+        reader = self.telemetry_reader
+        if reader is None:
+            return
+        if reader.error:
+            self.telemetry_label.setText(f"❌ {reader.error}")
+            self._stop_telemetry()
+            return
+        record = reader.latest()
+        if record is None:
+            return
+
+        def fmt(value, unit):
+            return "-" if value is None else f"{value}{unit}"
+
+        free_sram = None if record['free_sram'] == FREE_SRAM_UNKNOWN else record['free_sram']
+
+        self.telemetry_label.setText(
+            f"FPS {fmt(record['fps'], '')} · efeito {fmt(record['apply_ms_per_frame'], ' ms')} · "
+            f"show {fmt(record['show_ms_per_frame'], ' ms')} · loop máx {record['max_loop_us'] / 1000:.1f} ms\n"
+            f"SRAM livre {fmt(free_sram, ' B')} · buffer serial cheio {record['rx_full']}x · "
+            f"efeito #{record['effect']} · ligado há {record['uptime_ms'] // 1000} s · "
+            f"{len(reader.records)} registros ({reader.bad_records} inválidos)"
+        )
+
+    def _export_telemetry(self):
+        """Exporta os registros do buffer para CSV"""
+        reader = self.telemetry_reader
+        if reader is None or not reader.records:
+            QMessageBox.information(self, "Telemetria", "Nenhum registro de telemetria para exportar.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exportar telemetria", "telemetria.csv", "CSV (*.csv)")
+        if path:
+            count = reader.export_csv(path)
+            self.telemetry_label.setText(f"💾 {count} registros exportados para {path}")
+
+    def _suspend_polling(self):
+        self.arduino_monitor.set_check_interval(
+            self.config.get("monitor_hidden_interval_s", self.HIDDEN_CHECK_INTERVAL_S)
+        )
+        self.telemetry_timer.stop()  # a leitura continua; só a exibição para
+
+    def _resume_polling(self):
+        self.arduino_monitor.set_check_interval(self.CHECK_INTERVAL_S)
+        if self.telemetry_reader is not None:
+            self._update_telemetry()
+            self.telemetry_timer.start(1000)
+
+    def showEvent(self, event):
+        """Atualiza as miniaturas ao entrar na aba (presets podem ter mudado)"""
+        super().showEvent(event)
+        self.thumbnails.refresh(
+            [self.presets_manager.get_preset(mes) for mes in range(1, len(PresetsManager.MONTHS) + 1)]
+        )
+    
     def closeEvent(self, event):
         """Para o monitor ao fechar a aba"""
+        self._stop_telemetry()
         self.arduino_monitor.stop()
+        self.thumbnails.stop()
         super().closeEvent(event)
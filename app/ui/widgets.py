@@ -2,11 +2,17 @@
 # Quadrados 20x20 com bordas arredondadas + info discreta abaixo
 # MATRIZ FIXA (não sofre impacto da quebra de linha do array)
 
+import json
+
 from PyQt5.QtWidgets import (
-    QWidget, QApplication, QGridLayout, QVBoxLayout, QLabel, QSizePolicy
+    QWidget, QApplication, QGridLayout, QVBoxLayout, QLabel, QRubberBand, QSizePolicy, QToolTip
 )
-from PyQt5.QtGui import QColor, QPainter, QPen, QBrush
-from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QColor, QPainter, QPen, QBrush, QIcon, QImage, QPixmap, QRegion
+from PyQt5.QtCore import Qt, QEvent, QObject, QRect, QRectF, QPointF, QSize, QTimer, pyqtSignal
+
+from app.selection_model import ADD, REPLACE, TOGGLE, SelectionModel, lasso_cells, range_cells, rect_cells
+from app.spatial_index import GridSpatialIndex
+from app.thumbnail_cache import ThumbnailCache, ThumbnailWorker
 
 
 # -----------------------------------------
@@ -38,7 +44,12 @@ class LEDCell(QWidget):
         self.setFixedSize(20, 20)
 
     def set_color(self, qcolor):
-        self.color = qcolor
+        self.color.setRgba(qcolor.rgba())
+        self.update()
+
+    def set_rgb(self, r, g, b):
+        # altera a cor no lugar (sem criar QColor novo)
+        self.color.setRgb(r, g, b)
         self.update()
 
     def enterEvent(self, event):
@@ -72,10 +83,151 @@ class LEDCell(QWidget):
             painter.drawRoundedRect(rect.adjusted(1, 1, -2, -2), 4, 4)
 
 
+# -----------------------------------------
+# Seleção de células — compartilhada por LEDMatrix e GridMatrix
+# -----------------------------------------
+class CellSelectionMixin:
+    """
+    Seleção ordenada (app/selection_model.py) para uma grade de células.
+
+    Clique, retângulo (arraste), laço (Alt + arraste) e intervalo (Shift);
+    Ctrl soma ou alterna. Só as células que mudaram são redesenhadas. O
+    widget precisa de `rows`, `cols`, `cell_grid[r][c]` (células com
+    `grid_pos` e `selected`) e do container onde as células estão.
+    """
+
+    def _init_selection(self, container):
+        self.selection_container = container
+        # Seleção ordenada de células (x, y); a ordem vira a ordem dos LEDs no layout
+        self.selection = SelectionModel()
+        # Retângulos viram fiação em zigue-zague (linhas alternadas invertidas)
+        self.serpentine = False
+        self._drag = None  # (modo, célula inicial, modificadores) durante um arraste
+        self._lasso = []
+        self._rubber_band = QRubberBand(QRubberBand.Rectangle, container)
+
+    def _connect_cell(self, cell):
+        """Eventos do mouse vão para a matriz (arrastes começam em uma célula e cruzam outras)"""
+        cell.mousePressEvent = lambda e, cell=cell: self._mouse_press(e, cell)
+        cell.mouseMoveEvent = lambda e, cell=cell: self._mouse_move(e, cell)
+        cell.mouseReleaseEvent = lambda e, cell=cell: self._mouse_release(e, cell)
+
+    def _selection_changed(self):
+        """Chamado após cada operação de seleção (ex.: atualizar um rótulo)"""
+
+    @property
+    def selection_order(self):
+        """IDs ("A1", ...) das células selecionadas, na ordem da seleção"""
+        return [self.cell_grid[y][x].cell_id for x, y in self.selection]
+
+    # -----------------------------------------
+    # Seleção: clique, retângulo, laço (Alt) e intervalo (Shift)
+    # -----------------------------------------
+    def _container_pos(self, event, cell):
+        return cell.mapTo(self.selection_container, event.pos())
+
+    def _cell_at(self, point):
+        """Célula (x, y) sob um ponto da matriz, limitada às bordas"""
+        first = self.cell_grid[0][0].geometry()
+        pitch_x = self.cell_grid[0][1].x() - first.x() if self.cols > 1 else first.width()
+        pitch_y = self.cell_grid[1][0].y() - first.y() if self.rows > 1 else first.height()
+        x = min(self.cols - 1, max(0, int((point.x() - first.x()) // pitch_x)))
+        y = min(self.rows - 1, max(0, int((point.y() - first.y()) // pitch_y)))
+        return x, y
+
+    def _cell_units(self, point):
+        """Ponto da matriz em unidades de célula (para o laço)"""
+        first = self.cell_grid[0][0].geometry()
+        pitch_x = self.cell_grid[0][1].x() - first.x() if self.cols > 1 else first.width()
+        pitch_y = self.cell_grid[1][0].y() - first.y() if self.rows > 1 else first.height()
+        return (point.x() - first.x()) / pitch_x, (point.y() - first.y()) / pitch_y
+
+    def _mouse_press(self, event, cell):
+        if event.button() != Qt.LeftButton:
+            return
+        modifiers = event.modifiers()
+        if modifiers & Qt.ShiftModifier and self.selection.anchor is not None:
+            # Intervalo a partir da última célula escolhida, somado à seleção
+            self._apply_selection(range_cells(self.selection.anchor, cell.grid_pos, self.cols), ADD)
+            return
+        if modifiers & Qt.AltModifier:
+            self._drag = ("lasso", cell.grid_pos, modifiers)
+            self._lasso = [self._cell_units(self._container_pos(event, cell))]
+            return
+        self._drag = ("rect", cell.grid_pos, modifiers)
+        self._rubber_band.setGeometry(cell.geometry())
+        self._rubber_band.show()
+
+    def _mouse_move(self, event, cell):
+        if self._drag is None:
+            return
+        kind, start, _ = self._drag
+        point = self._container_pos(event, cell)
+        if kind == "lasso":
+            self._lasso.append(self._cell_units(point))
+            return
+        x, y = self._cell_at(point)
+        a = self.cell_grid[start[1]][start[0]].geometry()
+        b = self.cell_grid[y][x].geometry()
+        self._rubber_band.setGeometry(a.united(b))
+
+    def _mouse_release(self, event, cell):
+        if self._drag is None:
+            return
+        kind, start, modifiers = self._drag
+        self._drag = None
+        self._rubber_band.hide()
+        ctrl = modifiers & Qt.ControlModifier
+        if kind == "lasso":
+            cells = lasso_cells(self._lasso, self.cols, self.rows)
+            self._lasso = []
+            self._apply_selection(cells, ADD if ctrl else REPLACE)
+            return
+        end = self._cell_at(self._container_pos(event, cell))
+        if end == start:
+            # Clique simples: Ctrl alterna a célula, sem Ctrl seleciona só ela
+            self._apply_selection([start], TOGGLE if ctrl else REPLACE)
+        else:
+            self._apply_selection(rect_cells(start, end, self.serpentine), ADD if ctrl else REPLACE)
+
+    def _apply_selection(self, cells, mode):
+        """Aplica a seleção e redesenha só as células que mudaram"""
+        changed = self.selection.apply(cells, mode)
+        for x, y in changed:
+            cell = self.cell_grid[y][x]
+            cell.selected = (x, y) in self.selection
+            cell.update()
+
+        self._selection_changed()
+
+        # copiar pro clipboard: uma célula pelo ID, várias como layout JSON
+        clipboard = QApplication.clipboard()
+        if len(self.selection) == 1:
+            clipboard.setText(self.selection_order[0])
+        elif len(self.selection) > 1:
+            clipboard.setText(self.selection.to_json(self.cols, self.rows))
+
+    def set_selection(self, cells):
+        """Seleciona células (x, y) nesta ordem (ex.: as posições de um layout existente)"""
+        self._apply_selection(
+            [(x, y) for x, y in cells if 0 <= x < self.cols and 0 <= y < self.rows], REPLACE
+        )
+
+    def layout_data(self, name="capturado"):
+        """Seleção no formato de layout de app/layout.py (LED i = i-ésima célula)"""
+        return self.selection.to_layout(self.cols, self.rows, name)
+
+    def export_layout(self, path, name="capturado"):
+        """Grava a seleção como arquivo de layout (config["layout_file"] pode apontar para ele)"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.layout_data(name), f, indent=1, ensure_ascii=False)
+        return len(self.selection)
+
+
 # -----------------------------------------
 # LED Matrix — matriz fixa + info abaixo
 # -----------------------------------------
-class LEDMatrix(QWidget):
+class LEDMatrix(CellSelectionMixin, QWidget):
 
     def __init__(self, rows=8, cols=53):
         super().__init__()
@@ -84,7 +236,7 @@ class LEDMatrix(QWidget):
         self.cols = cols
 
         self.cells = {}
-        self.selection_order = []
+        self.cell_grid = []  # cell_grid[r][c] -> LEDCell (sem montar IDs a cada quadro)
 
         # Layout principal
         main_layout = QVBoxLayout()
@@ -132,20 +284,25 @@ class LEDMatrix(QWidget):
         # Construir a matriz
         # -----------------------------------
         for r in range(rows):
+            row_cells = []
             for c in range(cols):
                 col_name = excel_column_name(c)
                 cell_id = f"{col_name}{r + 1}"
 
                 cell = LEDCell(cell_id, parent_matrix=self)
+                cell.grid_pos = (c, r)
                 self.cells[cell_id] = cell
+                row_cells.append(cell)
 
-                cell.mousePressEvent = lambda e, cid=cell_id: self._click(e, cid)
+                self._connect_cell(cell)
 
                 self.grid.addWidget(cell, r, c)
+            self.cell_grid.append(row_cells)
 
         # Trava o tamanho da matriz depois de construída
         self.matrix_container.adjustSize()
         self.matrix_container.setFixedSize(self.matrix_container.sizeHint())
+        self._init_selection(self.matrix_container)
 
     # -----------------------------------------
     # Hover mostra ID no título da janela
@@ -154,50 +311,21 @@ class LEDMatrix(QWidget):
         self.setWindowTitle(f"Hover: {cid}")
 
     # -----------------------------------------
-    # Clique ordenado
+    # Atualiza o painel de informações
     # -----------------------------------------
-    def _click(self, event, cid):
-        ctrl = event.modifiers() & Qt.ControlModifier
-
-        if ctrl:
-            if cid in self.selection_order:
-                self.selection_order.remove(cid)
-                self.cells[cid].selected = False
-            else:
-                self.selection_order.append(cid)
-                self.cells[cid].selected = True
-        else:
-            for old in self.selection_order:
-                self.cells[old].selected = False
-                self.cells[old].update()
-
-            self.selection_order = [cid]
-            self.cells[cid].selected = True
-
+    def _selection_changed(self):
         self._refresh_selection_label()
 
-        # copiar pro clipboard
-        clipboard = QApplication.clipboard()
-        clipboard.setText(
-            self.selection_order[0]
-            if len(self.selection_order) == 1
-            else str(self.selection_order)
-        )
-
-        self.update()
-
-    # -----------------------------------------
-    # Atualiza o painel de informações
-    # -----------------------------------------
-    def _refresh_selection_label(self):
-        if len(self.selection_order) == 0:
+    def _refresh_selection_label(self, preview=8):
+        count = len(self.selection)
+        if count == 0:
             self.label_info.setText("Nenhum LED selecionado")
-        elif len(self.selection_order) == 1:
-            self.label_info.setText(f"1 LED: {self.selection_order}")
-        else:
-            self.label_info.setText(
-                f"{len(self.selection_order)} LEDs: {self.selection_order}"
-            )
+            return
+        ids = self.selection_order
+        shown = ", ".join(ids[:preview])
+        if count > preview:
+            shown += f", … {ids[-1]}"
+        self.label_info.setText(f"{count} LED{'s' if count > 1 else ''}: {shown}")
 
     # -----------------------------------------
     # APIs futuras
@@ -216,7 +344,411 @@ class LEDMatrix(QWidget):
                 self.cells[cid].set_color(col)
 
     def apply_led_array(self, array_2d):
-        for r in range(self.rows):
-            for c in range(self.cols):
-                cid = f"{excel_column_name(c)}{r + 1}"
-                self.cells[cid].set_color(array_2d[r][c])
+        for r, row_cells in enumerate(self.cell_grid):
+            row = array_2d[r]
+            for c, cell in enumerate(row_cells):
+                cell.set_color(row[c])
+
+    def apply_frame(self, frame):
+        """Aplica um quadro RGB linha a linha (rows * cols * 3 bytes) direto do buffer"""
+        o = 0
+        for row_cells in self.cell_grid:
+            for cell in row_cells:
+                cell.set_rgb(frame[o], frame[o + 1], frame[o + 2])
+                o += 3
+
+
+# -----------------------------------------
+# Linear LED Preview — fita (ou grade) usada na aba de efeitos
+# -----------------------------------------
+class LinearLEDPreview(QWidget):
+    """
+    Preview dos LEDs a partir de um quadro RGB (3 bytes por LED).
+    Sem posições, desenha a fita em linha com os rótulos das letras;
+    com `set_led_grid_positions`, desenha cada LED na sua célula (x, y).
+
+    O quadro é lido sem cópia: cada buffer vira uma QImage Nx1 que aponta
+    para a mesma memória, e a pintura espalha os pixels com uma única
+    chamada `drawPixmapFragments`. Bordas e rótulos ficam numa camada
+    pré-desenhada, refeita só quando a geometria muda. Com a lista de LEDs
+    alterados (app/frame_diff.py), só as células deles são repintadas.
+
+    Nível de detalhe automático: com células grandes desenha LEDs
+    arredondados com borda; com células pequenas, quadrados simples; abaixo
+    de 1 pixel por LED, um único LED por pixel de tela. O hover usa um
+    índice espacial, então layouts com dezenas de milhares de LEDs
+    continuam leves.
+    """
+
+    LED_SIZE = 18
+    SPACING = 4
+    MARGIN = 8
+    LABEL_HEIGHT = 22
+    MIN_HEIGHT = 24
+    BACKGROUND = QColor(25, 25, 25)
+
+    # Limiares de nível de detalhe (pixels por célula)
+    DETAIL_MIN_CELL = 6.0
+    PIXEL_MIN_CELL = 1.0
+    # Acima disso (ou de metade da fita) um quadro alterado repinta o widget inteiro
+    PARTIAL_MAX_LEDS = 512
+
+    def __init__(self, total_leds, letter_mapping=None):
+        super().__init__()
+        self.total_leds = total_leds
+        self.letter_mapping = letter_mapping or {}
+        self.positions = None
+        self.cols = total_leds
+        self.rows = 1
+
+        self._compat_frame = bytearray(total_leds * 3)
+        self._images = {}  # id(buffer) -> (buffer, QImage sobre o buffer)
+        self._image = self._wrap(self._compat_frame)
+        self._pixmap = QPixmap(max(1, total_leds), 1)
+        self._fragments = []
+        self._led_fragments = {}  # índice do LED -> posição em _fragments
+        self._dirty = None  # fragmentos a repintar; None = widget inteiro
+        self._dirty_region = QRegion()
+        self._overlay = None
+        self._geometry_key = None
+        self.level_of_detail = "detail"
+        self._build_index()
+
+        self.setMouseTracking(True)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self._update_height()
+
+    def set_led_grid_positions(self, positions, cols, rows):
+        """Posiciona cada LED (índice -> (x, y)) numa grade cols x rows"""
+        self.positions = dict(positions)
+        self.cols = cols
+        self.rows = rows
+        self._geometry_key = None
+        self._build_index()
+        self._update_height()
+        self.update()
+
+    def update_frame(self, frame, changed=None):
+        """
+        Exibe um quadro RGB; o buffer é referenciado, não copiado.
+
+        `changed` lista os LEDs que mudaram desde o quadro anterior: só as
+        células deles são repintadas, e com a lista vazia nada é repintado.
+        None repinta tudo.
+        """
+        self._image = self._wrap(frame)
+        if changed is None or self._dirty is None or self._geometry_key != self._current_geometry_key():
+            self._mark_all_dirty()
+            return
+        if len(changed) > min(self.PARTIAL_MAX_LEDS, self.total_leds // 2):
+            self._mark_all_dirty()
+            return
+        region = QRegion()
+        reach = int(self._cell_size() / 2) + 1
+        for index in changed:
+            position = self._led_fragments.get(index)
+            if position is None:
+                continue
+            fragment = self._fragments[position]
+            half = fragment.scaleX / 2 + 1  # 1 px de folga para a borda antisserrilhada
+            rect = QRect(int(fragment.x - half), int(fragment.y - half), int(2 * half) + 1, int(2 * half) + 1)
+            region += rect
+            self._dirty.add(position)
+            # A área é apagada antes da pintura: vizinhos que a tocam também são redesenhados
+            for other in self.leds_in_rect(rect.adjusted(-reach, -reach, reach, reach)):
+                other_position = self._led_fragments.get(other)
+                if other_position is not None:
+                    self._dirty.add(other_position)
+        if not region.isEmpty():
+            self._dirty_region += region
+            self.update(region)
+
+    def _mark_all_dirty(self):
+        self._dirty = None
+        self.update()
+
+    def update_leds(self, colors):
+        """Compatibilidade: exibe uma lista de QColor"""
+        frame = self._compat_frame
+        for i, color in enumerate(colors[:self.total_leds]):
+            frame[i * 3] = color.red()
+            frame[i * 3 + 1] = color.green()
+            frame[i * 3 + 2] = color.blue()
+        self.update_frame(frame)
+
+    @property
+    def frame(self):
+        """Buffer RGB exibido atualmente"""
+        return self._images[self._image_key][0]
+
+    def _wrap(self, frame):
+        """QImage Nx1 que compartilha a memória do buffer (criada uma vez por buffer)"""
+        key = id(frame)
+        if key not in self._images:
+            image = QImage(frame, self.total_leds, 1, self.total_leds * 3, QImage.Format_RGB888)
+            self._images[key] = (frame, image)
+        self._image_key = key
+        return self._images[key][1]
+
+    # -----------------------------------------
+    # Geometria
+    # -----------------------------------------
+    def _led_cells(self):
+        """Itera (índice, x, y) das células de cada LED posicionado"""
+        if self.positions is None:
+            return ((index, index, 0) for index in range(self.total_leds))
+        return (
+            (index, x, y) for index, (x, y) in self.positions.items()
+            if 0 <= index < self.total_leds
+        )
+
+    def _build_index(self):
+        """Índice espacial com o centro de cada LED (em unidades de célula)"""
+        self.spatial_index = GridSpatialIndex(
+            {index: (x + 0.5, y + 0.5) for index, x, y in self._led_cells()}
+        )
+
+    def _labels_height(self):
+        return self.LABEL_HEIGHT if self.positions is None and self.letter_mapping else 0
+
+    def _update_height(self):
+        grid_height = self.rows * self._cell_size()
+        height = int(2 * self.MARGIN + grid_height) + self._labels_height()
+        self.setFixedHeight(max(self.MIN_HEIGHT, height))
+
+    def _cell_size(self):
+        """Tamanho (float) de cada célula ajustado à largura disponível"""
+        width = self.width() if self.width() > 1 else 900
+        available = max(1, width - 2 * self.MARGIN)
+        return min(float(self.LED_SIZE + self.SPACING), available / max(1, self.cols))
+
+    def _lod_for(self, cell):
+        if cell >= self.DETAIL_MIN_CELL:
+            return "detail"
+        if cell >= self.PIXEL_MIN_CELL:
+            return "block"
+        return "pixel"
+
+    def _led_rect(self, index, cell):
+        if self.positions is None:
+            x, y = index, 0
+        else:
+            x, y = self.positions.get(index, (None, None))
+            if x is None:
+                return None
+        size = max(2, int(cell - self.SPACING / 2))
+        return QRect(int(self.MARGIN + x * cell), int(self.MARGIN + y * cell), size, size)
+
+    def _led_at(self, pos):
+        """LED sob o cursor, resolvido pelo índice espacial"""
+        cell = self._cell_size()
+        lx = (pos.x() - self.MARGIN) / cell
+        ly = (pos.y() - self.MARGIN) / cell
+        # tolerância de meia célula ou 3 px de tela quando os LEDs ficam minúsculos
+        return self.spatial_index.nearest(lx, ly, max(0.5, 3.0 / cell))
+
+    def leds_in_rect(self, rect):
+        """Índices dos LEDs cujo centro está dentro de um retângulo (coordenadas do widget)"""
+        cell = self._cell_size()
+        return self.spatial_index.query_rect(
+            (rect.left() - self.MARGIN) / cell, (rect.top() - self.MARGIN) / cell,
+            (rect.right() - self.MARGIN) / cell, (rect.bottom() - self.MARGIN) / cell
+        )
+
+    def resizeEvent(self, event):
+        self._update_height()
+        super().resizeEvent(event)
+
+    def _current_geometry_key(self):
+        return (self.width(), self.height(), self.cols, self.rows, id(self.positions))
+
+    def _ensure_geometry(self):
+        """Recalcula fragmentos e camada de bordas quando tamanho/posições mudam"""
+        key = self._current_geometry_key()
+        if key == self._geometry_key:
+            return
+        self._geometry_key = key
+        self._dirty = None
+
+        cell = self._cell_size()
+        lod = self.level_of_detail = self._lod_for(cell)
+        self._fragments = []
+        self._led_fragments = {}
+        rects = []
+
+        if lod == "pixel":
+            # Mais LEDs que pixels: um LED representa cada pixel de tela
+            seen = set()
+            for index, x, y in self._led_cells():
+                px = int(self.MARGIN + (x + 0.5) * cell)
+                py = int(self.MARGIN + (y + 0.5) * cell)
+                if (px, py) in seen:
+                    continue
+                seen.add((px, py))
+                self._led_fragments[index] = len(self._fragments)
+                self._fragments.append(QPainter.PixmapFragment.create(
+                    QPointF(px + 0.5, py + 0.5), QRectF(index, 0, 1, 1), 1, 1
+                ))
+        else:
+            for index, x, y in self._led_cells():
+                if lod == "detail":
+                    rect = self._led_rect(index, cell)
+                    rects.append(rect)
+                    center, size = QPointF(rect.center()) + QPointF(0.5, 0.5), rect.width()
+                else:
+                    center = QPointF(self.MARGIN + (x + 0.5) * cell, self.MARGIN + (y + 0.5) * cell)
+                    size = cell
+                # pixel `index` da imagem Nx1 escalado para cobrir a célula do LED
+                self._led_fragments[index] = len(self._fragments)
+                self._fragments.append(QPainter.PixmapFragment.create(
+                    center, QRectF(index, 0, 1, 1), size, size
+                ))
+
+        overlay = QPixmap(self.size())
+        overlay.fill(Qt.transparent)  # garante canal alfa para as "janelas"
+        painter = QPainter(overlay)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        if lod == "detail":
+            painter.fillRect(overlay.rect(), self.BACKGROUND)
+
+            # Abre "janelas" transparentes onde a cor do LED aparece
+            painter.setCompositionMode(QPainter.CompositionMode_Clear)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QBrush(Qt.black))
+            for rect in rects:
+                if self.positions is None:
+                    painter.drawEllipse(rect)
+                else:
+                    painter.drawRoundedRect(rect, 3, 3)
+
+            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+            painter.setPen(QPen(Qt.black, 1))
+            painter.setBrush(Qt.NoBrush)
+            for rect in rects:
+                if self.positions is None:
+                    painter.drawEllipse(rect)
+                else:
+                    painter.drawRoundedRect(rect, 3, 3)
+
+        # Rótulos das letras (P:00-05) abaixo da fita
+        if self.positions is None and self.letter_mapping:
+            painter.setPen(QPen(QColor(200, 200, 200), 1))
+            top = int(self.MARGIN + max(cell, 1) + 4)
+            for letter, (start, end) in self.letter_mapping.items():
+                left = int(self.MARGIN + start * cell)
+                width = max(int(cell), int((end - start + 1) * cell))
+                label_rect = QRect(left, top, width, self.LABEL_HEIGHT - 4)
+                painter.drawRect(label_rect)
+                if width >= 40:
+                    painter.drawText(label_rect, Qt.AlignCenter, f"{letter}:{start:02d}-{end:02d}")
+
+        painter.end()
+        self._overlay = overlay
+
+    # -----------------------------------------
+    # Eventos
+    # -----------------------------------------
+    def mouseMoveEvent(self, event):
+        index = self._led_at(event.pos())
+        if index is None:
+            QToolTip.hideText()
+        else:
+            QToolTip.showText(event.globalPos(), f"LED {index:02d}", self)
+
+    def paintEvent(self, event):
+        self._ensure_geometry()
+        fragments = self._fragments
+        if self._dirty is not None and event.region().subtracted(self._dirty_region).isEmpty():
+            # Pedido só nosso (quadro com poucos LEDs alterados): desenha apenas esses fragmentos
+            fragments = [self._fragments[position] for position in self._dirty]
+        self._dirty = set()
+        self._dirty_region = QRegion()
+
+        painter = QPainter(self)
+        if self.level_of_detail != "detail":
+            painter.fillRect(event.rect(), self.BACKGROUND)
+        self._pixmap.convertFromImage(self._image)
+        if fragments:
+            painter.drawPixmapFragments(fragments, self._pixmap)
+        painter.drawPixmap(0, 0, self._overlay)
+
+
+# -----------------------------------------
+# Miniaturas dos presets nos seletores de mês
+# -----------------------------------------
+class PresetThumbnails(QObject):
+    """
+    Mostra a miniatura de cada preset (ThumbnailCache) como ícone dos itens
+    de um QComboBox. Miniaturas já em disco entram na hora; as que faltam
+    são desenhadas em uma ThumbnailWorker. Enquanto a lista do combo está
+    aberta, os ícones dos efeitos animados percorrem os quadros.
+    """
+
+    # (índice do item, caminho do PNG, quadros empilhados)
+    thumbnail_ready = pyqtSignal(int, str, int)
+
+    ANIMATION_MS = 150
+
+    def __init__(self, combo, layout, cache_dir=None):
+        super().__init__(combo)
+        self.combo = combo
+        self.cache = ThumbnailCache(layout, cache_dir)
+        self._frames = {}  # índice -> [QPixmap]
+        self._frame_index = 0
+        self._worker = None
+
+        combo.setIconSize(QSize(self.cache.width, self.cache.height))
+        combo.view().installEventFilter(self)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._animate)
+        self.thumbnail_ready.connect(self._on_ready)
+
+    def refresh(self, presets):
+        """Atualiza os ícones; `presets` na ordem dos itens do combo (None = sem miniatura)"""
+        self.stop_worker()
+        missing = []
+        for index, preset in enumerate(presets):
+            if not preset:
+                continue
+            path = self.cache.get(preset)
+            if path:
+                self._on_ready(index, path, self.cache.frame_count(preset))
+            else:
+                missing.append((index, dict(preset)))
+        if missing:
+            self._worker = ThumbnailWorker(self.cache, missing, self.thumbnail_ready.emit)
+            self._worker.start()
+
+    def stop_worker(self):
+        if self._worker is not None:
+            self._worker.stop()
+            self._worker = None
+
+    def stop(self):
+        self.timer.stop()
+        self.stop_worker()
+
+    def _on_ready(self, index, path, count):
+        pixmap = QPixmap(path)
+        if pixmap.isNull() or index >= self.combo.count():
+            return
+        height = pixmap.height() // max(1, count)
+        self._frames[index] = [pixmap.copy(0, k * height, pixmap.width(), height) for k in range(count)]
+        self.combo.setItemIcon(index, QIcon(self._frames[index][0]))
+
+    def _animate(self):
+        self._frame_index += 1
+        for index, frames in self._frames.items():
+            if len(frames) > 1:
+                self.combo.setItemIcon(index, QIcon(frames[self._frame_index % len(frames)]))
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Show:
+            self.timer.start(self.ANIMATION_MS)
+        elif event.type() == QEvent.Hide:
+            self.timer.stop()
+            self._frame_index = 0
+            for index, frames in self._frames.items():
+                self.combo.setItemIcon(index, QIcon(frames[0]))
+        return False
@@ -1,10 +1,12 @@
 from PyQt5.QtWidgets import (
-    QWidget, QApplication, QGridLayout
+    QWidget, QApplication, QGridLayout, QFileDialog, QShortcut
 )
-from PyQt5.QtGui import QColor, QPainter, QPen, QBrush
+from PyQt5.QtGui import QColor, QPainter, QPen, QBrush, QKeySequence
 from PyQt5.QtCore import Qt
 import sys
 
+from app.ui.widgets import CellSelectionMixin
+
 # ------------------------------------------------
 # Função para gerar nomes de colunas estilo Excel
 # ------------------------------------------------
@@ -60,7 +62,7 @@ class CellWidget(QWidget):
 # ------------------------------------------------
 # Widget da Matriz
 # ------------------------------------------------
-class GridMatrix(QWidget):
+class GridMatrix(CellSelectionMixin, QWidget):
     def __init__(self, rows=8, cols=53):
         super().__init__()
         self.setWindowTitle("PhoneAid LED Matrix Preview")
@@ -73,21 +75,31 @@ class GridMatrix(QWidget):
         self.setLayout(self.grid)
 
         self.cells = {}
-        self.selection_order = []  # <<< ORDEM REAL DA SELEÇÃO
+        self.cell_grid = []  # cell_grid[linha][coluna] -> CellWidget
+        # Seleção ordenada (O(1) por célula); `selection_order` dá os IDs na ordem real
+        self._init_selection(self)
 
         # cria células
-        for x in range(rows):
-            for y in range(cols):
-                col_name = excel_column_name(y)
-                cell_id = f"{col_name}{x+1}"
+        for r in range(rows):
+            row_cells = []
+            for c in range(cols):
+                col_name = excel_column_name(c)
+                cell_id = f"{col_name}{r+1}"
 
                 cell = CellWidget(cell_id)
+                cell.grid_pos = (c, r)
                 self.cells[cell_id] = cell
+                row_cells.append(cell)
 
-                cell.mousePressEvent = lambda e, cid=cell_id: self.on_click(e, cid)
+                # clique, retângulo (arraste), laço (Alt) e intervalo (Shift)
+                self._connect_cell(cell)
                 cell.enterEvent = lambda e, cid=cell_id, c=cell: self.on_hover(e, cid, c)
 
-                self.grid.addWidget(cell, x, y)
+                self.grid.addWidget(cell, r, c)
+            self.cell_grid.append(row_cells)
+
+        # Ctrl+S grava a seleção como arquivo de layout (app/layout.py)
+        QShortcut(QKeySequence.Save, self, activated=self.save_layout)
 
     # ----------------------------------------
     # Hover → exibir ID no título da janela
@@ -98,40 +110,15 @@ class GridMatrix(QWidget):
         self.setWindowTitle(f"Cell: {cell_id}")
 
     # ----------------------------------------
-    # Clique → seleciona / multi-seleciona
+    # Ctrl+S → exporta a seleção como layout JSON
     # ----------------------------------------
-    def on_click(self, event, cell_id):
-        ctrl = event.modifiers() & Qt.ControlModifier
-
-        if ctrl:
-            # toggle
-            if cell_id in self.selection_order:
-                self.selection_order.remove(cell_id)
-                self.cells[cell_id].selected = False
-            else:
-                self.selection_order.append(cell_id)
-                self.cells[cell_id].selected = True
-
-        else:
-            # clique simples: limpa tudo e deixa só 1
-            for cid in self.selection_order:
-                self.cells[cid].selected = False
-
-            self.selection_order = [cell_id]
-            self.cells[cell_id].selected = True
-
-        # atualizar estilos
-        for cid in self.cells:
-            self.cells[cid].update()
-
-        # copiar na ordem EXATA
-        clipboard = QApplication.clipboard()
-        if len(self.selection_order) == 1:
-            clipboard.setText(self.selection_order[0])
-        else:
-            clipboard.setText(str(self.selection_order))
-
-        self.update()
+    def save_layout(self):
+        if not len(self.selection):
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Salvar layout", "layout.json", "Layout JSON (*.json)")
+        if path:
+            count = self.export_layout(path)
+            self.setWindowTitle(f"Layout salvo: {count} LEDs em {path}")
 
 # ------------------------------------------------
 # LAUNCHER
@@ -0,0 +1,81 @@
+// FastLED.h - substituto mínimo do FastLED/Arduino para o benchmark no simulador AVR
+//
+// Só o necessário para compilar o sketch gerado fora do Arduino IDE:
+// CRGB, fill_solid, FastLED.addLeds/show (sem saída real), Serial sem dados,
+// as primitivas de 8 bits (sin8, random8, qadd8...) e millis() controlado pelo
+// benchmark (bench_millis).
+#pragma once
+#include <stdint.h>
+#include <string.h>
+#include <stdlib.h>
+#include <avr/io.h>
+#include <avr/pgmspace.h>
+
+struct CRGB {
+    uint8_t r, g, b;
+    CRGB() {}
+    CRGB(uint8_t r_, uint8_t g_, uint8_t b_) : r(r_), g(g_), b(b_) {}
+    static const CRGB Black;
+};
+const CRGB CRGB::Black(0, 0, 0);
+
+inline void fill_solid(CRGB* leds, int count, const CRGB& color) {
+    for (int i = 0; i < count; i++) leds[i] = color;
+}
+
+enum { WS2812B, NEOPIXEL, GRB, RGB };
+
+// show() não gera o sinal WS2812: o custo dele é estimado à parte pelo benchmark
+struct BenchFastLED {
+    template <int CHIPSET, int PIN, int ORDER>
+    void addLeds(CRGB*, int, int = 0) {}
+    void setBrightness(uint8_t) {}
+    void show() {}
+} FastLED;
+
+struct BenchSerial {
+    void begin(long) {}
+    int available() { return 0; }
+    int peek() { return -1; }
+    int read() { return -1; }
+    long parseInt() { return 0; }
+    void setTimeout(long) {}
+    size_t write(uint8_t) { return 1; }
+    size_t write(const uint8_t*, size_t n) { return n; }
+    size_t readBytes(uint8_t*, size_t) { return 0; }
+    size_t readBytes(char*, size_t) { return 0; }
+} Serial;
+
+// Primitivas de 8 bits do FastLED 3.x usadas pelos efeitos (mesma implementação em C)
+uint16_t rand16seed = 1337;
+inline void random16_set_seed(uint16_t seed) { rand16seed = seed; }
+inline uint16_t random16() { rand16seed = (uint16_t)(rand16seed * 2053 + 13849); return rand16seed; }
+inline uint16_t random16(uint16_t lim) { return (uint16_t)(((uint32_t)random16() * lim) >> 16); }
+inline uint8_t random8() {
+    random16();
+    return (uint8_t)((uint8_t)(rand16seed & 0xFF) + (uint8_t)(rand16seed >> 8));
+}
+inline uint8_t random8(uint8_t lim) { return (uint8_t)((random8() * lim) >> 8); }
+inline uint8_t random8(uint8_t min, uint8_t lim) { return random8((uint8_t)(lim - min)) + min; }
+inline uint8_t qadd8(uint8_t a, uint8_t b) { int t = a + b; return t > 255 ? 255 : t; }
+inline uint8_t qsub8(uint8_t a, uint8_t b) { int t = a - b; return t < 0 ? 0 : t; }
+const uint8_t b_m16_interleave[] = { 0, 49, 49, 41, 90, 27, 117, 10 };
+inline uint8_t sin8(uint8_t theta) {
+    uint8_t offset = theta;
+    if (theta & 0x40) offset = (uint8_t)255 - offset;
+    offset &= 0x3F;
+    uint8_t secoffset = offset & 0x0F;
+    if (theta & 0x40) ++secoffset;
+    uint8_t section = offset >> 4;
+    uint8_t b = b_m16_interleave[section * 2];
+    uint8_t m16 = b_m16_interleave[section * 2 + 1];
+    uint8_t mx = (m16 * secoffset) >> 4;
+    int8_t y = mx + b;
+    if (theta & 0x80) y = -y;
+    y += 128;
+    return y;
+}
+
+volatile uint32_t bench_millis = 0;
+inline uint32_t millis() { return bench_millis; }
+inline uint32_t micros() { return bench_millis * 1000UL; }
@@ -0,0 +1,339 @@
+"""
+bench_firmware.py - Mede ciclos do firmware gerado em um ATmega328P simulado
+
+Para cada tipo de efeito e quantidade de LEDs:
+1. gera o sketch com FirmwareGenerator;
+2. acrescenta um main() de benchmark que conta ciclos com o Timer1 (sem
+   prescaler, 1 tick = 1 ciclo) em volta de apply_effect() e de loop();
+3. compila com avr-gcc usando o substituto do FastLED em tools/avr_shim;
+4. roda no simavr e lê os resultados impressos pela UART.
+
+O FastLED.show() do substituto não gera o sinal WS2812; o custo dele é
+estimado (24 bits x 1,25 us por LED e porta) e somado ao custo por quadro.
+
+Com 92 LEDs, efeitos com orçamento em app/effect_kernels.py (COST_BUDGETS)
+são conferidos: o pior apply_effect() precisa manter o FPS mínimo declarado;
+se algum estourar, o script termina com código 1.
+
+Uso:
+    python -m tools.bench_firmware --leds 46,92,150,300 --output firmware_bench.json
+
+Requer avr-gcc, avr-size e simavr no PATH; sem eles o script avisa e sai.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from app.batch_builder import generator_version
+from app.effect_kernels import BUDGET_LEDS, COST_BUDGETS, apply_budget_us
+from app.effect_renderer import EFFECT_TYPES
+from app.firmware_generator import FirmwareGenerator
+from app.timeline import default_keyframes, segment_starts
+
+MCU = "atmega328p"
+F_CPU = 16000000
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "avr_shim")
+TOOLS = ("avr-gcc", "avr-size", "simavr")
+
+# Ciclos para enviar um bit WS2812 (1,25 us a 16 MHz)
+WS2812_CYCLES_PER_BIT = 20
+
+BENCH_PRESET = {
+    "color1": "#FF4000",
+    "color2": "#0020FF",
+    "velocidade": "Turbo",
+    "ativo": True,
+}
+
+# Função sem corpo na mesma linha de abertura, no estilo do código gerado
+_FUNCTION_DEF = re.compile(
+    r"^((?:static\s+)?(?:inline\s+)?[A-Za-z_][\w<>\*&\s]*?\s+\**[A-Za-z_]\w*\s*\([^;{)]*\))\s*\{", re.M
+)
+_RESULT_LINE = re.compile(r"BENCH (\w+) (\d+) (\d+) (\d+) (\d+)")
+_ANSI = re.compile(r"\x1b\[[0-9;]*m")
+
+BENCH_MAIN = '''
+// ===== Benchmark (acrescentado por tools/bench_firmware.py) =====
+#include <avr/interrupt.h>
+#include <avr/sleep.h>
+
+#define BENCH_FRAMES {frames}
+
+volatile uint16_t bench_overflows = 0;
+ISR(TIMER1_OVF_vect) {{ bench_overflows++; }}
+
+static uint32_t bench_cycles() {{
+    uint8_t sreg = SREG;
+    cli();
+    uint16_t low = TCNT1;
+    uint16_t high = bench_overflows;
+    if ((TIFR1 & _BV(TOV1)) && low < 0x8000) high++;  // estouro ainda não atendido
+    SREG = sreg;
+    return ((uint32_t)high << 16) | low;
+}}
+
+static void bench_putc(char c) {{
+    while (!(UCSR0A & _BV(UDRE0))) {{}}
+    UDR0 = c;
+}}
+
+static void bench_print(const char* text) {{
+    while (*text) bench_putc(*text++);
+}}
+
+static void bench_print_u32(uint32_t value) {{
+    char digits[11];
+    ultoa(value, digits, 10);
+    bench_print(digits);
+}}
+
+struct BenchStats {{
+    uint32_t min, max, total, count;
+}};
+
+static void bench_add(BenchStats& stats, uint32_t cycles) {{
+    if (stats.count == 0 || cycles < stats.min) stats.min = cycles;
+    if (cycles > stats.max) stats.max = cycles;
+    stats.total += cycles;
+    stats.count++;
+}}
+
+static void bench_report(const char* name, const BenchStats& stats) {{
+    bench_print("BENCH ");
+    bench_print(name);
+    bench_putc(' ');
+    bench_print_u32(stats.min);
+    bench_putc(' ');
+    bench_print_u32(stats.max);
+    bench_putc(' ');
+    bench_print_u32(stats.total);
+    bench_putc(' ');
+    bench_print_u32(stats.count);
+    bench_putc('\\n');
+}}
+
+static void bench_next_frame() {{
+    // Efeitos estáticos só redesenham quando pedido; animados quando o período passa
+    needs_render = true;
+    bench_millis += active_effect.speed_ms;
+}}
+
+int main() {{
+    UCSR0A = _BV(U2X0);
+    UBRR0 = 16;  // 115200 baud a 16 MHz
+    UCSR0B = _BV(TXEN0);
+    TCCR1A = 0;
+    TCCR1B = _BV(CS10);  // Timer1 sem prescaler: 1 tick = 1 ciclo
+    TIMSK1 = _BV(TOIE1);
+    sei();
+
+    setup();
+
+    uint32_t start = bench_cycles();
+    uint32_t overhead = bench_cycles() - start;
+
+    BenchStats apply = {{0, 0, 0, 0}};
+    for (uint16_t i = 0; i < BENCH_FRAMES; i++) {{
+        bench_next_frame();
+        start = bench_cycles();
+        apply_effect(active_effect);
+        bench_add(apply, bench_cycles() - start - overhead);
+    }}
+
+    BenchStats frame = {{0, 0, 0, 0}};
+    for (uint16_t i = 0; i < BENCH_FRAMES; i++) {{
+        bench_next_frame();
+        start = bench_cycles();
+        loop();
+        bench_add(frame, bench_cycles() - start - overhead);
+    }}
+
+    bench_report("apply_effect", apply);
+    bench_report("loop", frame);
+    bench_print("BENCH_DONE\\n");
+    while (!(UCSR0A & _BV(TXC0))) {{}}
+
+    // simavr encerra ao dormir com interrupções desligadas
+    cli();
+    set_sleep_mode(SLEEP_MODE_PWR_DOWN);
+    sleep_enable();
+    sleep_cpu();
+    return 0;
+}}
+'''
+
+
+def missing_tools():
+    return [tool for tool in TOOLS if shutil.which(tool) is None]
+
+
+def add_prototypes(source):
+    """Declara as funções do sketch antes do primeiro corpo (o Arduino IDE faz isso sozinho)"""
+    prototypes = [
+        match.group(1) + ";" for match in _FUNCTION_DEF.finditer(source)
+        if match.group(1).split("(")[0].split()[-1] not in ("if", "while", "for", "switch")
+    ]
+    first = _FUNCTION_DEF.search(source)
+    if not first:
+        return source
+    return source[:first.start()] + "\n".join(prototypes) + "\n" + source[first.start():]
+
+
+def bench_source(effect_type, total_leds, data_pins, frames):
+    """Sketch gerado + main() de benchmark, pronto para o avr-gcc"""
+    preset = dict(BENCH_PRESET, tipo=effect_type, wave_width=max(1, total_leds // 4))
+    if effect_type == "Linha do tempo":
+        # 8 segmentos com interpolação suave: o caso mais caro por quadro
+        preset["segmentos"] = segment_starts(total_leds, count=8)
+        preset["keyframes"] = default_keyframes(8, BENCH_PRESET["color1"], BENCH_PRESET["color2"])
+    config = {"total_leds": total_leds, "data_pins": data_pins}
+    sketch = FirmwareGenerator(total_leds, config).generate_firmware([preset])
+    return add_prototypes(sketch) + BENCH_MAIN.format(frames=frames)
+
+
+def _elf_sizes(elf_path):
+    output = subprocess.run(["avr-size", "-A", elf_path], capture_output=True, text=True).stdout
+    sections = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith(".") and parts[1].isdigit():
+            sections[parts[0]] = int(parts[1])
+    return {
+        "flash_bytes": sections.get(".text", 0) + sections.get(".data", 0),
+        "sram_bytes": sections.get(".data", 0) + sections.get(".bss", 0),
+    }
+
+
+def run_case(effect_type, total_leds, data_pins, frames, workdir, timeout):
+    """Compila e simula um caso; retorna o dict de resultados"""
+    name = f"{EFFECT_TYPES.index(effect_type)}_{total_leds}"
+    cpp_path = os.path.join(workdir, f"bench_{name}.cpp")
+    elf_path = os.path.join(workdir, f"bench_{name}.elf")
+    with open(cpp_path, "w", encoding="utf-8") as f:
+        f.write(bench_source(effect_type, total_leds, data_pins, frames))
+
+    compiled = subprocess.run(
+        ["avr-gcc", f"-mmcu={MCU}", f"-DF_CPU={F_CPU}UL", "-Os", "-std=gnu++11",
+         "-fno-exceptions", "-fno-threadsafe-statics", "-ffunction-sections",
+         "-fdata-sections", "-Wl,--gc-sections", f"-I{SHIM_DIR}", "-x", "c++",
+         cpp_path, "-o", elf_path],
+        capture_output=True, text=True
+    )
+    result = {"effect": effect_type, "leds": total_leds, "ports": len(data_pins)}
+    if compiled.returncode != 0:
+        result["error"] = compiled.stderr.strip()[-2000:]
+        return result
+    result.update(_elf_sizes(elf_path))
+
+    try:
+        simulated = subprocess.run(
+            ["simavr", "-m", MCU, "-f", str(F_CPU), elf_path],
+            capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        result["error"] = f"simavr não terminou em {timeout}s"
+        return result
+
+    output = _ANSI.sub("", simulated.stdout + simulated.stderr)
+    if "BENCH_DONE" not in output:
+        result["error"] = "simulação terminou sem resultados: " + output.strip()[-500:]
+        return result
+
+    for metric, low, high, total, count in _RESULT_LINE.findall(output):
+        count = int(count) or 1
+        result[metric] = {
+            "min_cycles": int(low),
+            "max_cycles": int(high),
+            "mean_cycles": int(total) // count,
+            "samples": count,
+        }
+    show_cycles = total_leds * len(data_pins) * 24 * WS2812_CYCLES_PER_BIT
+    result["show_estimate_cycles"] = show_cycles
+    if "loop" in result:
+        frame_cycles = result["loop"]["mean_cycles"] + show_cycles
+        result["frame_cycles"] = frame_cycles
+        result["frame_us"] = round(frame_cycles * 1e6 / F_CPU, 1)
+        result["max_fps"] = round(F_CPU / frame_cycles, 1) if frame_cycles else None
+
+    # Orçamento do efeito (app/effect_kernels.py): vale para BUDGET_LEDS LEDs em uma porta
+    budget_us = apply_budget_us(effect_type) if total_leds == BUDGET_LEDS else None
+    if budget_us is not None and "apply_effect" in result:
+        apply_us = result["apply_effect"]["max_cycles"] * 1e6 / F_CPU
+        result["budget"] = {
+            "min_fps": COST_BUDGETS[effect_type]["min_fps"],
+            "max_apply_us": round(budget_us, 1),
+            "apply_us": round(apply_us, 1),
+            "ok": apply_us <= budget_us,
+        }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ciclos do firmware gerado (simavr)")
+    parser.add_argument("--leds", default=f"46,{BUDGET_LEDS},150,300", help="quantidades de LEDs (%(default)s)")
+    parser.add_argument("--effects", default=",".join(EFFECT_TYPES), help="tipos de efeito")
+    parser.add_argument("--pins", default="6", help="pinos de dados (%(default)s)")
+    parser.add_argument("--frames", type=int, default=20, help="quadros medidos por caso")
+    parser.add_argument("--timeout", type=int, default=120, help="limite por simulação (s)")
+    parser.add_argument("--output", default="firmware_bench.json", help="relatório JSON")
+    parser.add_argument("--keep", help="pasta onde manter .cpp/.elf gerados")
+    args = parser.parse_args(argv)
+
+    missing = missing_tools()
+    if missing:
+        print(f"Ferramentas ausentes: {', '.join(missing)}. Instale avr-gcc/avr-libc e simavr "
+              "(ex.: apt install gcc-avr avr-libc simavr) para rodar o benchmark.")
+        return 2
+
+    effects = [e.strip() for e in args.effects.split(",") if e.strip()]
+    unknown = [e for e in effects if e not in EFFECT_TYPES]
+    if unknown:
+        print(f"Efeito(s) desconhecido(s): {', '.join(unknown)}")
+        return 1
+    led_counts = [int(n) for n in args.leds.split(",")]
+    pins = [int(p) for p in args.pins.split(",")]
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="bench_firmware_")
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        for effect in effects:
+            for total_leds in led_counts:
+                result = run_case(effect, total_leds, pins, args.frames, workdir, args.timeout)
+                results.append(result)
+                if "error" in result:
+                    print(f"{effect:12} {total_leds:5} LEDs: erro — {result['error'].splitlines()[-1]}")
+                else:
+                    print(f"{effect:12} {total_leds:5} LEDs: apply_effect "
+                          f"{result['apply_effect']['mean_cycles']:>9} ciclos, quadro "
+                          f"{result['frame_us']:>9} us, flash {result['flash_bytes']} B")
+                    if "budget" in result:
+                        budget = result["budget"]
+                        print(f"{'':18} orçamento ≥ {budget['min_fps']} FPS: {budget['apply_us']} us de "
+                              f"{budget['max_apply_us']} us — {'OK' if budget['ok'] else 'ESTOUROU'}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "mcu": MCU,
+        "f_cpu": F_CPU,
+        "generator_version": generator_version(),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Relatório: {args.output}")
+    over_budget = any(not r.get("budget", {}).get("ok", True) for r in results)
+    return 1 if over_budget or any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
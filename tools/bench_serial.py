@@ -0,0 +1,130 @@
+"""
+bench_serial.py - Benchmark de vazão e latência do código serial do host
+
+Roda contra o Arduino virtual (tools/virtual_arduino.py), sem placa:
+
+- probe_port: tempo para sondar a porta;
+- sync_clock: tempo até o comando "T" ser interpretado (inclui o reset ao abrir);
+- comandos de efeito: vazão e latência (envio -> processado pelo "firmware")
+  com a porta aberta, além de bytes perdidos e timeouts do parseInt.
+
+Uso:
+    python -m tools.bench_serial --baud 9600 --latency 0.002 --drop 0.0 --commands 200
+"""
+import argparse
+import json
+import sys
+import time
+
+from app.serial_utils import close_serial_port, open_serial_port, probe_port, sync_clock
+from tools.virtual_arduino import VirtualArduino
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _latency_summary(latencies_ms):
+    return {
+        "p50_ms": percentile(latencies_ms, 0.50),
+        "p95_ms": percentile(latencies_ms, 0.95),
+        "max_ms": max(latencies_ms) if latencies_ms else None,
+    }
+
+
+def bench_probe(device, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        ok = probe_port(device.port, timeout=0.05)
+        timings.append((time.perf_counter() - start) * 1000)
+        if not ok:
+            return {"ok": False}
+    return {"ok": True, **_latency_summary(timings)}
+
+
+def bench_sync_clock(device):
+    before = len(device.events_of("clock"))
+    start = time.perf_counter()
+    sent = sync_clock(device.port, boot_delay=device.reset_delay + 0.05)
+    delivered = device.wait_for("clock", before + 1, timeout=device.reset_delay + 3)
+    return {
+        "sent": sent,
+        "delivered": delivered,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def bench_commands(device, count, num_effects):
+    ser = open_serial_port(device.port)
+    if ser is None:
+        return {"ok": False}
+    try:
+        time.sleep(device.reset_delay + 0.05)  # espera o boot causado pela abertura
+        before = len(device.events_of("select"))
+        sent_at = []
+        start = time.perf_counter()
+        for i in range(count):
+            sent_at.append(time.monotonic())
+            ser.write(f"{1 + i % (num_effects - 1)}\n".encode("ascii"))
+        ser.flush()
+        write_s = time.perf_counter() - start
+        # o último "\n" só vira select(0) depois do timeout de 1 s do parseInt
+        device.wait_for("select", before + count, timeout=count * 12.0 / device.baudrate + 3)
+        elapsed = time.perf_counter() - start
+    finally:
+        close_serial_port(ser)
+
+    selects = device.events_of("select")[before:]
+    delivered = [event for event in selects if event[2] != 0]
+    latencies = [
+        (event[0] - sent) * 1000 for event, sent in zip(delivered, sent_at)
+    ]
+    return {
+        "ok": True,
+        "sent": count,
+        "delivered": len(delivered),
+        "write_ms": round(write_s * 1000, 1),
+        "commands_per_s": round(len(delivered) / elapsed, 1) if elapsed else None,
+        "spurious_select_0": sum(1 for event in selects if event[2] == 0),
+        **_latency_summary(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark serial contra o Arduino virtual")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência do firmware (s)")
+    parser.add_argument("--drop", type=float, default=0.0, help="probabilidade de perder cada byte")
+    parser.add_argument("--reset-delay", type=float, default=1.5)
+    parser.add_argument("--commands", type=int, default=200)
+    parser.add_argument("--effects", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args(argv)
+
+    with VirtualArduino(num_effects=args.effects, reset_delay=args.reset_delay,
+                        latency=args.latency, drop_rate=args.drop, baudrate=args.baud,
+                        seed=args.seed) as device:
+        report = {
+            "scenario": {"baud": args.baud, "latency_s": args.latency, "drop_rate": args.drop,
+                         "reset_delay_s": args.reset_delay},
+            "probe_port": bench_probe(device, 10),
+            "sync_clock": bench_sync_clock(device),
+            "commands": bench_commands(device, args.commands, args.effects),
+        }
+        report["device"] = dict(device.stats)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
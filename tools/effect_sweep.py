@@ -0,0 +1,233 @@
+"""
+effect_sweep.py - Varredura de parâmetros dos efeitos em uma folha de contato
+
+Para cada combinação dos valores pedidos (produto cartesiano), renderiza um
+trecho curto do efeito com o EffectRenderer, sem interface, em um pool de
+processos. Cada trecho vira um quadro da folha de contato: uma linha de
+pixels por instante (de cima para baixo) e uma coluna por LED, então dá para
+ver a onda andando, a velocidade e as faíscas numa imagem só.
+
+Os trechos ficam memorizados em disco (um arquivo por combinação, pelo hash
+dos parâmetros e das fontes do renderizador): ampliar a varredura só
+renderiza as combinações novas.
+
+Valores de cada parâmetro (--param, repetível):
+    wave_width=4:40:4              intervalo início:fim:passo (fim incluído)
+    velocidade=Lento,Médio,Turbo   lista separada por vírgula
+    cores=#FF0000/#0000FF,#00FF00/#000000   pares color1/color2
+
+Uso:
+    python -m tools.effect_sweep --tipo Onda -p wave_width=4:40:4 -p velocidade=Lento,Rápido
+    python -m tools.effect_sweep --tipo Fogo -p densidade=32:224:64 -p semente=1,2,3 --leds 60
+
+Gera <saída>.png (folha de contato) e <saída>.json (parâmetros de cada quadro,
+em ordem de leitura).
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from app.effect_renderer import EFFECT_TYPES, EffectRenderer
+from app.image_io import write_png
+from app.presets_manager import PresetsManager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, "build", "effect_sweep", "sweep")
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, "build", "effect_sweep", "cache")
+
+# Fontes cujo conteúdo define os quadros (entram na chave da memória)
+RENDERER_SOURCES = ("effect_renderer.py", "effect_kernels.py", "timeline.py", "native_preview.py",
+                    "firmware_fragments.py")
+SWEEP_VERSION = 1
+
+PADDING = 2
+BACKGROUND = b"\x10\x10\x10"
+INT_PARAMS = ("wave_width", "densidade", "semente")
+
+
+def renderer_version():
+    """Hash curto das fontes do renderizador; muda quando os quadros podem mudar"""
+    digest = hashlib.sha256()
+    base = os.path.join(ROOT_DIR, "app")
+    for name in RENDERER_SOURCES:
+        with open(os.path.join(base, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def parse_values(name, text):
+    """Valores de um parâmetro: "a:b:passo" (inteiros, fim incluído) ou lista por vírgula"""
+    if name == "cores":
+        pairs = []
+        for item in text.split(","):
+            color1, _, color2 = item.strip().partition("/")
+            pairs.append((color1, color2 or color1))
+        return pairs
+    if ":" in text and name in INT_PARAMS:
+        parts = [int(p) for p in text.split(":")]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        if step <= 0:
+            raise ValueError(f"Passo inválido em {name}={text}")
+        return list(range(start, stop + 1, step))
+    values = [v.strip() for v in text.split(",") if v.strip()]
+    return [int(v) for v in values] if name in INT_PARAMS else values
+
+
+def expand(base, grid):
+    """Presets de todas as combinações de `grid` (nome -> valores) sobre `base`"""
+    names = list(grid)
+    combos = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        preset = dict(base)
+        label = {}
+        for name, value in zip(names, values):
+            if name == "cores":
+                preset["color1"], preset["color2"] = value
+                label[name] = f"{value[0]}/{value[1]}"
+            else:
+                preset[name] = value
+                label[name] = value
+        combos.append((preset, label))
+    return combos
+
+
+def clip_key(preset, leds, duration_ms, row_ms, version):
+    text = json.dumps([SWEEP_VERSION, version, preset, leds, duration_ms, row_ms],
+                      sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def render_clip(preset, leds, duration_ms, row_ms, use_native=False):
+    """Trecho do efeito: uma linha RGB (leds x 3 bytes) a cada `row_ms`, no tempo do efeito"""
+    renderer = EffectRenderer(leds, use_native=use_native)
+    renderer.set_params(preset)
+    renderer.reset()
+    frame = bytearray(renderer.frame_size())
+    renderer.render_into(frame)
+    shown_until = renderer.speed_ms  # o quadro em `frame` vale até este instante
+    rows = []
+    for t in range(0, duration_ms, row_ms):
+        while t >= shown_until:
+            renderer.render_into(frame)
+            shown_until += renderer.speed_ms
+        rows.append(bytes(frame))
+    return b"".join(rows)
+
+
+def _render_job(job):
+    """Processo do pool: renderiza e grava um trecho na memória; retorna o caminho"""
+    clip = render_clip(job["preset"], job["leds"], job["duration_ms"], job["row_ms"], job["native"])
+    tmp_path = f"{job['path']}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(clip)
+    os.replace(tmp_path, job["path"])
+    return job["path"]
+
+
+def run_sweep(base, grid, leds=92, duration_ms=3000, row_ms=50, cache_dir=None,
+              max_workers=None, use_native=False, progress=None):
+    """Renderiza (ou reaproveita) todos os trechos da varredura.
+
+    Retorna {"cells": [{"params", "path"}], "rendered", "cached", "rows"}.
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    version = renderer_version()
+    cells, pending = [], []
+    for preset, label in expand(base, grid):
+        path = os.path.join(cache_dir, clip_key(preset, leds, duration_ms, row_ms, version) + ".rgb")
+        cells.append({"params": label, "path": path})
+        if not os.path.exists(path):
+            pending.append({"preset": preset, "leds": leds, "duration_ms": duration_ms,
+                            "row_ms": row_ms, "native": use_native, "path": path})
+
+    done = len(cells) - len(pending)
+    if progress:
+        progress(done, len(cells))
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for _ in pool.map(_render_job, pending, chunksize=max(1, len(pending) // 64)):
+                done += 1
+                if progress:
+                    progress(done, len(cells))
+    return {"cells": cells, "rendered": len(pending), "cached": len(cells) - len(pending),
+            "rows": len(range(0, duration_ms, row_ms))}
+
+
+def contact_sheet(cells, leds, rows, columns=None):
+    """Monta a folha de contato; retorna (largura, altura, RGB, colunas)"""
+    columns = columns or max(1, math.ceil(math.sqrt(len(cells))))
+    grid_rows = max(1, math.ceil(len(cells) / columns))
+    tile_w, tile_h = leds + PADDING, rows + PADDING
+    width = columns * tile_w + PADDING
+    height = grid_rows * tile_h + PADDING
+    sheet = bytearray(BACKGROUND * (width * height))
+    stride = leds * 3
+    for k, cell in enumerate(cells):
+        with open(cell["path"], "rb") as f:
+            clip = f.read()
+        x0 = PADDING + (k % columns) * tile_w
+        y0 = PADDING + (k // columns) * tile_h
+        for r in range(rows):
+            offset = ((y0 + r) * width + x0) * 3
+            sheet[offset:offset + stride] = clip[r * stride:(r + 1) * stride]
+    return width, height, bytes(sheet), columns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de parâmetros de um efeito em folha de contato")
+    parser.add_argument("--tipo", default="Onda", help="tipo de efeito (%(default)s)")
+    parser.add_argument("-p", "--param", action="append", default=[],
+                        help="nome=valores (ex.: wave_width=4:40:4, velocidade=Lento,Turbo, cores=#F00000/#0000FF)")
+    parser.add_argument("--mes", type=int, help="usa o preset salvo deste mês como base")
+    parser.add_argument("--leds", type=int, default=92, help="LEDs da fita (%(default)s)")
+    parser.add_argument("--duration", type=int, default=3000, help="duração de cada trecho em ms (%(default)s)")
+    parser.add_argument("--row-ms", type=int, default=50, help="ms por linha da folha (%(default)s)")
+    parser.add_argument("--columns", type=int, help="quadros por linha da folha")
+    parser.add_argument("--jobs", type=int, default=None, help="processos em paralelo")
+    parser.add_argument("--native", action="store_true", help="usa o código do firmware compilado para o host")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR, help="pasta da memória de trechos")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="prefixo da saída (.png e .json)")
+    args = parser.parse_args(argv)
+
+    if args.tipo not in EFFECT_TYPES:
+        print(f"Efeito desconhecido: {args.tipo} (opções: {', '.join(EFFECT_TYPES)})")
+        return 1
+    if args.leds < 1 or args.row_ms < 1 or args.duration < args.row_ms:
+        print("Erro: --leds, --row-ms e --duration precisam ser positivos (duração >= row-ms)")
+        return 1
+    base = dict(PresetsManager().get_preset(args.mes) or {}) if args.mes else {}
+    base["tipo"] = args.tipo
+    try:
+        grid = {}
+        for item in args.param:
+            name, _, text = item.partition("=")
+            grid[name.strip()] = parse_values(name.strip(), text)
+    except ValueError as e:
+        print(f"Erro: {e}")
+        return 1
+
+    def progress(done, total):
+        print(f"\r{done}/{total} trechos", end="", flush=True)
+
+    result = run_sweep(base, grid, args.leds, args.duration, args.row_ms, args.cache,
+                       args.jobs, args.native, progress)
+    print()
+    width, height, rgb, columns = contact_sheet(result["cells"], args.leds, result["rows"], args.columns)
+    png_path = write_png(args.output + ".png", width, height, rgb)
+    with open(args.output + ".json", "w", encoding="utf-8") as f:
+        json.dump({"tipo": args.tipo, "leds": args.leds, "duration_ms": args.duration, "row_ms": args.row_ms,
+                   "columns": columns, "cells": [cell["params"] for cell in result["cells"]]},
+                  f, indent=2, ensure_ascii=False)
+    print(f"{result['rendered']} renderizado(s), {result['cached']} da memória -> {png_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
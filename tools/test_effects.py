@@ -1,42 +1,96 @@
-from PyQt5.QtWidgets import QApplication
 from app.config_manager import load_config
-from app.ui.effects_tab import EffectsTab
+from app.effect_renderer import EffectRenderer
 import sys
 
-app = QApplication([])
 cfg = load_config()
-win = EffectsTab()
-# Apply config mapping and total
-win.total_leds = cfg.get('total_leds', win.total_leds)
-win.letter_mapping = {k.upper(): v for k, v in cfg.get('letters', {}).items()}
-
-print('LETTER_KEYS:', list(win.letter_mapping.keys()))
-print('TOTAL_LEDS:', win.total_leds)
-print('LAST_LED_INDEX:', win.total_leds - 1)
-
-# Ensure effect dropdown set to Onda
-idx = win.effect_dropdown.findText('Onda')
-if idx >= 0:
-    win.effect_dropdown.setCurrentIndex(idx)
-else:
-    win.effect_dropdown.setCurrentIndex(2)
+total_leds = cfg.get('total_leds', 46)
+letter_mapping = {k.upper(): v for k, v in cfg.get('letters', {}).items()}
+
+print('LETTER_KEYS:', list(letter_mapping.keys()))
+print('TOTAL_LEDS:', total_leds)
+print('LAST_LED_INDEX:', total_leds - 1)
+
+# Renderiza o efeito Onda sem interface
+renderer = EffectRenderer(total_leds)
+renderer.set_params({'tipo': 'Onda', 'color1': '#FF0000', 'color2': '#0000FF', 'wave_width': total_leds // 4})
+frame = bytearray(renderer.frame_size())
+
+
+def led_names(buf):
+    return ['#%02x%02x%02x' % tuple(buf[i:i + 3]) for i in range(0, len(buf), 3)]
+
 
 # Test several wave_index values
-test_indices = [0, 1, max(0, win.total_leds - 1)]
+test_indices = [0, 1, max(0, total_leds - 1)]
 for w in test_indices:
-    win.wave_index = w
-    win._generate_led_colors()
-    arr = [c.name() for c in win.virtual_leds]
+    renderer.wave_index = w
+    renderer.render_into(frame, advance=False)
+    arr = led_names(frame)
     print(f'wave_index={w} first5={arr[:5]} last5={arr[-5:]}')
 
 # Continuity check: compare color at position 0 for wave_index 0 and wave_index total_leds
-win.wave_index = 0
-win._generate_led_colors()
-c0 = win.virtual_leds[0].name()
-win.wave_index = win.total_leds
-win._generate_led_colors()
-c1 = win.virtual_leds[0].name()
+renderer.wave_index = 0
+renderer.render_into(frame, advance=False)
+c0 = led_names(frame)[0]
+renderer.wave_index = total_leds
+renderer.render_into(frame, advance=False)
+c1 = led_names(frame)[0]
 print('continuity_equal:', c0 == c1, c0, c1)
 
+# Preview nativo (código do firmware) e fallback em Python devem ser idênticos
+python_renderer = EffectRenderer(total_leds, use_native=False)
+keyframes = [
+    {'tempo_ms': 0, 'cores': ['#FF8000', '#0010FF'], 'transicao': 'Suave'},
+    {'tempo_ms': 700, 'cores': ['#00FF00', '#0010FF'], 'transicao': 'Linear'},
+    {'tempo_ms': 1500, 'cores': ['#FF8000', '#FFFFFF'], 'transicao': 'Degrau'},
+]
+for tipo in ('Cor sólida', 'Gradiente', 'Onda', 'Linha do tempo', 'Arco-íris', 'Cintilar', 'Fogo'):
+    params = {'tipo': tipo, 'color1': '#FF8000', 'color2': '#0010FF', 'wave_width': total_leds // 4,
+              'segmentos': [0, total_leds // 2], 'keyframes': keyframes}
+    renderer.set_params(params)
+    python_renderer.set_params(params)
+    renderer.reset()
+    python_renderer.reset()
+    native_frame = bytearray(renderer.frame_size())
+    python_frame = bytearray(renderer.frame_size())
+    same = True
+    for _ in range(total_leds + 1):
+        renderer.render_into(native_frame)
+        python_renderer.render_into(python_frame)
+        same = same and native_frame == python_frame
+    print(f'native={renderer.native} python_equal[{tipo}]:', same)
+
+# Dois renderizadores nativos intercalados: cada um mantém o próprio estado do efeito
+other = EffectRenderer(total_leds)
+python_other = EffectRenderer(total_leds, use_native=False)
+for r, tipo in ((renderer, 'Arco-íris'), (python_renderer, 'Arco-íris'), (other, 'Fogo'), (python_other, 'Fogo')):
+    r.set_params({'tipo': tipo, 'color1': '#FF8000', 'color2': '#0010FF', 'wave_width': total_leds // 4})
+    r.reset()
+frames = [bytearray(total_leds * 3) for _ in range(4)]
+same = True
+for _ in range(10):
+    for r, f in zip((renderer, other, python_renderer, python_other), frames):
+        r.render_into(f)
+    same = same and frames[0] == frames[2] and frames[1] == frames[3]
+print('interleaved_equal:', same)
+
+# Animações pré-calculadas: a tabela comprimida volta exatamente aos quadros do preview
+from app.baked_animation import BAKED_TYPE, decode, encode, render_cycle
+for tipo in ('Onda', 'Arco-íris'):
+    params = {'tipo': tipo, 'color1': '#FF8000', 'color2': '#0010FF', 'wave_width': total_leds // 4}
+    frames = render_cycle(params, total_leds)
+    data = encode(frames)
+    same = decode(data, total_leds) == frames
+    if renderer.native:
+        # apply_baked() do firmware, compilado para o host
+        backend = renderer._native
+        effect = backend.make_effect(BAKED_TYPE, (0, 0, 0), (0, 0, 0), 150, 0)
+        baked_frame = bytearray(total_leds * 3)
+        context = backend.new_context()
+        for k in range(len(frames) + 1):
+            backend.render(context, effect, baked_frame, total_leds, 0, 0, data, reset=(k == 0))
+            same = same and bytes(baked_frame) == frames[k % len(frames)]
+    print(f'baked_equal[{tipo}]: {same} ({len(data)} bytes, {len(frames)} quadros)')
+
 print('TEST_DONE')
 sys.exit(0)
@@ -0,0 +1,28 @@
+"""
+Limite de LEDs do firmware: NUM_LEDS e os índices dos laços são uint16_t.
+
+Uso: python tools/test_firmware_limits.py
+"""
+from app.config_manager import DEFAULT_CONFIG, MAX_LEDS
+from app.effect_renderer import SPEED_MS
+from app.firmware_generator import FirmwareGenerator
+
+PRESET = {'tipo': 'Onda', 'color1': '#FF0000', 'color2': '#0000FF', 'velocidade': 'Rápido', 'wave_width': 10}
+
+print('MAX_LEDS:', MAX_LEDS)
+print('speed_label_valid:', PRESET['velocidade'] in SPEED_MS)
+print('max_leds_fits_uint16:', MAX_LEDS <= 0xFFFF)
+
+# No limite o sketch é gerado com NUM_LEDS igual ao limite
+sketch = FirmwareGenerator(MAX_LEDS, dict(DEFAULT_CONFIG)).generate_firmware([PRESET])
+print('generated_at_limit:', f'#define NUM_LEDS {MAX_LEDS}' in sketch)
+
+# Acima do limite (ou sem LEDs) o gerador recusa em vez de emitir um laço que não termina
+for total_leds in (MAX_LEDS + 1, 100000, 0):
+    try:
+        FirmwareGenerator(total_leds, dict(DEFAULT_CONFIG)).generate_firmware([PRESET])
+        print(f'rejected[{total_leds}]:', False)
+    except ValueError as e:
+        print(f'rejected[{total_leds}]:', True, e)
+
+print('TEST_DONE')
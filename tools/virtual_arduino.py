@@ -0,0 +1,315 @@
+"""
+virtual_arduino.py - Arduino virtual em um pseudo-terminal (pty) para testes seriais
+
+Cria um pty que o pyserial abre como se fosse a porta de uma placa e emula o
+lado serial do firmware gerado:
+
+- reset ao abrir a porta (DTR): bytes recebidos durante o boot são perdidos;
+- leitura no ritmo do baud rate e buffer de recepção de 64 bytes;
+- latência de processamento e perda aleatória de bytes configuráveis;
+- comandos do firmware: número do efeito (Serial.parseInt, com o timeout de
+  1 s do Arduino), "T<segundos>" do firmware agendado e, opcionalmente,
+  PING -> PONG para firmwares com handshake.
+
+Tudo que chega (depois das perdas) fica em `received`, e cada comando
+interpretado vira um evento em `events` (tempo, tipo, valor).
+
+Só funciona em sistemas POSIX (Linux/macOS).
+
+Uso interativo:
+    python -m tools.virtual_arduino --latency 0.005 --drop 0.01
+"""
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+RX_BUFFER_SIZE = 64          # buffer de recepção da HardwareSerial
+PARSE_TIMEOUT = 1.0          # Stream::setTimeout padrão (1000 ms)
+POLL_INTERVAL = 0.002
+
+
+class VirtualArduino:
+    """
+    Placa virtual. `port` é o caminho do pty para abrir com pyserial.
+
+    Args:
+        num_effects: efeitos na flash (comandos fora do intervalo são ignorados)
+        reset_delay: segundos de boot após abrir a porta (bytes são descartados)
+        latency: atraso entre o byte chegar e o firmware processá-lo (s)
+        drop_rate: probabilidade de perder cada byte (0..1)
+        baudrate: limita a taxa de recepção a baudrate/10 bytes por segundo
+        clock_command: aceita "T<segundos>" (firmware com os 12 meses)
+        select_command: aceita o número do efeito (firmware com mais de um efeito)
+        handshake: responde "PONG\\n" a "PING"
+        seed: semente das perdas aleatórias (testes repetíveis)
+    """
+
+    def __init__(self, num_effects=12, reset_delay=1.5, latency=0.0, drop_rate=0.0,
+                 baudrate=9600, clock_command=True, select_command=True,
+                 handshake=False, parse_timeout=PARSE_TIMEOUT, seed=None):
+        self.num_effects = num_effects
+        self.reset_delay = reset_delay
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.baudrate = baudrate
+        self.clock_command = clock_command
+        self.select_command = select_command
+        self.handshake = handshake
+        self.parse_timeout = parse_timeout
+        self._random = random.Random(seed)
+
+        self._master, slave = os.openpty()
+        self.port = os.ttyname(slave)
+        tty.setraw(slave)
+        # Sem manter o escravo aberto, POLLHUP indica que nenhum cliente está com a porta aberta
+        os.close(slave)
+        self._poll = select.poll()
+        self._poll.register(self._master, select.POLLIN | select.POLLHUP)
+
+        self.received = bytearray()
+        self.events = []
+        self.stats = {"bytes_in": 0, "dropped": 0, "lost_during_boot": 0, "resets": 0,
+                      "parse_timeouts": 0}
+        self.current_effect = 0
+        self.clock_epoch = None
+
+        self._condition = threading.Condition()
+        self._wire = []              # (chegada no fio, byte) ainda não processados
+        self._wire_free_at = 0.0     # quando o fio termina de transmitir o último byte
+        self._boot_until = 0.0
+        self._port_open = False
+        self._reset_parser()
+
+        self.is_running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # -----------------------------------------
+    # API para testes
+    # -----------------------------------------
+    def stop(self):
+        self.is_running = False
+        self._thread.join(timeout=1)
+        try:
+            os.close(self._master)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def booting(self):
+        return time.monotonic() < self._boot_until
+
+    def events_of(self, kind):
+        with self._condition:
+            return [event for event in self.events if event[1] == kind]
+
+    def wait_for(self, kind, count=1, timeout=5.0):
+        """Espera até haver `count` eventos do tipo `kind`; retorna True se chegaram"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while sum(1 for event in self.events if event[1] == kind) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    # -----------------------------------------
+    # Emulação
+    # -----------------------------------------
+    def _record(self, kind, value=None, when=None):
+        with self._condition:
+            self.events.append((when or time.monotonic(), kind, value))
+            self._condition.notify_all()
+
+    def _on_open(self, now):
+        """Abrir a porta baixa o DTR e reinicia a placa: estado volta ao do boot"""
+        self._port_open = True
+        self._boot_until = now + self.reset_delay
+        self._wire.clear()
+        self._reset_parser()
+        self.current_effect = 0
+        self.clock_epoch = None
+        self.stats["resets"] += 1
+        self._record("reset", when=now)
+
+    def _run(self):
+        while self.is_running:
+            try:
+                ready = self._poll.poll(POLL_INTERVAL * 1000)
+            except OSError:
+                break
+            now = time.monotonic()
+            hangup = any(flags & select.POLLHUP for _, flags in ready)
+
+            if hangup:
+                if self._port_open:
+                    self._port_open = False
+                    self._record("close", when=now)
+                time.sleep(POLL_INTERVAL)
+            elif not self._port_open:
+                self._on_open(now)
+
+            # Bytes escritos logo antes de fechar a porta ainda chegam à placa
+            if len(self._wire) < RX_BUFFER_SIZE and any(flags & select.POLLIN for _, flags in ready):
+                self._receive(now)
+            self._process(time.monotonic())
+            if len(self._wire) >= RX_BUFFER_SIZE:
+                time.sleep(POLL_INTERVAL)  # buffer cheio: o host espera (POLLIN continuaria ativo)
+
+    def _receive(self, now):
+        try:
+            data = os.read(self._master, RX_BUFFER_SIZE - len(self._wire))
+        except OSError:
+            return
+        byte_time = 10.0 / self.baudrate  # start + 8 bits + stop
+        for byte in data:
+            self._wire_free_at = max(self._wire_free_at, now) + byte_time
+            self._wire.append((self._wire_free_at, byte))
+
+    def _process(self, now):
+        while self._wire and self._wire[0][0] + self.latency <= now:
+            arrived, byte = self._wire.pop(0)
+            self.stats["bytes_in"] += 1
+            if arrived < self._boot_until:
+                self.stats["lost_during_boot"] += 1
+                continue
+            if self.drop_rate and self._random.random() < self.drop_rate:
+                self.stats["dropped"] += 1
+                continue
+            self.received.append(byte)
+            # um parseInt pendente pode ter expirado antes deste byte chegar
+            self._check_parse_timeout(arrived + self.latency)
+            self._feed(byte, arrived + self.latency)
+        self._check_parse_timeout(now)
+
+    # -----------------------------------------
+    # loop() do firmware gerado
+    # -----------------------------------------
+    def _reset_parser(self):
+        self._mode = None        # None, "skip", "digits" ou "word"
+        self._target = None      # "clock" ou "select"
+        self._value = 0
+        self._negative = False
+        self._word = b""
+        self._deadline = 0.0
+
+    def _start_parse_int(self, target, now):
+        self._mode = "skip"
+        self._target = target
+        self._value = 0
+        self._negative = False
+        self._deadline = now + self.parse_timeout
+
+    def _feed(self, byte, now):
+        char = chr(byte)
+        if self._mode is None:
+            if self.handshake and char == "P":
+                self._mode, self._word = "word", b"P"
+                self._deadline = now + self.parse_timeout
+                return
+            if self.clock_command and char == "T":
+                self._start_parse_int("clock", now)
+                return
+            if not self.select_command:
+                return  # firmware sem leitor de efeito: o byte fica sem efeito
+            self._start_parse_int("select", now)
+
+        if self._mode == "word":
+            if char.isalpha():
+                self._word += bytes([byte])
+                self._deadline = now + self.parse_timeout
+                return
+            if self._word == b"PING":
+                os.write(self._master, b"PONG\n")
+                self._record("ping", when=now)
+            self._reset_parser()
+            return
+
+        if self._mode == "skip":
+            # parseInt ignora tudo que não é dígito ou sinal, esperando até o timeout
+            self._deadline = now + self.parse_timeout
+            if char.isdigit():
+                self._mode, self._value = "digits", int(char)
+            elif char == "-":
+                self._mode, self._negative = "digits", True
+            return
+
+        if self._mode == "digits":
+            if char.isdigit():
+                self._value = self._value * 10 + int(char)
+                self._deadline = now + self.parse_timeout
+                return
+            # o caractere que encerra o número só foi espiado: volta ao loop()
+            self._finish_parse_int(now)
+            self._feed(byte, now)
+
+    def _check_parse_timeout(self, now):
+        if self._mode is not None and now >= self._deadline:
+            if self._mode == "skip":
+                # Serial.parseInt() devolve 0 quando não chega nenhum dígito
+                self.stats["parse_timeouts"] += 1
+                self._value = 0
+            if self._mode == "word":
+                self._reset_parser()
+                return
+            self._finish_parse_int(now)
+
+    def _finish_parse_int(self, now):
+        value = -self._value if self._negative else self._value
+        target = self._target
+        self._reset_parser()
+        if target == "clock":
+            self.clock_epoch = value
+            self._record("clock", value, when=now)
+        elif 0 <= value < self.num_effects:
+            self.current_effect = value
+            self._record("select", value, when=now)
+        else:
+            self._record("ignored", value, when=now)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arduino virtual em um pseudo-terminal")
+    parser.add_argument("--effects", type=int, default=12)
+    parser.add_argument("--reset-delay", type=float, default=1.5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop", type=float, default=0.0)
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--handshake", action="store_true")
+    args = parser.parse_args(argv)
+
+    device = VirtualArduino(
+        num_effects=args.effects, reset_delay=args.reset_delay, latency=args.latency,
+        drop_rate=args.drop, baudrate=args.baud, handshake=args.handshake
+    )
+    print(f"Arduino virtual em {device.port} (Ctrl+C para sair)")
+    shown = 0
+    try:
+        while True:
+            time.sleep(0.2)
+            with device._condition:
+                new_events = device.events[shown:]
+                shown = len(device.events)
+            for when, kind, value in new_events:
+                print(f"{when:12.3f}  {kind:8} {'' if value is None else value}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        device.stop()
+        print(f"Estatísticas: {device.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())